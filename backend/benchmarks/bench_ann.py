@@ -0,0 +1,64 @@
+import time
+import argparse
+import numpy as np
+from services.ann import build_index, ANN_NLIST
+from services.artifacts import load_artifact
+from services.recommender import CF_ARTIFACT
+
+def load_vectors(source: str, count: int, dimensions: int, seed: int = 0):
+    """
+    (movie vectors, query vectors): the trained CF factors, or clustered synthetic
+    vectors standing in for a larger catalog.
+    """
+    if source == "cf":
+        loaded = load_artifact(CF_ARTIFACT)
+        if loaded is None:
+            raise SystemExit("No CF model found; train one with python -m services.recommender or use --source synthetic")
+        arrays = loaded[0]
+        return np.asarray(arrays["item_factors"]), np.asarray(arrays["user_factors"])
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((max(1, count // 200), dimensions))
+    vectors = centres[rng.integers(len(centres), size=count)] + 0.5 * rng.standard_normal((count, dimensions))
+    queries = centres[rng.integers(len(centres), size=1000)] + 0.5 * rng.standard_normal((1000, dimensions))
+    return vectors.astype(np.float32), queries.astype(np.float32)
+
+def run(index, queries, k, metric, nprobe=None):
+    """
+    (results, queries per second) for one pass over the queries.
+    """
+    start = time.perf_counter()
+    results = [index.search(query, k, metric=metric, nprobe=nprobe)[0] for query in queries]
+    return results, len(queries) / (time.perf_counter() - start)
+
+def recall(results, truth) -> float:
+    return float(np.mean([len(np.intersect1d(found, expected)) / max(1, len(expected))
+                          for found, expected in zip(results, truth)]))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall@k and QPS of the IVF index against exact scoring")
+    parser.add_argument("--source", choices=["cf", "synthetic"], default="cf")
+    parser.add_argument("--count", type=int, default=200000, help="synthetic vectors")
+    parser.add_argument("--dimensions", type=int, default=32, help="synthetic dimensions")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--metric", choices=["cosine", "ip"], default="ip")
+    parser.add_argument("--nlist", type=int, default=ANN_NLIST)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    vectors, queries = load_vectors(args.source, args.count, args.dimensions)
+    queries = queries[np.random.default_rng(1).choice(len(queries), size=min(args.queries, len(queries)), replace=False)]
+    ids = np.arange(len(vectors))
+
+    exact = build_index(vectors, ids, "exact")
+    start = time.perf_counter()
+    ivf = build_index(vectors, ids, "ivf", nlist=args.nlist)
+    print(f"{len(vectors)} vectors x {vectors.shape[1]}, {len(queries)} queries, top {args.k} by {args.metric}; "
+          f"IVF build {time.perf_counter() - start:.1f}s ({len(ivf.offsets) - 1} cells)")
+
+    truth, exact_qps = run(exact, queries, args.k, args.metric)
+    print(f"{'index':>10} {'nprobe':>7} {'recall@k':>9} {'QPS':>10} {'speedup':>8}")
+    print(f"{'exact':>10} {'-':>7} {1.0:>9.3f} {exact_qps:>10.0f} {1.0:>8.1f}")
+    for nprobe in args.nprobe:
+        results, qps = run(ivf, queries, args.k, args.metric, nprobe)
+        print(f"{'ivf':>10} {nprobe:>7} {recall(results, truth):>9.3f} {qps:>10.0f} {qps / exact_qps:>8.1f}")
@@ -0,0 +1,100 @@
+import time
+import argparse
+import numpy as np
+from bson import ObjectId
+from services.catalog import Catalog, CATALOG_PROJECTION
+from services.projection import movie_projection
+
+def timed(function, repeat: int) -> float:
+    """
+    Median latency of `function()` in milliseconds.
+    """
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return sorted(latencies)[len(latencies) // 2]
+
+def synthetic_documents(count: int, seed: int = 0) -> list:
+    """
+    Movie documents with dataset-like distributions, for catalogs larger than the dataset.
+    """
+    rng = np.random.default_rng(seed)
+    genres = [f"Genre {i}" for i in range(20)]
+    return [
+        {
+            "_id": ObjectId(),
+            "year": int(rng.integers(1900, 2020)),
+            "avg_rating": round(float(rng.uniform(0, 10)), 1),
+            "num_reviews": int(rng.pareto(1.2) * 10),
+            "popularity": float(rng.exponential(3)),
+            "runtime": float(rng.normal(100, 20)),
+            "rand": float(rng.random()),
+            "genres": list(rng.choice(genres, size=int(rng.integers(1, 4)), replace=False)),
+        }
+        for _ in range(count)
+    ]
+
+def shapes(movies, catalog: Catalog, target: dict, limit: int):
+    """
+    (name, MongoDB query, catalog query) of each route shape served by the catalog.
+    MongoDB queries return the same _ids the catalog does; None when there is no MongoDB.
+    """
+    genre = target["genres"][0]
+    low, high = max(0, target["avg_rating"] - 1), target["avg_rating"] + 1
+    mongo = movies is not None
+    return [
+        ("popular",
+         mongo and (lambda: list(movies.find({"num_reviews": {"$gte": 100}}, {"_id": 1})
+                                 .sort([("avg_rating", -1), ("num_reviews", -1)]).limit(limit))),
+         lambda: catalog.popular(limit)),
+        ("genre (regex)",
+         mongo and (lambda: list(movies.find({"genres": {"$regex": genre[:4], "$options": "i"}}, {"_id": 1})
+                                 .sort("avg_rating", -1).limit(limit))),
+         lambda: catalog.by_genre(genre[:4], limit)),
+        ("similar band",
+         mongo and (lambda: list(movies.find({"_id": {"$ne": target["_id"]}, "genres": {"$in": target["genres"]},
+                                              "avg_rating": {"$gte": low, "$lte": high}}, {"_id": 1})
+                                 .sort("avg_rating", -1).limit(limit))),
+         lambda: catalog.similar(target["_id"], target["genres"], low, high, limit)),
+        ("random (genre, seeded)",
+         mongo and (lambda: list(movies.find({"genres": genre, "rand": {"$gte": 0.5}}, {"_id": 1})
+                                 .sort("rand", 1).limit(limit))),
+         lambda: catalog.sample(limit, genre=genre, seed=1)),
+    ]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency of the list-route query shapes: MongoDB vs the in-memory catalog")
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="Benchmark the catalog alone over this many synthetic movies (no MongoDB needed)")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    movies = None
+    if args.synthetic:
+        documents = synthetic_documents(args.synthetic)
+    else:
+        from db.mongo import get_mongo_client, MONGO_DB
+
+        movies = get_mongo_client()[MONGO_DB]["movies"]
+        documents = list(movies.find({}, CATALOG_PROJECTION))
+
+    start = time.perf_counter()
+    catalog = Catalog.from_documents(documents)
+    print(f"Catalog of {len(catalog)} movies built in {time.perf_counter() - start:.2f}s "
+          f"({sum(column.nbytes for column in catalog.columns.values()) / 1e6:.1f} MB of columns)")
+
+    target = max(documents, key=lambda document: document.get("num_reviews") or 0)
+    card = movie_projection("card")
+    print(f"{'shape':>24} {'mongo ms':>10} {'catalog ms':>11} {'+ fetch ms':>11} {'speedup':>8}")
+    for name, mongo_query, catalog_query in shapes(movies, catalog, target, args.limit):
+        catalog_ms = timed(catalog_query, args.repeat)
+        if movies is None:
+            print(f"{name:>24} {'-':>10} {catalog_ms:>11.3f} {'-':>11} {'-':>8}")
+            continue
+        mongo_ms = timed(mongo_query, args.repeat)
+        # What the route pays with the catalog: the in-memory query plus one _id lookup
+        fetch_ms = timed(lambda: list(movies.find({"_id": {"$in": catalog_query()}}, card)), args.repeat)
+        print(f"{name:>24} {mongo_ms:>10.3f} {catalog_ms:>11.3f} {fetch_ms:>11.3f} {mongo_ms / fetch_ms:>8.1f}")
@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+import argparse
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+# Endpoints exercised by default: one Mongo lookup, one list and one aggregation
+DEFAULT_PATHS = [
+    "/movies/count",
+    "/movies/?limit=10",
+    "/movies/recommendations/popular?limit=10",
+]
+
+_local = threading.local()
+
+def _session():
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+def _hit(url):
+    start = time.perf_counter()
+    response = _session().get(url)
+    return time.perf_counter() - start, response.status_code
+
+def run(base_url, paths, concurrency, total):
+    """
+    Fire `total` requests at `concurrency` in-flight and return throughput and latency stats.
+    """
+    urls = [base_url + paths[i % len(paths)] for i in range(total)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(_hit, urls))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(r[0] for r in results)
+    errors = sum(1 for r in results if r[1] >= 400)
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "req_per_sec": total / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Concurrent throughput benchmark. Run it once against a server started "
+                    "with ASYNC_DRIVERS=false and once with ASYNC_DRIVERS=true to compare."
+    )
+    parser.add_argument("--base-url", default=os.getenv("API_BASE_URL", "http://localhost:8000"))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 100, 200])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--path", action="append", dest="paths")
+    args = parser.parse_args()
+
+    paths = args.paths or DEFAULT_PATHS
+    try:
+        mode = _session().get(args.base_url + "/health").json().get("drivers", "unknown")
+    except Exception as e:
+        print(f"Cannot reach API at {args.base_url}: {e}")
+        sys.exit(1)
+
+    print(f"Benchmarking {args.base_url} (drivers: {mode})")
+    print(f"{'concurrency':>12} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'errors':>8}")
+    for concurrency in args.concurrency:
+        stats = run(args.base_url, paths, concurrency, args.requests)
+        print(f"{stats['concurrency']:>12} {stats['req_per_sec']:>10.1f} "
+              f"{stats['p50_ms']:>10.1f} {stats['p99_ms']:>10.1f} {stats['errors']:>8}")
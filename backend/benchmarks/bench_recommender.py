@@ -0,0 +1,62 @@
+import os
+import time
+import argparse
+import numpy as np
+from services.recommender import (
+    ratings_from_csv, train_als, rmse, Recommender, CF_FACTORS, CF_ITERATIONS, CF_REGULARIZATION
+)
+
+def time_training(train, factors, iterations, regularization, workers):
+    """
+    Train on `train` and return (seconds, user_factors, item_factors).
+    """
+    start = time.perf_counter()
+    user_factors, item_factors = train_als(train, factors, iterations, regularization, workers)
+    return time.perf_counter() - start, user_factors, item_factors
+
+def time_requests(recommender, user_ids, requests, limit):
+    """
+    Latency of Recommender.recommend for `requests` random users, in milliseconds.
+    """
+    rng = np.random.default_rng(0)
+    latencies = []
+    for user_id in rng.choice(user_ids, size=requests):
+        start = time.perf_counter()
+        recommender.recommend(user_id, limit)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        "p50_ms": latencies[len(latencies) // 2],
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "req_per_sec": 1000 * len(latencies) / sum(latencies),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Training time, held-out RMSE and per-request latency of the CF recommender")
+    parser.add_argument("--ratings", default="../datasets/ratings_small.csv")
+    parser.add_argument("--factors", type=int, default=CF_FACTORS)
+    parser.add_argument("--iterations", type=int, default=CF_ITERATIONS)
+    parser.add_argument("--regularization", type=float, default=CF_REGULARIZATION)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, os.cpu_count() or 1}))
+    parser.add_argument("--holdout", type=float, default=0.1)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    data = ratings_from_csv(args.ratings)
+    train, test = data.split(args.holdout)
+    print(f"{data.matrix.nnz} ratings, {len(data.user_ids)} users, {len(data.movie_ids)} movies "
+          f"({test.nnz} held out)")
+
+    print(f"{'workers':>8} {'train s':>10} {'train RMSE':>11} {'test RMSE':>10}")
+    for workers in args.workers:
+        elapsed, user_factors, item_factors = time_training(
+            train, args.factors, args.iterations, args.regularization, workers)
+        print(f"{workers:>8} {elapsed:>10.2f} {rmse(train, user_factors, item_factors):>11.3f} "
+              f"{rmse(test, user_factors, item_factors):>10.3f}")
+
+    recommender = Recommender(data.user_ids, data.movie_ids, data.movie_ids, user_factors, item_factors,
+                              train.indptr, train.indices, data.global_mean)
+    stats = time_requests(recommender, data.user_ids, args.requests, args.limit)
+    print(f"\nrecommend(top {args.limit}) over {len(data.movie_ids)} movies: "
+          f"p50 {stats['p50_ms']:.3f} ms, p99 {stats['p99_ms']:.3f} ms, {stats['req_per_sec']:.0f} req/s")
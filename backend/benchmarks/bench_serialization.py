@@ -0,0 +1,85 @@
+import json
+import time
+import argparse
+from datetime import datetime
+import pandas as pd
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from services.serialization import FastJSONResponse, json_default, orjson
+from services.projection import movie_projection
+
+def csv_pages(movies_csv: str, ratings_csv: str, limit: int) -> dict:
+    """
+    List pages built from the datasets the way load_data stores them, for running without MongoDB.
+    """
+    from load_data import movies_from_chunk, reviews_from_chunk
+
+    movies = movies_from_chunk(pd.read_csv(movies_csv, dtype=str, nrows=limit))
+    reviews = reviews_from_chunk(pd.read_csv(ratings_csv, nrows=limit))
+    users = [
+        {"username": f"user{i}", "email": f"user{i}@example.com", "joined_at": datetime.utcnow()}
+        for i in range(limit)
+    ]
+    card = movie_projection("card")
+    for document in movies + reviews + users:
+        document["_id"] = ObjectId()
+    return {
+        "movies (card)": ("movies", [{name: movie[name] for name in ["_id", *card] if name in movie} for movie in movies]),
+        "movies (full)": ("movies", movies),
+        "reviews": ("reviews", reviews),
+        "users": ("users", users),
+    }
+
+def mongo_pages(limit: int) -> dict:
+    """
+    The first page of each list endpoint, read from MongoDB.
+    """
+    from db.mongo import get_mongo_client, MONGO_DB
+
+    db = get_mongo_client()[MONGO_DB]
+    return {
+        "movies (card)": ("movies", list(db["movies"].find({}, movie_projection("card")).limit(limit))),
+        "movies (full)": ("movies", list(db["movies"].find({}, movie_projection("full")).limit(limit))),
+        "reviews": ("reviews", list(db["reviews"].find().limit(limit))),
+        "users": ("users", list(db["users"].find({}, {"password_hash": 0}).limit(limit))),
+    }
+
+def response(key: str, documents: list) -> dict:
+    return {key: documents, "limit": len(documents), "next_cursor": None, "has_more": False}
+
+def timed(function, repeat: int) -> float:
+    """
+    Median latency of `function()` in milliseconds.
+    """
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return sorted(latencies)[len(latencies) // 2]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Encoding cost of list responses: FastAPI's default path vs FastJSONResponse")
+    parser.add_argument("--source", choices=["csv", "mongo"], default="csv")
+    parser.add_argument("--movies", default="../datasets/movies_metadata.csv")
+    parser.add_argument("--ratings", default="../datasets/ratings_small.csv")
+    parser.add_argument("--limit", type=int, default=100, help="Documents per page")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    pages = mongo_pages(args.limit) if args.source == "mongo" else csv_pages(args.movies, args.ratings, args.limit)
+    print(f"Encoder: {'orjson ' + orjson.__version__ if orjson else 'json (orjson not installed)'}")
+    print(f"{'page':>14} {'docs':>5} {'KB':>7} {'default ms':>11} {'json ms':>8} {'fast ms':>8} {'speedup':>8}")
+    for name, (key, documents) in pages.items():
+        # Before: routes stringified _id, FastAPI ran jsonable_encoder and JSONResponse json.dumps
+        stringified = [{**document, "_id": str(document["_id"])} for document in documents]
+        default_ms = timed(lambda: JSONResponse(jsonable_encoder(response(key, stringified))).body, args.repeat)
+        # The standard library encoder without the jsonable_encoder pass (the fallback without orjson)
+        json_ms = timed(lambda: json.dumps(response(key, documents), default=json_default, ensure_ascii=False,
+                                           separators=(",", ":")).encode(), args.repeat)
+        # After: the documents as read, ObjectIds and datetimes included
+        body = FastJSONResponse(response(key, documents)).body
+        fast_ms = timed(lambda: FastJSONResponse(response(key, documents)).body, args.repeat)
+        print(f"{name:>14} {len(documents):>5} {len(body) / 1024:>7.1f} {default_ms:>11.3f} {json_ms:>8.3f} "
+              f"{fast_ms:>8.3f} {default_ms / fast_ms:>7.1f}x")
@@ -0,0 +1,129 @@
+import os
+import itertools
+from functools import partial
+from starlette.concurrency import run_in_threadpool
+
+# Use native asyncio drivers (Motor, redis.asyncio, async Neo4j) when enabled.
+# Otherwise the blocking drivers are wrapped so route handlers can still await
+# them, with each call running in Starlette's threadpool.
+ASYNC_DRIVERS = os.getenv('ASYNC_DRIVERS', 'false').lower() in ('1', 'true', 'yes')
+
+# Documents pulled per threadpool hop when iterating a cursor with `async for`
+CURSOR_FETCH_SIZE = int(os.getenv('CURSOR_FETCH_SIZE', 100))
+
+# Cursor methods that only modify the query and never touch the network
+_CURSOR_MODIFIERS = {
+    "sort", "skip", "limit", "batch_size", "hint", "max_time_ms",
+    "comment", "allow_disk_use", "collation", "where"
+}
+
+def _take(cursor, length=None):
+    """
+    Pull up to `length` documents (all when None) from a blocking cursor.
+    """
+    if length is None:
+        return list(cursor)
+    return list(itertools.islice(cursor, length))
+
+class ThreadedProxy:
+    """
+    Awaitable facade over a blocking object. Every method call runs in the threadpool.
+    """
+    def __init__(self, target):
+        self._target = target
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            return await run_in_threadpool(attr, *args, **kwargs)
+        return call
+
+class ThreadedCursor:
+    """
+    Motor-style cursor over a pymongo cursor that is fetched in the threadpool.
+    """
+    def __init__(self, cursor=None, factory=None):
+        self._cursor = cursor
+        self._factory = factory  # Builds the cursor lazily (aggregate runs its command here)
+
+    def __getattr__(self, name):
+        if name not in _CURSOR_MODIFIERS or self._cursor is None:
+            raise AttributeError(name)
+        method = getattr(self._cursor, name)
+
+        def modify(*args, **kwargs):
+            method(*args, **kwargs)
+            return self
+        return modify
+
+    async def _resolve(self):
+        if self._cursor is None:
+            self._cursor = await run_in_threadpool(self._factory)
+        return self._cursor
+
+    async def to_list(self, length=None):
+        cursor = await self._resolve()
+        return await run_in_threadpool(_take, cursor, length)
+
+    async def explain(self):
+        cursor = await self._resolve()
+        return await run_in_threadpool(cursor.explain)
+
+    async def close(self):
+        if self._cursor is not None:
+            await run_in_threadpool(self._cursor.close)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        cursor = await self._resolve()
+        while True:
+            batch = await run_in_threadpool(_take, cursor, CURSOR_FETCH_SIZE)
+            if not batch:
+                return
+            for document in batch:
+                yield document
+
+class ThreadedCollection(ThreadedProxy):
+    """
+    Motor-compatible wrapper around a pymongo Collection.
+    """
+    def find(self, *args, **kwargs):
+        return ThreadedCursor(cursor=self._target.find(*args, **kwargs))
+
+    def aggregate(self, *args, **kwargs):
+        return ThreadedCursor(factory=partial(self._target.aggregate, *args, **kwargs))
+
+    def with_options(self, **kwargs):
+        return ThreadedCollection(self._target.with_options(**kwargs))
+
+class ThreadedDatabase(ThreadedProxy):
+    """
+    Motor-compatible wrapper around a pymongo Database.
+    """
+    def __getitem__(self, name):
+        return ThreadedCollection(self._target[name])
+
+    def get_collection(self, name, **kwargs):
+        return ThreadedCollection(self._target.get_collection(name, **kwargs))
+
+class ThreadedPipeline(ThreadedProxy):
+    """
+    redis-py pipeline with the redis.asyncio calling convention: commands are
+    queued synchronously and only execute() is awaited (in the threadpool).
+    """
+    def __getattr__(self, name):
+        if name == "execute":
+            return super().__getattr__(name)
+        return getattr(self._target, name)
+
+class ThreadedRedis(ThreadedProxy):
+    """
+    Awaitable facade over a redis-py client, including its pipelines.
+    """
+    def pipeline(self, *args, **kwargs):
+        return ThreadedPipeline(self._target.pipeline(*args, **kwargs))
@@ -0,0 +1,135 @@
+import asyncio
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from db.mongo import MONGO_DB
+
+# Indexes backing every query pattern the routes use, per collection
+INDEXES = {
+    "reviews": [
+        # movie_id / user_id equality followed by the keyset _id range of list_reviews
+        IndexModel([("movie_id", ASCENDING), ("_id", ASCENDING)], name="movie_id_1__id_1"),
+        IndexModel([("user_id", ASCENDING), ("_id", ASCENDING)], name="user_id_1__id_1"),
+        IndexModel([("user_id", ASCENDING), ("movie_id", ASCENDING)], unique=True, name="user_id_1_movie_id_1"),
+    ],
+    "movies": [
+        IndexModel([("genres", ASCENDING), ("avg_rating", DESCENDING)], name="genres_1_avg_rating_-1"),
+        IndexModel([("num_reviews", DESCENDING), ("avg_rating", DESCENDING)], name="num_reviews_-1_avg_rating_-1"),
+        IndexModel([("year", ASCENDING)], name="year_1"),
+        IndexModel([("tmdb_id", ASCENDING)], unique=True, name="tmdb_id_1"),
+        IndexModel([("title_norm", ASCENDING)], name="title_norm_1"),
+        IndexModel([("rand", ASCENDING)], name="rand_1"),
+        IndexModel([("genres", ASCENDING), ("rand", ASCENDING)], name="genres_1_rand_1"),
+        IndexModel([("year", ASCENDING), ("rand", ASCENDING)], name="year_1_rand_1"),
+        IndexModel([("title", TEXT), ("tagline", TEXT), ("description", TEXT)],
+                   weights={"title": 10, "tagline": 3, "description": 1}, name="movie_text"),
+    ],
+    "movie_stats": [
+        # Rollups of one kind, in key (genre/year/decade) order
+        IndexModel([("kind", ASCENDING), ("key", ASCENDING)], name="kind_1_key_1"),
+    ],
+    "users": [
+        IndexModel([("username", ASCENDING)], name="username_1"),
+        IndexModel([("email", ASCENDING)], name="email_1"),
+    ],
+}
+
+# Representative query of each route, checked with explain() for collection scans
+QUERY_PATTERNS = [
+    ("add_review: review for user and movie", "reviews",
+     {"find": "reviews", "filter": {"user_id": "1", "movie_id": "1"}}),
+    ("list_reviews: reviews of a movie", "reviews",
+     {"find": "reviews", "filter": {"movie_id": "1"}, "sort": {"_id": 1}}),
+    ("list_reviews: reviews of a user", "reviews",
+     {"find": "reviews", "filter": {"user_id": "1"}, "sort": {"_id": 1}}),
+    ("search_movies: text mode", "movies",
+     {"find": "movies", "filter": {"$text": {"$search": "star"}}}),
+    ("search_movies: prefix mode", "movies",
+     {"find": "movies", "filter": {"title_norm": {"$regex": "^star"}}, "sort": {"title_norm": 1}}),
+    ("get_movies_by_genre", "movies",
+     {"find": "movies", "filter": {"genres": {"$regex": "Action", "$options": "i"}}, "sort": {"avg_rating": -1}}),
+    ("get_similar_movies", "movies",
+     {"find": "movies", "filter": {"genres": {"$in": ["Action"]}, "avg_rating": {"$gte": 6, "$lte": 8}},
+      "sort": {"avg_rating": -1}}),
+    ("get_random_movies: genre sample", "movies",
+     {"find": "movies", "filter": {"genres": "Action", "rand": {"$gte": 0.5}}, "sort": {"rand": 1}}),
+    ("get_random_movies: year sample", "movies",
+     {"find": "movies", "filter": {"year": 2000, "rand": {"$gte": 0.5}}, "sort": {"rand": 1}}),
+    ("get_popular_movies", "movies",
+     {"aggregate": "movies", "pipeline": [
+         {"$match": {"num_reviews": {"$gte": 100}}},
+         {"$sort": {"avg_rating": -1, "num_reviews": -1}}
+     ], "cursor": {}}),
+    ("analytics: movies in a year range", "movies",
+     {"aggregate": "movies", "pipeline": [{"$match": {"year": {"$gte": 1990, "$lte": 2020}}}], "cursor": {}}),
+    ("analytics: yearly rollups", "movie_stats",
+     {"find": "movie_stats", "filter": {"kind": "year", "key": {"$gte": 1990, "$lte": 2020}}, "sort": {"key": 1}}),
+    ("load_data --sync: movie by tmdb_id", "movies",
+     {"find": "movies", "filter": {"tmdb_id": 1}}),
+    ("register_user: username or email taken", "users",
+     {"find": "users", "filter": {"$or": [{"username": "a"}, {"email": "a@example.com"}]}}),
+]
+
+async def ensure_indexes(db) -> dict:
+    """
+    Create every declared index. Existing indexes with the same spec are left
+    untouched, so this is safe to run on each startup. Indexes are built one
+    at a time so a failing one (e.g. duplicates under a unique key) doesn't
+    block the rest.
+    """
+    created = {}
+    for collection, models in INDEXES.items():
+        for model in models:
+            try:
+                created.setdefault(collection, []).extend(await db[collection].create_indexes([model]))
+            except Exception as e:
+                print(f"Error creating index {model.document['name']} on {collection}: {e}")
+    return created
+
+def _scans_collection(node) -> bool:
+    """
+    Whether an explain() output contains a COLLSCAN stage in a winning plan.
+    """
+    if isinstance(node, dict):
+        if node.get("stage") == "COLLSCAN":
+            return True
+        return any(_scans_collection(value) for key, value in node.items() if key != "rejectedPlans")
+    if isinstance(node, list):
+        return any(_scans_collection(value) for value in node)
+    return False
+
+async def report_unindexed(db) -> list:
+    """
+    Run explain() on every route query pattern and return those still planning a collection scan.
+    """
+    unindexed = []
+    for name, collection, command in QUERY_PATTERNS:
+        try:
+            plan = await db.command("explain", command, verbosity="queryPlanner")
+            if _scans_collection(plan):
+                unindexed.append(name)
+        except Exception as e:
+            print(f"Error explaining '{name}' on {collection}: {e}")
+    return unindexed
+
+async def provision_indexes(db):
+    """
+    Startup hook: build the indexes, then log any route query that still scans a collection.
+    """
+    await ensure_indexes(db)
+    unindexed = await report_unindexed(db)
+    if unindexed:
+        print(f"⚠️  Queries without a usable index: {', '.join(unindexed)}")
+    else:
+        print("✅ All route queries are index-backed")
+
+if __name__ == "__main__":
+    from db.aio import ThreadedDatabase
+    from db.mongo import get_mongo_client
+
+    async def main():
+        db = ThreadedDatabase(get_mongo_client()[MONGO_DB])
+        for collection, names in (await ensure_indexes(db)).items():
+            print(f"{collection}: {', '.join(names)}")
+        for name in await report_unindexed(db):
+            print(f"UNINDEXED: {name}")
+
+    asyncio.run(main())
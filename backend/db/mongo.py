@@ -1,15 +1,87 @@
 import os
+import threading
 from pymongo import MongoClient
+from db.aio import ASYNC_DRIVERS, ThreadedDatabase
 
 # Get MongoDB connection details from environment variables or use defaults
 MONGO_HOST = os.getenv('MONGO_HOST', 'localhost')
 MONGO_PORT = int(os.getenv('MONGO_PORT', 27017))
+MONGO_DB = os.getenv('MONGO_DB', 'cinemate')
+
+# Connection pool settings for the shared client
+MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', 0))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv('MONGO_MAX_IDLE_TIME_MS', 60000))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 5000))
+
+_client = None
+_client_lock = threading.Lock()
+_async_client = None
 
 # Function to get a MongoDB client
 # Use this function wherever you need to interact with MongoDB
 
 def get_mongo_client():
     """
-    Returns a MongoClient instance connected to the specified host and port.
+    Returns the process-wide pooled MongoClient, creating it on first use.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MongoClient(
+                    host=MONGO_HOST,
+                    port=MONGO_PORT,
+                    maxPoolSize=MONGO_MAX_POOL_SIZE,
+                    minPoolSize=MONGO_MIN_POOL_SIZE,
+                    maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+                    waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS
+                )
+    return _client
+
+def close_mongo_client():
+    """
+    Close the shared MongoClient and release its pooled connections.
+    """
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+def get_async_mongo_client():
+    """
+    Returns the process-wide Motor client, creating it on first use.
+    Must be called from inside the running event loop.
+    """
+    global _async_client
+    if _async_client is None:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        _async_client = AsyncIOMotorClient(
+            host=MONGO_HOST,
+            port=MONGO_PORT,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+            waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS
+        )
+    return _async_client
+
+def close_async_mongo_client():
+    """
+    Close the shared Motor client.
+    """
+    global _async_client
+    if _async_client is not None:
+        _async_client.close()
+        _async_client = None
+
+def get_db():
+    """
+    FastAPI dependency returning the application database on the shared client.
+    With ASYNC_DRIVERS enabled this is a Motor database, otherwise the pooled
+    pymongo database wrapped so the same awaitable API runs in the threadpool.
     """
-    return MongoClient(host=MONGO_HOST, port=MONGO_PORT) 
\ No newline at end of file
+    if ASYNC_DRIVERS:
+        return get_async_mongo_client()[MONGO_DB]
+    return ThreadedDatabase(get_mongo_client()[MONGO_DB])
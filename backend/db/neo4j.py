@@ -1,12 +1,194 @@
 import os
-from neo4j import GraphDatabase
+import sys
+import asyncio
+from neo4j import GraphDatabase, AsyncGraphDatabase, unit_of_work
 from typing import List, Dict, Any
+from db.aio import ASYNC_DRIVERS, ThreadedProxy
 
 # Neo4j connection configuration
 NEO4J_URI = os.getenv('NEO4J_URI', 'bolt://localhost:7687')
 NEO4J_USER = os.getenv('NEO4J_USER', 'neo4j')
 NEO4J_PASSWORD = os.getenv('NEO4J_PASSWORD', 'password')
 
+# Rows sent per UNWIND transaction by the bulk writes
+GRAPH_BATCH_SIZE = int(os.getenv('GRAPH_BATCH_SIZE', 5000))
+
+# Shortest paths: relationship hops allowed (default and upper bound) and the
+# server-side transaction timeout in seconds
+DEFAULT_PATH_DEPTH = int(os.getenv('DEFAULT_PATH_DEPTH', 4))
+MAX_PATH_DEPTH = int(os.getenv('MAX_PATH_DEPTH', 8))
+PATH_QUERY_TIMEOUT = float(os.getenv('PATH_QUERY_TIMEOUT', 5))
+
+# Abort startup when an anchored query still plans a label scan
+GRAPH_SCHEMA_STRICT = os.getenv('GRAPH_SCHEMA_STRICT', 'false').lower() in ('1', 'true', 'yes')
+
+# Cypher shared by the blocking and async graph clients
+CREATE_MOVIE_QUERY = """
+MERGE (m:Movie {id: $movie_id})
+SET m.title = $title,
+    m.year = $year,
+    m.avg_rating = $avg_rating,
+    m.num_reviews = $num_reviews
+"""
+
+LINK_GENRES_QUERY = """
+MATCH (m:Movie {id: $movie_id})
+UNWIND $genres AS genre
+MERGE (g:Genre {name: genre})
+MERGE (m)-[:BELONGS_TO]->(g)
+"""
+
+CREATE_USER_QUERY = """
+MERGE (u:User {id: $user_id})
+SET u.username = $username
+"""
+
+CREATE_USER_RATING_QUERY = """
+MATCH (u:User {id: $user_id})
+MATCH (m:Movie {id: $movie_id})
+MERGE (u)-[r:RATED]->(m)
+SET r.rating = $rating
+"""
+
+# Bulk counterparts: one statement per batch of $rows instead of one transaction per row
+CREATE_MOVIES_QUERY = """
+UNWIND $rows AS row
+MERGE (m:Movie {id: row.movie_id})
+SET m.title = row.title,
+    m.year = row.year,
+    m.avg_rating = row.avg_rating,
+    m.num_reviews = row.num_reviews
+WITH m, row
+UNWIND row.genres AS genre
+MERGE (g:Genre {name: genre})
+MERGE (m)-[:BELONGS_TO]->(g)
+"""
+
+CREATE_USER_RATINGS_QUERY = """
+UNWIND $rows AS row
+MATCH (m:Movie {id: row.movie_id})
+MERGE (u:User {id: row.user_id})
+MERGE (u)-[r:RATED]->(m)
+SET r.rating = row.rating
+"""
+
+SIMILAR_MOVIES_QUERY = """
+MATCH (m1:Movie {id: $movie_id})-[:BELONGS_TO]->(g:Genre)<-[:BELONGS_TO]-(m2:Movie)
+WHERE m1 <> m2
+WITH m2, count(g) as shared_genres, m2.avg_rating as rating
+ORDER BY shared_genres DESC, rating DESC
+LIMIT $limit
+RETURN m2.title as title, m2.id as id, shared_genres, rating
+"""
+
+USER_RECOMMENDATIONS_QUERY = """
+MATCH (u:User {id: $user_id})-[r:RATED]->(m1:Movie)-[:BELONGS_TO]->(g:Genre)<-[:BELONGS_TO]-(m2:Movie)
+WHERE r.rating >= 4.0 AND NOT (u)-[:RATED]->(m2)
+WITH m2, count(g) as genre_matches, avg(r.rating) as avg_user_rating, m2.avg_rating as movie_rating
+ORDER BY genre_matches DESC, avg_user_rating DESC, movie_rating DESC
+LIMIT $limit
+RETURN m2.title as title, m2.id as id, genre_matches, movie_rating
+"""
+
+POPULAR_GENRES_QUERY = """
+MATCH (g:Genre)<-[:BELONGS_TO]-(m:Movie)
+WITH g, count(m) as movie_count, avg(m.avg_rating) as avg_rating
+ORDER BY movie_count DESC, avg_rating DESC
+LIMIT $limit
+RETURN g.name as genre, movie_count, avg_rating
+"""
+
+# Path queries are templates: Cypher takes no parameter for a variable-length
+# bound, so the depth is formatted in with `query % depth`. Only ids and
+# titles (genre names for Genre nodes) are returned, not whole path objects.
+SHORTEST_PATH_QUERY = """
+MATCH (m1:Movie {id: $movie1_id}), (m2:Movie {id: $movie2_id})
+MATCH path = shortestPath((m1)-[:BELONGS_TO*..%d]-(m2))
+RETURN length(path) AS hops,
+       [node IN nodes(path) | {id: node.id, title: coalesce(node.title, node.name)}] AS nodes
+"""
+
+SHORTEST_PATHS_FROM_QUERY = """
+MATCH (source:Movie {id: $movie_id})
+UNWIND $target_ids AS target_id
+MATCH (target:Movie {id: target_id})
+WHERE target <> source
+OPTIONAL MATCH path = shortestPath((source)-[:BELONGS_TO*..%d]-(target))
+RETURN target_id, length(path) AS hops,
+       [node IN nodes(path) | {id: node.id, title: coalesce(node.title, node.name)}] AS nodes
+"""
+
+# Uniqueness constraints (each backed by an index) behind the Movie/Genre/User
+# lookups and MERGEs above; IF NOT EXISTS makes them safe to run on each startup
+GRAPH_SCHEMA = [
+    "CREATE CONSTRAINT movie_id_unique IF NOT EXISTS FOR (m:Movie) REQUIRE m.id IS UNIQUE",
+    "CREATE CONSTRAINT genre_name_unique IF NOT EXISTS FOR (g:Genre) REQUIRE g.name IS UNIQUE",
+    "CREATE CONSTRAINT user_id_unique IF NOT EXISTS FOR (u:User) REQUIRE u.id IS UNIQUE",
+    "CREATE INDEX movie_avg_rating IF NOT EXISTS FOR (m:Movie) ON (m.avg_rating)",
+]
+
+# Representative parameters of each anchored query, checked with EXPLAIN for label scans.
+# POPULAR_GENRES_QUERY aggregates over every genre, so it scans by design.
+GRAPH_QUERY_PATTERNS = [
+    ("create_movie_node", CREATE_MOVIE_QUERY,
+     {"movie_id": 1, "title": "", "year": 0, "avg_rating": 0.0, "num_reviews": 0}),
+    ("create_genre_relationships", LINK_GENRES_QUERY, {"movie_id": 1, "genres": ["Drama"]}),
+    ("create_user_node", CREATE_USER_QUERY, {"user_id": "1", "username": ""}),
+    ("create_user_rating", CREATE_USER_RATING_QUERY, {"user_id": "1", "movie_id": 1, "rating": 4.0}),
+    ("create_movie_nodes", CREATE_MOVIES_QUERY,
+     {"rows": [{"movie_id": 1, "title": "", "year": 0, "avg_rating": 0.0, "num_reviews": 0, "genres": ["Drama"]}]}),
+    ("create_user_ratings", CREATE_USER_RATINGS_QUERY, {"rows": [{"user_id": "1", "movie_id": 1, "rating": 4.0}]}),
+    ("get_similar_movies_graph", SIMILAR_MOVIES_QUERY, {"movie_id": 1, "limit": 5}),
+    ("get_movie_recommendations_for_user", USER_RECOMMENDATIONS_QUERY, {"user_id": "1", "limit": 5}),
+    ("get_shortest_path_between_movies", SHORTEST_PATH_QUERY % DEFAULT_PATH_DEPTH, {"movie1_id": 1, "movie2_id": 2}),
+    ("get_shortest_paths_from_movie", SHORTEST_PATHS_FROM_QUERY % DEFAULT_PATH_DEPTH,
+     {"movie_id": 1, "target_ids": [2, 3]}),
+]
+
+LABEL_SCAN_OPERATORS = {"NodeByLabelScan", "AllNodesScan"}
+
+def _label_scans(plan) -> List[str]:
+    """
+    Label/all-node scan operators anywhere in an EXPLAIN plan.
+    """
+    if not plan:
+        return []
+    operator = plan.get("operatorType", "").split("@")[0]
+    scans = [operator] if operator in LABEL_SCAN_OPERATORS else []
+    for child in plan.get("children", []):
+        scans.extend(_label_scans(child))
+    return scans
+
+def compact_path(record) -> Dict[str, Any]:
+    """
+    {"hops", "nodes"} of a path record; hops is None when no path was found.
+    """
+    if record is None or record["hops"] is None:
+        return {"hops": None, "nodes": []}
+    return {"hops": record["hops"], "nodes": record["nodes"]}
+
+def _depth(max_depth: int) -> int:
+    return max(1, min(int(max_depth), MAX_PATH_DEPTH))
+
+def movie_row(movie_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    UNWIND row for CREATE_MOVIES_QUERY from a movie document.
+    """
+    return {
+        "movie_id": int(movie_data['tmdb_id']),
+        "title": movie_data['title'],
+        "year": movie_data.get('year'),
+        "avg_rating": movie_data.get('avg_rating'),
+        "num_reviews": movie_data.get('num_reviews'),
+        "genres": list(movie_data.get('genres') or [])
+    }
+
+def rating_row(rating: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    UNWIND row for CREATE_USER_RATINGS_QUERY; movie_id is the Movie node's TMDB id.
+    """
+    return {"user_id": str(rating['user_id']), "movie_id": int(rating['movie_id']), "rating": float(rating['rating'])}
+
 class Neo4jGraph:
     def __init__(self):
         self.driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
@@ -14,6 +196,21 @@ class Neo4jGraph:
     def close(self):
         self.driver.close()
     
+    def ensure_schema(self):
+        """
+        Create the constraints and indexes in GRAPH_SCHEMA (existing ones are kept).
+        """
+        with self.driver.session() as session:
+            for statement in GRAPH_SCHEMA:
+                session.run(statement).consume()
+    
+    def label_scans(self, query: str, params: Dict[str, Any]) -> List[str]:
+        """
+        Label scan operators in the EXPLAIN plan of a query; nothing is executed.
+        """
+        with self.driver.session() as session:
+            return _label_scans(session.run("EXPLAIN " + query, **params).consume().plan)
+    
     def create_movie_node(self, movie_data: Dict[str, Any]):
         """
         Create a movie node in Neo4j.
@@ -23,14 +220,7 @@ class Neo4jGraph:
     
     @staticmethod
     def _create_movie(tx, movie_data):
-        query = """
-        MERGE (m:Movie {id: $movie_id})
-        SET m.title = $title,
-            m.year = $year,
-            m.avg_rating = $avg_rating,
-            m.num_reviews = $num_reviews
-        """
-        tx.run(query, 
+        tx.run(CREATE_MOVIE_QUERY,
                movie_id=movie_data['tmdb_id'],
                title=movie_data['title'],
                year=movie_data['year'],
@@ -46,15 +236,7 @@ class Neo4jGraph:
     
     @staticmethod
     def _create_genre_relationships(tx, movie_id, genres):
-        for genre in genres:
-            # Create genre node
-            tx.run("MERGE (g:Genre {name: $genre})", genre=genre)
-            # Create relationship
-            tx.run("""
-                MATCH (m:Movie {id: $movie_id})
-                MATCH (g:Genre {name: $genre})
-                MERGE (m)-[:BELONGS_TO]->(g)
-            """, movie_id=movie_id, genre=genre)
+        tx.run(LINK_GENRES_QUERY, movie_id=movie_id, genres=list(genres))
     
     def create_user_node(self, user_id: str, username: str):
         """
@@ -65,11 +247,7 @@ class Neo4jGraph:
     
     @staticmethod
     def _create_user(tx, user_id, username):
-        query = """
-        MERGE (u:User {id: $user_id})
-        SET u.username = $username
-        """
-        tx.run(query, user_id=user_id, username=username)
+        tx.run(CREATE_USER_QUERY, user_id=user_id, username=username)
     
     def create_user_rating(self, user_id: str, movie_id: int, rating: float):
         """
@@ -80,13 +258,33 @@ class Neo4jGraph:
     
     @staticmethod
     def _create_user_rating(tx, user_id, movie_id, rating):
-        query = """
-        MATCH (u:User {id: $user_id})
-        MATCH (m:Movie {id: $movie_id})
-        MERGE (u)-[r:RATED]->(m)
-        SET r.rating = $rating
+        tx.run(CREATE_USER_RATING_QUERY, user_id=user_id, movie_id=movie_id, rating=rating)
+    
+    def _write_rows(self, query: str, rows: List[Dict[str, Any]], batch_size: int) -> int:
+        """
+        Send rows through an UNWIND query, one transaction per batch_size rows.
+        """
+        with self.driver.session() as session:
+            for start in range(0, len(rows), batch_size):
+                session.execute_write(self._run_rows, query, rows[start:start + batch_size])
+        return len(rows)
+    
+    @staticmethod
+    def _run_rows(tx, query, rows):
+        tx.run(query, rows=rows).consume()
+    
+    def create_movie_nodes(self, movies: List[Dict[str, Any]], batch_size: int = GRAPH_BATCH_SIZE) -> int:
         """
-        tx.run(query, user_id=user_id, movie_id=movie_id, rating=rating)
+        Create or update many movie nodes and their genre relationships.
+        """
+        return self._write_rows(CREATE_MOVIES_QUERY, [movie_row(movie) for movie in movies], batch_size)
+    
+    def create_user_ratings(self, ratings: List[Dict[str, Any]], batch_size: int = GRAPH_BATCH_SIZE) -> int:
+        """
+        Create many rating relationships, creating missing user nodes.
+        Ratings of movies without a node are skipped.
+        """
+        return self._write_rows(CREATE_USER_RATINGS_QUERY, [rating_row(rating) for rating in ratings], batch_size)
     
     def get_similar_movies_graph(self, movie_id: int, limit: int = 5):
         """
@@ -98,15 +296,7 @@ class Neo4jGraph:
     
     @staticmethod
     def _get_similar_movies(tx, movie_id, limit):
-        query = """
-        MATCH (m1:Movie {id: $movie_id})-[:BELONGS_TO]->(g:Genre)<-[:BELONGS_TO]-(m2:Movie)
-        WHERE m1 <> m2
-        WITH m2, count(g) as shared_genres, m2.avg_rating as rating
-        ORDER BY shared_genres DESC, rating DESC
-        LIMIT $limit
-        RETURN m2.title as title, m2.id as id, shared_genres, rating
-        """
-        result = tx.run(query, movie_id=movie_id, limit=limit)
+        result = tx.run(SIMILAR_MOVIES_QUERY, movie_id=movie_id, limit=limit)
         return [record.data() for record in result]
     
     def get_movie_recommendations_for_user(self, user_id: str, limit: int = 5):
@@ -119,15 +309,7 @@ class Neo4jGraph:
     
     @staticmethod
     def _get_user_recommendations(tx, user_id, limit):
-        query = """
-        MATCH (u:User {id: $user_id})-[r:RATED]->(m1:Movie)-[:BELONGS_TO]->(g:Genre)<-[:BELONGS_TO]-(m2:Movie)
-        WHERE r.rating >= 4.0 AND NOT (u)-[:RATED]->(m2)
-        WITH m2, count(g) as genre_matches, avg(r.rating) as avg_user_rating, m2.avg_rating as movie_rating
-        ORDER BY genre_matches DESC, avg_user_rating DESC, movie_rating DESC
-        LIMIT $limit
-        RETURN m2.title as title, m2.id as id, genre_matches, movie_rating
-        """
-        result = tx.run(query, user_id=user_id, limit=limit)
+        result = tx.run(USER_RECOMMENDATIONS_QUERY, user_id=user_id, limit=limit)
         return [record.data() for record in result]
     
     def get_popular_genres(self, limit: int = 10):
@@ -140,34 +322,197 @@ class Neo4jGraph:
     
     @staticmethod
     def _get_popular_genres(tx, limit):
-        query = """
-        MATCH (g:Genre)<-[:BELONGS_TO]-(m:Movie)
-        WITH g, count(m) as movie_count, avg(m.avg_rating) as avg_rating
-        ORDER BY movie_count DESC, avg_rating DESC
-        LIMIT $limit
-        RETURN g.name as genre, movie_count, avg_rating
-        """
-        result = tx.run(query, limit=limit)
+        result = tx.run(POPULAR_GENRES_QUERY, limit=limit)
         return [record.data() for record in result]
     
-    def get_shortest_path_between_movies(self, movie1_id: int, movie2_id: int):
+    def get_shortest_path_between_movies(self, movie1_id: int, movie2_id: int, max_depth: int = DEFAULT_PATH_DEPTH):
         """
-        Neo4j Graph Query: Find shortest path between two movies through genres.
+        Neo4j Graph Query: Find shortest path between two movies through genres,
+        at most max_depth relationships long.
         """
         with self.driver.session() as session:
-            result = session.execute_read(self._get_shortest_path, movie1_id, movie2_id)
+            result = session.execute_read(self._get_shortest_path, movie1_id, movie2_id, _depth(max_depth))
             return result
     
     @staticmethod
-    def _get_shortest_path(tx, movie1_id, movie2_id):
-        query = """
-        MATCH path = shortestPath(
-            (m1:Movie {id: $movie1_id})-[:BELONGS_TO*]-(m2:Movie {id: $movie2_id})
-        )
-        RETURN path
-        """
-        result = tx.run(query, movie1_id=movie1_id, movie2_id=movie2_id)
-        return [record.data() for record in result]
+    @unit_of_work(timeout=PATH_QUERY_TIMEOUT)
+    def _get_shortest_path(tx, movie1_id, movie2_id, max_depth):
+        result = tx.run(SHORTEST_PATH_QUERY % max_depth, movie1_id=movie1_id, movie2_id=movie2_id)
+        return compact_path(result.single())
+    
+    def get_shortest_paths_from_movie(self, movie_id: int, target_ids: List[int],
+                                      max_depth: int = DEFAULT_PATH_DEPTH) -> Dict[int, Dict[str, Any]]:
+        """
+        Neo4j Graph Query: Shortest paths from one movie to many, in a single query.
+        Returns target id -> path; unknown targets are left out.
+        """
+        with self.driver.session() as session:
+            return session.execute_read(self._get_shortest_paths_from, movie_id, target_ids, _depth(max_depth))
+    
+    @staticmethod
+    @unit_of_work(timeout=PATH_QUERY_TIMEOUT)
+    def _get_shortest_paths_from(tx, movie_id, target_ids, max_depth):
+        result = tx.run(SHORTEST_PATHS_FROM_QUERY % max_depth, movie_id=movie_id, target_ids=target_ids)
+        return {record["target_id"]: compact_path(record) for record in result}
 
 # Global Neo4j instance
-neo4j_graph = Neo4jGraph() 
\ No newline at end of file
+neo4j_graph = Neo4jGraph()
+
+class AsyncNeo4jGraph:
+    """
+    Neo4jGraph counterpart on the asyncio driver, used when ASYNC_DRIVERS is enabled.
+    """
+    def __init__(self):
+        self.driver = AsyncGraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    
+    async def close(self):
+        await self.driver.close()
+    
+    async def _write(self, query: str, **params):
+        async with self.driver.session() as session:
+            async def work(tx):
+                result = await tx.run(query, **params)
+                await result.consume()
+            await session.execute_write(work)
+    
+    async def _read(self, query: str, timeout: float = None, **params) -> List[Dict[str, Any]]:
+        async with self.driver.session() as session:
+            @unit_of_work(timeout=timeout)
+            async def work(tx):
+                result = await tx.run(query, **params)
+                return [record.data() async for record in result]
+            return await session.execute_read(work)
+    
+    async def ensure_schema(self):
+        async with self.driver.session() as session:
+            for statement in GRAPH_SCHEMA:
+                result = await session.run(statement)
+                await result.consume()
+    
+    async def label_scans(self, query: str, params: Dict[str, Any]) -> List[str]:
+        async with self.driver.session() as session:
+            result = await session.run("EXPLAIN " + query, **params)
+            return _label_scans((await result.consume()).plan)
+    
+    async def create_movie_node(self, movie_data: Dict[str, Any]):
+        await self._write(CREATE_MOVIE_QUERY,
+                          movie_id=movie_data['tmdb_id'],
+                          title=movie_data['title'],
+                          year=movie_data['year'],
+                          avg_rating=movie_data['avg_rating'],
+                          num_reviews=movie_data['num_reviews'])
+    
+    async def create_genre_relationships(self, movie_id: int, genres: List[str]):
+        await self._write(LINK_GENRES_QUERY, movie_id=movie_id, genres=list(genres))
+    
+    async def create_user_node(self, user_id: str, username: str):
+        await self._write(CREATE_USER_QUERY, user_id=user_id, username=username)
+    
+    async def create_user_rating(self, user_id: str, movie_id: int, rating: float):
+        await self._write(CREATE_USER_RATING_QUERY, user_id=user_id, movie_id=movie_id, rating=rating)
+    
+    async def _write_rows(self, query: str, rows: List[Dict[str, Any]], batch_size: int) -> int:
+        async with self.driver.session() as session:
+            for start in range(0, len(rows), batch_size):
+                async def work(tx, batch=rows[start:start + batch_size]):
+                    result = await tx.run(query, rows=batch)
+                    await result.consume()
+                await session.execute_write(work)
+        return len(rows)
+    
+    async def create_movie_nodes(self, movies: List[Dict[str, Any]], batch_size: int = GRAPH_BATCH_SIZE) -> int:
+        return await self._write_rows(CREATE_MOVIES_QUERY, [movie_row(movie) for movie in movies], batch_size)
+    
+    async def create_user_ratings(self, ratings: List[Dict[str, Any]], batch_size: int = GRAPH_BATCH_SIZE) -> int:
+        return await self._write_rows(CREATE_USER_RATINGS_QUERY, [rating_row(rating) for rating in ratings], batch_size)
+    
+    async def get_similar_movies_graph(self, movie_id: int, limit: int = 5):
+        return await self._read(SIMILAR_MOVIES_QUERY, movie_id=movie_id, limit=limit)
+    
+    async def get_movie_recommendations_for_user(self, user_id: str, limit: int = 5):
+        return await self._read(USER_RECOMMENDATIONS_QUERY, user_id=user_id, limit=limit)
+    
+    async def get_popular_genres(self, limit: int = 10):
+        return await self._read(POPULAR_GENRES_QUERY, limit=limit)
+    
+    async def get_shortest_path_between_movies(self, movie1_id: int, movie2_id: int, max_depth: int = DEFAULT_PATH_DEPTH):
+        records = await self._read(SHORTEST_PATH_QUERY % _depth(max_depth), PATH_QUERY_TIMEOUT,
+                                   movie1_id=movie1_id, movie2_id=movie2_id)
+        return compact_path(records[0] if records else None)
+    
+    async def get_shortest_paths_from_movie(self, movie_id: int, target_ids: List[int],
+                                            max_depth: int = DEFAULT_PATH_DEPTH) -> Dict[int, Dict[str, Any]]:
+        records = await self._read(SHORTEST_PATHS_FROM_QUERY % _depth(max_depth), PATH_QUERY_TIMEOUT,
+                                   movie_id=movie_id, target_ids=target_ids)
+        return {record["target_id"]: compact_path(record) for record in records}
+
+_async_graph = None
+
+def get_graph():
+    """
+    FastAPI dependency returning an awaitable graph client: AsyncNeo4jGraph with
+    ASYNC_DRIVERS enabled, otherwise the global Neo4jGraph run in the threadpool.
+    """
+    global _async_graph
+    if _async_graph is None:
+        _async_graph = AsyncNeo4jGraph() if ASYNC_DRIVERS else ThreadedProxy(neo4j_graph)
+    return _async_graph
+
+async def close_graph():
+    """
+    Close the driver behind get_graph().
+    """
+    global _async_graph
+    if _async_graph is not None:
+        await _async_graph.close()
+        _async_graph = None
+
+def is_timeout(error: Exception) -> bool:
+    """
+    Whether a driver error is the server aborting a transaction past its timeout.
+    """
+    return "TransactionTimedOut" in (getattr(error, "code", None) or "")
+
+async def report_label_scans(graph) -> List[str]:
+    """
+    EXPLAIN every anchored query and return those still planning a label scan.
+    """
+    scanning = []
+    for name, query, params in GRAPH_QUERY_PATTERNS:
+        scans = await graph.label_scans(query, params)
+        if scans:
+            scanning.append(f"{name} ({', '.join(sorted(set(scans)))})")
+    return scanning
+
+async def provision_graph_schema(graph):
+    """
+    Startup hook: create the constraints and indexes, then check every query
+    for label scans. Neo4j being unavailable does not block startup; a label
+    scan is logged, or raises RuntimeError (aborting startup) with GRAPH_SCHEMA_STRICT.
+    """
+    try:
+        await graph.ensure_schema()
+        scanning = await report_label_scans(graph)
+    except Exception as e:
+        print(f"❌ Error provisioning Neo4j schema: {e}")
+        return
+    if scanning:
+        message = f"Neo4j queries planning label scans: {'; '.join(scanning)}"
+        if GRAPH_SCHEMA_STRICT:
+            raise RuntimeError(message)
+        print(f"❌ {message}")
+    else:
+        print("✅ All anchored Neo4j queries are index-backed")
+
+if __name__ == "__main__":
+    # Deploy/CI check: exits non-zero when a query still plans a label scan
+    async def main():
+        graph = ThreadedProxy(neo4j_graph)
+        await graph.ensure_schema()
+        scanning = await report_label_scans(graph)
+        for name in scanning:
+            print(f"LABEL SCAN: {name}")
+        neo4j_graph.close()
+        return 1 if scanning else 0
+
+    sys.exit(asyncio.run(main()))
@@ -1,7 +1,9 @@
 import os
 import redis
+import redis.asyncio
 import json
 from typing import Optional, Any
+from db.aio import ASYNC_DRIVERS, ThreadedRedis
 
 # Get Redis connection details from environment variables or use defaults
 REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
@@ -17,6 +19,33 @@ def get_redis_client():
     """
     return redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, decode_responses=True)
 
+_async_redis_client = None
+
+def get_async_redis_client():
+    """
+    Returns the shared awaitable Redis client used by route handlers.
+    With ASYNC_DRIVERS enabled this is a redis.asyncio client, otherwise a
+    redis-py client whose commands run in the threadpool.
+    """
+    global _async_redis_client
+    if _async_redis_client is None:
+        if ASYNC_DRIVERS:
+            _async_redis_client = redis.asyncio.Redis(
+                host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, decode_responses=True
+            )
+        else:
+            _async_redis_client = ThreadedRedis(get_redis_client())
+    return _async_redis_client
+
+async def close_async_redis_client():
+    """
+    Close the shared awaitable Redis client and its connection pool.
+    """
+    global _async_redis_client
+    if _async_redis_client is not None:
+        await _async_redis_client.close()
+        _async_redis_client = None
+
 class RedisCache:
     def __init__(self):
         self.redis_client = redis.Redis(
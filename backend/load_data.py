@@ -1,141 +1,364 @@
-import pandas as pd
-from db.mongo import get_mongo_client
-import json
+import os
 import ast
-from datetime import datetime
+import json
+import asyncio
+import time
+import hashlib
+import argparse
+import pandas as pd
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from db.mongo import get_mongo_client, MONGO_DB
+from db.aio import ThreadedDatabase
+from db.indexes import ensure_indexes
+from db.neo4j import neo4j_graph, GRAPH_BATCH_SIZE
+from services.search import normalize_title
+from services.autocomplete import build_autocomplete_index
+from services.sampling import backfill_random_keys
+from services.similarity import refresh_similarity_index
+from services.movie_stats import refresh_movie_stats
 
-def parse_json_column(json_str):
+# Rows read from the CSV per chunk, documents per insert_many, parallel writers
+LOAD_CHUNK_SIZE = int(os.getenv('LOAD_CHUNK_SIZE', 50000))
+LOAD_BATCH_SIZE = int(os.getenv('LOAD_BATCH_SIZE', 5000))
+LOAD_WORKERS = int(os.getenv('LOAD_WORKERS', 1))
+
+# Genre/keyword names inside the Python-literal or JSON lists of the datasets,
+# e.g. "[{'id': 16, 'name': 'Animation'}, {'id': 9, 'name': "children's book"}]".
+# The name is captured with its quotes; either quote may appear inside the other.
+GENRE_NAME_PATTERN = r"""['"]name['"]:\s*('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")"""
+
+RATINGS_DTYPES = {"userId": "int64", "movieId": "int64", "rating": "float64", "timestamp": "int64"}
+
+class BatchWriter:
     """
-    Parse JSON-like strings from CSV columns.
+    Sends documents to a collection as unordered insert_many batches,
+    optionally from several threads, and reports throughput.
     """
-    if pd.isna(json_str) or json_str == '':
-        return []
-    try:
-        # Try to parse as literal string (for Python dict format)
-        return ast.literal_eval(json_str)
-    except:
+    def __init__(self, collection, batch_size: int = LOAD_BATCH_SIZE, workers: int = LOAD_WORKERS, label: str = "rows"):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.workers = max(1, workers)
+        self.label = label
+        self.counts = Counter()
+        self.rows = 0
+        self.started = time.perf_counter()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        self._pending = []
+
+    def write_batch(self, batch: list) -> Counter:
         try:
-            # Try to parse as JSON
-            return json.loads(json_str)
-        except:
-            return []
+            return Counter(inserted=len(self.collection.insert_many(batch, ordered=False).inserted_ids))
+        except BulkWriteError as e:
+            inserted = e.details.get("nInserted", 0)
+            return Counter(inserted=inserted, failed=len(batch) - inserted)
+
+    def write(self, documents: list):
+        for start in range(0, len(documents), self.batch_size):
+            batch = documents[start:start + self.batch_size]
+            if self._pool is None:
+                self.counts.update(self.write_batch(batch))
+                continue
+            self._pending.append(self._pool.submit(self.write_batch, batch))
+            # Keep at most two batches per worker in flight so memory stays flat
+            while len(self._pending) >= self.workers * 2:
+                self.counts.update(self._pending.pop(0).result())
+        self.rows += len(documents)
+        print(f"  {self.rows} {self.label} processed, {self.rate():.0f} rows/sec")
+
+    def rate(self) -> float:
+        return self.rows / max(time.perf_counter() - self.started, 1e-9)
+
+    def close(self):
+        for future in self._pending:
+            self.counts.update(future.result())
+        self._pending = []
+        if self._pool is not None:
+            self._pool.shutdown()
+        elapsed = time.perf_counter() - self.started
+        summary = ", ".join(f"{count} {name}" for name, count in sorted(self.counts.items()))
+        print(f"Successfully processed {self.rows} {self.label} in {elapsed:.1f}s "
+              f"({self.rate():.0f} rows/sec): {summary or 'nothing written'}")
 
-def extract_genres(genres_str):
+class SyncWriter(BatchWriter):
     """
-    Extract genre names from the genres JSON string.
+    Idempotent variant of BatchWriter: upserts documents keyed on `key_fields`
+    with bulk_write and skips rows whose content_hash is unchanged.
     """
-    genres_list = parse_json_column(genres_str)
-    if isinstance(genres_list, list):
-        return [genre.get('name', '') for genre in genres_list if isinstance(genre, dict)]
-    return []
+    def __init__(self, collection, key_fields: tuple, batch_size: int = LOAD_BATCH_SIZE,
+                 workers: int = LOAD_WORKERS, label: str = "rows", preserve_if=None):
+        super().__init__(collection, batch_size, workers, label)
+        self.key_fields = key_fields
+        # {field: marker} - keep the stored field when the stored document has `marker`
+        self.preserve_if = preserve_if or {}
+
+    def _key(self, document):
+        return tuple(document[field] for field in self.key_fields)
+
+    def _existing_hashes(self, batch) -> dict:
+        query = {field: {"$in": list({document[field] for document in batch})} for field in self.key_fields}
+        projection = {field: 1 for field in self.key_fields}
+        projection.update({"content_hash": 1, "_id": 0})
+        return {self._key(doc): doc.get("content_hash") for doc in self.collection.find(query, projection)}
+
+    def _update(self, document):
+        if not self.preserve_if:
+            return {"$set": document}
+        # Pipeline update so preserved fields can depend on the stored document;
+        # $literal keeps dataset strings starting with "$" from being read as field paths
+        values = {name: {"$literal": value} for name, value in document.items() if name not in self.preserve_if}
+        preserved = {
+            name: {"$cond": [
+                {"$eq": [{"$type": f"${marker}"}, "missing"]},
+                {"$literal": document[name]},
+                f"${name}"
+            ]}
+            for name, marker in self.preserve_if.items() if name in document
+        }
+        return [{"$set": values}, {"$set": preserved}]
+
+    def write_batch(self, batch: list) -> Counter:
+        # Last occurrence wins when the dataset repeats a key
+        latest = {}
+        for document in batch:
+            document["content_hash"] = content_hash(document)
+            latest[self._key(document)] = document
 
-def extract_year_from_date(date_str):
+        existing = self._existing_hashes(list(latest.values()))
+        operations = [
+            UpdateOne(dict(zip(self.key_fields, key)), self._update(document), upsert=True)
+            for key, document in latest.items()
+            if existing.get(key) != document["content_hash"]
+        ]
+        counts = Counter(unchanged=len(latest) - len(operations), duplicate=len(batch) - len(latest))
+        if not operations:
+            return counts
+        try:
+            result = self.collection.bulk_write(operations, ordered=False)
+            counts.update(inserted=result.upserted_count, updated=result.modified_count)
+        except BulkWriteError as e:
+            details = e.details
+            counts.update(inserted=details.get("nUpserted", 0), updated=details.get("nModified", 0),
+                          failed=len(details.get("writeErrors", [])))
+        return +counts
+
+class GraphWriter(BatchWriter):
     """
-    Extract year from release date string.
+    BatchWriter counterpart for Neo4j: `write_rows` sends each batch as one
+    UNWIND transaction (e.g. neo4j_graph.create_movie_nodes).
     """
-    if pd.isna(date_str) or date_str == '':
-        return 0
-    try:
-        return pd.to_datetime(date_str).year
-    except:
-        return 0
+    def __init__(self, write_rows, batch_size: int = GRAPH_BATCH_SIZE, workers: int = 1, label: str = "rows"):
+        super().__init__(None, batch_size, workers, label)
+        self.write_rows = write_rows
+
+    def write_batch(self, batch: list) -> Counter:
+        try:
+            return Counter(merged=self.write_rows(batch, self.batch_size))
+        except Exception as e:
+            print(f"  Graph batch error: {e}")
+            return Counter(failed=len(batch))
 
-def load_movies_from_csv(csv_file_path):
+def content_hash(document: dict) -> str:
+    """
+    Stable hash of a document's dataset fields, used to skip unchanged rows.
     """
-    Load movies from movies_metadata.csv into MongoDB.
+    fields = {name: value for name, value in document.items() if name not in ("_id", "content_hash")}
+    return hashlib.sha1(json.dumps(fields, sort_keys=True, default=str).encode()).hexdigest()
+
+def _unquote(literal: str) -> str:
+    # Only names with escapes (e.g. \xa0) need a full string-literal parse
+    return ast.literal_eval(literal) if "\\" in literal else literal[1:-1]
+
+def extract_names(column: pd.Series) -> pd.Series:
+    """
+    Extract name lists from a genres or keywords column.
+    """
+    return column.fillna("").astype(str).str.findall(GENRE_NAME_PATTERN).map(
+        lambda names: [_unquote(name) for name in names]
+    )
+
+def extract_years(release_dates: pd.Series) -> pd.Series:
+    """
+    Extract release years from the release_date column (0 when missing or invalid).
+    """
+    return pd.to_datetime(release_dates, errors="coerce").dt.year.fillna(0).astype(int)
+
+def _numeric(column: pd.Series, kind=float) -> pd.Series:
+    return pd.to_numeric(column, errors="coerce").fillna(0).astype(kind)
+
+def movies_from_chunk(chunk: pd.DataFrame) -> list:
+    """
+    Convert a chunk of movies_metadata.csv into movie documents.
+    Rows whose id is not numeric (corrupted lines in the dataset) are skipped.
+    """
+    ids = pd.to_numeric(chunk["id"], errors="coerce")
+    chunk = chunk[ids.notna()]
+    text = lambda name: chunk[name].fillna("").astype(str)
+
+    frame = pd.DataFrame({
+        "title": text("title"),
+        "title_norm": text("title").map(normalize_title),
+        "year": extract_years(chunk["release_date"]),
+        "genres": extract_names(chunk["genres"]),
+        "keywords": extract_names(chunk["keywords"]) if "keywords" in chunk else [[] for _ in range(len(chunk))],
+        "description": text("overview"),
+        "director": "",  # Not available in this dataset
+        "poster_url": "",  # Not available in this dataset
+        "avg_rating": _numeric(chunk["vote_average"]),
+        "num_reviews": _numeric(chunk["vote_count"], int),
+        "tmdb_id": ids[ids.notna()].astype(int),
+        "popularity": _numeric(chunk["popularity"]),
+        "budget": _numeric(chunk["budget"], int),
+        "revenue": _numeric(chunk["revenue"], int),
+        "runtime": _numeric(chunk["runtime"]),
+        "tagline": text("tagline")
+    })
+    movies = frame.to_dict("records")
+    for movie in movies:
+        movie["cast"] = []  # Not available in this dataset
+    return movies
+
+def reviews_from_chunk(chunk: pd.DataFrame) -> list:
+    """
+    Convert a chunk of a MovieLens ratings file into review documents.
+    """
+    created_at = pd.to_datetime(chunk["timestamp"], unit="s").dt.to_pydatetime()
+    return [
+        {"user_id": user_id, "movie_id": movie_id, "rating": rating, "review": "", "created_at": created}
+        for user_id, movie_id, rating, created in zip(
+            chunk["userId"].astype(str).tolist(),
+            chunk["movieId"].astype(str).tolist(),
+            chunk["rating"].tolist(),
+            created_at
+        )
+    ]
+
+def load_movies_from_csv(csv_file_path, chunk_size=LOAD_CHUNK_SIZE, batch_size=LOAD_BATCH_SIZE, workers=LOAD_WORKERS, sync=False):
+    """
+    Stream movies from movies_metadata.csv into MongoDB chunk by chunk.
+    With sync=True movies are upserted by tmdb_id and unchanged rows are skipped.
     """
     try:
-        # Read the CSV file
-        df = pd.read_csv(csv_file_path)
-        
-        # Connect to MongoDB
-        client = get_mongo_client()
-        db = client["cinemate"]
-        movies = db["movies"]
-        
-        # Convert DataFrame to list of dictionaries
-        movies_data = []
-        for _, row in df.iterrows():
-            # Extract genres
-            genres = extract_genres(row.get("genres", ""))
-            
-            # Extract year from release date
-            year = extract_year_from_date(row.get("release_date", ""))
-            
-            movie = {
-                "title": row.get("title", ""),
-                "year": year,
-                "genres": genres,
-                "description": row.get("overview", ""),
-                "director": "",  # Not available in this dataset
-                "cast": [],      # Not available in this dataset
-                "poster_url": "", # Not available in this dataset
-                "avg_rating": float(row.get("vote_average", 0)),
-                "num_reviews": int(row.get("vote_count", 0)),
-                "tmdb_id": int(row.get("id", 0)),
-                "popularity": float(row.get("popularity", 0)),
-                "budget": int(row.get("budget", 0)),
-                "revenue": int(row.get("revenue", 0)),
-                "runtime": float(row.get("runtime", 0)) if pd.notna(row.get("runtime")) else 0,
-                "tagline": row.get("tagline", "")
-            }
-            movies_data.append(movie)
-        
-        # Insert movies into MongoDB
-        if movies_data:
-            result = movies.insert_many(movies_data)
-            print(f"Successfully loaded {len(result.inserted_ids)} movies")
+        movies = get_mongo_client()[MONGO_DB]["movies"]
+        if sync:
+            # Ratings driven by the reviews collection (rating_sum present) are left alone
+            writer = SyncWriter(movies, ("tmdb_id",), batch_size, workers, label="movies",
+                                preserve_if={"avg_rating": "rating_sum", "num_reviews": "rating_sum"})
         else:
-            print("No movies to load")
-            
+            writer = BatchWriter(movies, batch_size, workers, label="movies")
+        for chunk in pd.read_csv(csv_file_path, chunksize=chunk_size, dtype=str, keep_default_na=True):
+            writer.write(movies_from_chunk(chunk))
+        writer.close()
     except Exception as e:
         print(f"Error loading movies: {e}")
 
-def load_ratings_from_csv(csv_file_path):
+def load_ratings_from_csv(csv_file_path, chunk_size=LOAD_CHUNK_SIZE, batch_size=LOAD_BATCH_SIZE, workers=LOAD_WORKERS, sync=False):
     """
-    Load user ratings from ratings_small.csv into MongoDB.
+    Stream user ratings from a MovieLens ratings file (ratings_small.csv or the
+    full ratings.csv) into MongoDB chunk by chunk.
+    With sync=True reviews are upserted by (user_id, movie_id) and unchanged rows are skipped.
     """
     try:
-        # Read the CSV file
-        df = pd.read_csv(csv_file_path)
-        
-        # Connect to MongoDB
-        client = get_mongo_client()
-        db = client["cinemate"]
-        reviews = db["reviews"]
-        
-        # Convert DataFrame to list of dictionaries
-        reviews_data = []
-        for _, row in df.iterrows():
-            # Convert timestamp to datetime
-            timestamp = datetime.fromtimestamp(row.get("timestamp", 0))
-            
-            review = {
-                "user_id": str(row.get("userId", "")),
-                "movie_id": str(row.get("movieId", "")),
-                "rating": float(row.get("rating", 0)),
-                "review": "",  # No review text in this dataset
-                "created_at": timestamp
-            }
-            reviews_data.append(review)
-        
-        # Insert reviews into MongoDB
-        if reviews_data:
-            result = reviews.insert_many(reviews_data)
-            print(f"Successfully loaded {len(result.inserted_ids)} reviews")
+        reviews = get_mongo_client()[MONGO_DB]["reviews"]
+        if sync:
+            writer = SyncWriter(reviews, ("user_id", "movie_id"), batch_size, workers, label="reviews")
         else:
-            print("No reviews to load")
-            
+            writer = BatchWriter(reviews, batch_size, workers, label="reviews")
+        for chunk in pd.read_csv(csv_file_path, chunksize=chunk_size, dtype=RATINGS_DTYPES):
+            writer.write(reviews_from_chunk(chunk))
+        writer.close()
     except Exception as e:
         print(f"Error loading reviews: {e}")
 
+def load_graph_from_csv(movies_csv_path, ratings_csv_path, links_csv_path, chunk_size=LOAD_CHUNK_SIZE, batch_size=GRAPH_BATCH_SIZE):
+    """
+    Build the Neo4j graph (movies, genres, users and ratings) from the datasets
+    with batched UNWIND writes. MovieLens movie ids are mapped to TMDB ids through
+    links.csv; ratings of movies without a TMDB id are skipped.
+    """
+    try:
+        movies = GraphWriter(neo4j_graph.create_movie_nodes, batch_size, label="movie nodes")
+        for chunk in pd.read_csv(movies_csv_path, chunksize=chunk_size, dtype=str, keep_default_na=True):
+            movies.write(movies_from_chunk(chunk))
+        movies.close()
+
+        links = pd.read_csv(links_csv_path, usecols=["movieId", "tmdbId"]).dropna()
+        tmdb_ids = pd.Series(links["tmdbId"].astype("int64").values, index=links["movieId"].astype("int64").values)
+        tmdb_ids = tmdb_ids[~tmdb_ids.index.duplicated()]
+        ratings = GraphWriter(neo4j_graph.create_user_ratings, batch_size, label="ratings")
+        for chunk in pd.read_csv(ratings_csv_path, chunksize=chunk_size, dtype=RATINGS_DTYPES):
+            movie_ids = chunk["movieId"].map(tmdb_ids)
+            chunk = chunk[movie_ids.notna()]
+            ratings.write([
+                {"user_id": user_id, "movie_id": movie_id, "rating": rating}
+                for user_id, movie_id, rating in zip(
+                    chunk["userId"].astype(str).tolist(),
+                    movie_ids[movie_ids.notna()].astype("int64").tolist(),
+                    chunk["rating"].tolist()
+                )
+            ])
+        ratings.close()
+    except Exception as e:
+        print(f"Error loading graph: {e}")
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load the movie and ratings datasets into MongoDB (and optionally Neo4j)")
+    parser.add_argument("--movies", default="../datasets/movies_metadata.csv")
+    parser.add_argument("--ratings", default="../datasets/ratings_small.csv")
+    parser.add_argument("--links", default="../datasets/links_small.csv", help="MovieLens to TMDB ids, used by --graph")
+    parser.add_argument("--chunk-size", type=int, default=LOAD_CHUNK_SIZE)
+    parser.add_argument("--batch-size", type=int, default=LOAD_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=LOAD_WORKERS)
+    parser.add_argument("--sync", action="store_true",
+                        help="Upsert by tmdb_id / (user_id, movie_id) and skip unchanged rows instead of inserting")
+    parser.add_argument("--graph", action="store_true", help="Also build the Neo4j graph from the datasets")
+    parser.add_argument("--graph-batch-size", type=int, default=GRAPH_BATCH_SIZE)
+    args = parser.parse_args()
+
+    # Unique tmdb_id / (user_id, movie_id) indexes make reloads safe and --sync lookups fast
+    print("Ensuring indexes...")
+    asyncio.run(ensure_indexes(ThreadedDatabase(get_mongo_client()[MONGO_DB])))
+
     # Load movies from movies_metadata.csv
     print("Loading movies...")
-    load_movies_from_csv("../datasets/movies_metadata.csv")
-    
-    # Load ratings from ratings_small.csv
+    load_movies_from_csv(args.movies, args.chunk_size, args.batch_size, args.workers, args.sync)
+
+    # Random keys for constant-cost sampling of new movies
+    asyncio.run(backfill_random_keys(ThreadedDatabase(get_mongo_client()[MONGO_DB])))
+
+    # Typeahead prefix index in Redis, built from the loaded movies
+    print("\nBuilding autocomplete index...")
+    try:
+        print(f"Indexed {build_autocomplete_index(get_mongo_client()[MONGO_DB])} movies for autocomplete")
+    except Exception as e:
+        print(f"Error building autocomplete index: {e}")
+
+    # Add new movies to the similarity index (built separately with services.similarity)
+    try:
+        added = refresh_similarity_index(get_mongo_client()[MONGO_DB])
+        if added:
+            print(f"Added {added} movies to the similarity index")
+    except Exception as e:
+        print(f"Error refreshing similarity index: {e}")
+
+    # Rebuild the analytics rollups (genre, year and decade stats) from the loaded movies
+    try:
+        counts = asyncio.run(refresh_movie_stats(ThreadedDatabase(get_mongo_client()[MONGO_DB])))
+        if counts is None:
+            print("Movie stats rebuild already running in the API; skipped")
+        else:
+            print(f"Movie stats rebuilt: {', '.join(f'{count} {kind}' for kind, count in counts.items())}")
+    except Exception as e:
+        print(f"Error rebuilding movie stats: {e}")
+
+    # Load ratings from the ratings file
     print("\nLoading ratings...")
-    load_ratings_from_csv("../datasets/ratings_small.csv")
-    
-    print("\nData loading complete!") 
\ No newline at end of file
+    load_ratings_from_csv(args.ratings, args.chunk_size, args.batch_size, args.workers, args.sync)
+
+    if args.graph:
+        print("\nBuilding Neo4j graph...")
+        load_graph_from_csv(args.movies, args.ratings, args.links, args.chunk_size, args.graph_batch_size)
+
+    print("\nData loading complete!")
@@ -1,4 +1,18 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends
+from db.aio import ASYNC_DRIVERS
+from db.mongo import get_mongo_client, close_mongo_client, get_async_mongo_client, close_async_mongo_client, get_db
+from db.redis import close_async_redis_client
+from db.neo4j import close_graph, get_graph, provision_graph_schema
+from services.invalidation import listen_for_invalidations
+from services.movie_stats import maintain_movie_stats
+from services.catalog import maintain_catalog
+from services.cache import maintain_cache_stats, flush_cache_stats
+from services.serialization import FastJSONResponse
+from db.indexes import provision_indexes
+from services.search import backfill_title_norm
+from services.sampling import backfill_random_keys
 
 # Import routes with error handling
 try:
@@ -29,10 +43,85 @@ except Exception as e:
     print(f"❌ Error importing graph routes: {e}")
     graph_router = None
 
+try:
+    from routes.cache import router as cache_router
+    print("✅ Cache routes imported successfully")
+except Exception as e:
+    print(f"❌ Error importing cache routes: {e}")
+    cache_router = None
+
+try:
+    from routes.export import router as export_router
+    print("✅ Export routes imported successfully")
+except Exception as e:
+    print(f"❌ Error importing export routes: {e}")
+    export_router = None
+
+try:
+    from routes.recommendation import router as recommendation_router
+    print("✅ Recommendation routes imported successfully")
+except Exception as e:
+    print(f"❌ Error importing recommendation routes: {e}")
+    recommendation_router = None
+
+async def prepare_mongo(db):
+    """
+    Startup maintenance of MongoDB: indexes, then backfills of derived fields.
+    Like Neo4j, MongoDB being unavailable is logged and does not block startup.
+    """
+    try:
+        await db.command("ping")
+    except Exception as e:
+        print(f"❌ MongoDB unreachable, skipping index provisioning and backfills: {e}")
+        return
+    await provision_indexes(db)
+    for backfill, message in ((backfill_title_norm, "Normalized titles added to {} movies"),
+                              (backfill_random_keys, "Random sampling keys added to {} movies")):
+        try:
+            backfilled = await backfill(db)
+        except Exception as e:
+            print(f"❌ Error in {backfill.__name__}: {e}")
+            continue
+        if backfilled:
+            print(f"✅ {message.format(backfilled)}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Open the shared database clients on startup and close them on shutdown.
+    """
+    if ASYNC_DRIVERS:
+        get_async_mongo_client()
+        print("✅ MongoDB connection pool created (async drivers)")
+    else:
+        get_mongo_client()
+        print("✅ MongoDB connection pool created")
+    await prepare_mongo(get_db())
+    await provision_graph_schema(get_graph())
+    invalidation_listener = asyncio.create_task(listen_for_invalidations())
+    stats_refresher = asyncio.create_task(maintain_movie_stats(get_db))
+    catalog_refresher = asyncio.create_task(maintain_catalog(get_db))
+    cache_stats_flusher = asyncio.create_task(maintain_cache_stats())
+    yield
+    for task in (invalidation_listener, stats_refresher, catalog_refresher, cache_stats_flusher):
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    await flush_cache_stats()
+    close_async_mongo_client()
+    close_mongo_client()
+    await close_async_redis_client()
+    await close_graph()
+    print("✅ Database connections closed")
+
 app = FastAPI(
     title="CineMate API",
     description="A comprehensive movie recommendation system using MongoDB, Redis, and Neo4j",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # Include routers only if they were imported successfully
@@ -52,6 +141,18 @@ if graph_router:
     app.include_router(graph_router)
     print("✅ Graph router included")
 
+if cache_router:
+    app.include_router(cache_router)
+    print("✅ Cache router included")
+
+if export_router:
+    app.include_router(export_router)
+    print("✅ Export router included")
+
+if recommendation_router:
+    app.include_router(recommendation_router)
+    print("✅ Recommendation router included")
+
 @app.get("/")
 def root():
     return {
@@ -64,27 +165,31 @@ def root():
             "movies": "/movies/",
             "reviews": "/reviews/",
             "users": "/users/",
-            "graph": "/graph/"
+            "graph": "/graph/",
+            "cache": "/cache/stats",
+            "export": "/export/",
+            "recommendations": "/recommendations/cf/{user_id}"
         }
     }
 
 @app.get("/health")
 def health_check():
-    return {"status": "ok", "message": "CineMate API is running"}
+    return {
+        "status": "ok",
+        "message": "CineMate API is running",
+        "drivers": "async" if ASYNC_DRIVERS else "sync"
+    }
 
 @app.get("/test-movies")
-def test_movies():
+async def test_movies(db=Depends(get_db)):
     """
     Simple test endpoint to check if we can access movies.
     """
     try:
-        from db.mongo import get_mongo_client
-        client = get_mongo_client()
-        db = client["cinemate"]
         movies = db["movies"]
         
         # Just get the count
-        count = movies.count_documents({})
+        count = await movies.count_documents({})
         return {"message": "Database connection works", "movie_count": count}
         
     except Exception as e:
@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class GraphMovie(BaseModel):
+    tmdb_id: int  # Movie node id
+    title: str  # Movie title
+    year: Optional[int] = None  # Release year
+    avg_rating: Optional[float] = 0.0  # Average rating
+    num_reviews: Optional[int] = 0  # Number of reviews
+    genres: List[str] = []  # Genres linked with BELONGS_TO
+
+class GraphRating(BaseModel):
+    user_id: str  # User node id (created when missing)
+    movie_id: int  # TMDB id of the rated Movie node
+    rating: float  # Rating value
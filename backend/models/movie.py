@@ -10,4 +10,7 @@ class Movie(BaseModel):
     cast: List[str] = []  # List of cast members
     poster_url: Optional[str] = None  # Link to poster image
     avg_rating: Optional[float] = 0.0  # Average rating
-    num_reviews: Optional[int] = 0  # Number of reviews 
\ No newline at end of file
+    num_reviews: Optional[int] = 0  # Number of reviews
+
+class MovieBatch(BaseModel):
+    ids: List[str]  # Movie ObjectIds and/or TMDB ids, in the order results are wanted
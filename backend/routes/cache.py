@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+from services.cache import get_cache_stats
+
+router = APIRouter()
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """
+    Read-through cache hit/miss counters per endpoint namespace.
+    """
+    return await get_cache_stats()
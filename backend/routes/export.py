@@ -0,0 +1,60 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from db.mongo import get_db
+from services.analytics import ANALYTICS_PIPELINES
+from services.projection import INTERNAL_FIELDS
+from services.export import stream_export, field_projection, EXPORT_BATCH_SIZE, MAX_EXPORT_BATCH_SIZE, NDJSON
+from typing import Optional, Literal
+
+router = APIRouter()
+
+# Shared query parameters of the export endpoints
+ExportFormat = Literal["ndjson", "arrow"]
+BATCH_SIZE_QUERY = Query(EXPORT_BATCH_SIZE, ge=1, le=MAX_EXPORT_BATCH_SIZE)
+FORMAT_QUERY = Query(NDJSON, alias="format")
+
+@router.get("/export/movies")
+async def export_movies(genre: Optional[str] = None, fields: Optional[str] = None,
+                        batch_size: int = BATCH_SIZE_QUERY, export_format: ExportFormat = FORMAT_QUERY,
+                        db=Depends(get_db)):
+    """
+    Stream every movie, or every movie of one genre (exact name).
+    """
+    query = {"genres": genre} if genre else {}
+    cursor = db["movies"].find(query, field_projection(fields, hidden=INTERNAL_FIELDS), batch_size=batch_size)
+    return stream_export(cursor, batch_size, export_format, "movies")
+
+@router.get("/export/reviews")
+async def export_reviews(movie_id: Optional[str] = None, user_id: Optional[str] = None, fields: Optional[str] = None,
+                         batch_size: int = BATCH_SIZE_QUERY, export_format: ExportFormat = FORMAT_QUERY,
+                         db=Depends(get_db)):
+    """
+    Stream reviews, optionally filtered by movie_id or user_id, in _id order.
+    """
+    query = {}
+    if movie_id:
+        query["movie_id"] = movie_id
+    if user_id:
+        query["user_id"] = user_id
+    cursor = db["reviews"].find(query, field_projection(fields), batch_size=batch_size).sort("_id", 1)
+    return stream_export(cursor, batch_size, export_format, "reviews")
+
+@router.get("/export/users")
+async def export_users(fields: Optional[str] = None, batch_size: int = BATCH_SIZE_QUERY,
+                       export_format: ExportFormat = FORMAT_QUERY, db=Depends(get_db)):
+    """
+    Stream every user. Password hashes are never exported.
+    """
+    cursor = db["users"].find({}, field_projection(fields, hidden=("password_hash",)), batch_size=batch_size)
+    return stream_export(cursor, batch_size, export_format, "users")
+
+@router.get("/export/analytics/{report}")
+async def export_analytics(report: str, batch_size: int = BATCH_SIZE_QUERY,
+                           export_format: ExportFormat = FORMAT_QUERY, db=Depends(get_db)):
+    """
+    Stream the full, uncapped result of an analytics pipeline
+    (genre-stats, yearly-trends or top-rated).
+    """
+    if report not in ANALYTICS_PIPELINES:
+        raise HTTPException(status_code=404, detail=f"Unknown report. Choose one of: {', '.join(ANALYTICS_PIPELINES)}")
+    cursor = db["movies"].aggregate(ANALYTICS_PIPELINES[report](), batchSize=batch_size, allowDiskUse=True)
+    return stream_export(cursor, batch_size, export_format, report)
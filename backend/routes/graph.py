@@ -1,31 +1,71 @@
-from fastapi import APIRouter, HTTPException
-from db.neo4j import neo4j_graph
+import os
+from fastapi import APIRouter, HTTPException, Depends, Query
+from db.mongo import get_db
+from db.neo4j import get_graph, is_timeout, GRAPH_BATCH_SIZE, DEFAULT_PATH_DEPTH, MAX_PATH_DEPTH
+from models.graph import GraphMovie, GraphRating
+from services.similarity import get_similarity_index
+from services.batch import movies_by_tmdb_id
+from services.movie_stats import popular_genres
+from services.paths import shortest_path, shortest_paths, PATH_BATCH_MAX
 from typing import List, Optional
 
 router = APIRouter()
 
+# Rows accepted per bulk request; each request is written in GRAPH_BATCH_SIZE transactions
+GRAPH_BULK_MAX = int(os.getenv('GRAPH_BULK_MAX', 50000))
+
+async def _index_neighbours(movies, movie_id: int, neighbours: list) -> list:
+    """
+    Similarity index neighbours with the fields of the graph traversal
+    (shared_genres, rating), from one $in query for the genres and ratings.
+    """
+    found = await movies_by_tmdb_id(movies, [movie_id] + [n["id"] for n in neighbours], {"genres": 1, "avg_rating": 1})
+    target_genres = set(found.get(movie_id, {}).get("genres") or [])
+    return [
+        {
+            "title": neighbour["title"],
+            "id": neighbour["id"],
+            "shared_genres": len(target_genres & set(found.get(neighbour["id"], {}).get("genres") or [])),
+            "rating": found.get(neighbour["id"], {}).get("avg_rating"),
+            "score": neighbour["score"]
+        }
+        for neighbour in neighbours
+    ]
+
 @router.get("/graph/similar/{movie_id}")
-def get_similar_movies_graph(movie_id: int, limit: Optional[int] = 5):
+async def get_similar_movies_graph(movie_id: int, limit: Optional[int] = 5, graph=Depends(get_graph),
+                                   db=Depends(get_db)):
     """
     Get similar movies using Neo4j graph queries.
+    Every item has title, id, shared_genres and rating; score is the index
+    similarity (null for the graph traversal, which ranks by shared_genres).
     """
     try:
-        results = neo4j_graph.get_similar_movies_graph(movie_id, limit)
+        # Precomputed genre/keyword neighbours when available, otherwise a shared-genre traversal
+        index = get_similarity_index()
+        neighbours = index.similar(movie_id, limit) if index else None
+        if neighbours is not None:
+            results = await _index_neighbours(db["movies"], movie_id, neighbours)
+            source = "index"
+        else:
+            results = [{**result, "score": None} for result in await graph.get_similar_movies_graph(movie_id, limit)]
+            source = "graph"
         return {
             "similar_movies": results,
             "movie_id": movie_id,
+            "source": source,
             "count": len(results)
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Graph query error: {str(e)}")
 
 @router.get("/graph/recommendations/{user_id}")
-def get_user_recommendations_graph(user_id: str, limit: Optional[int] = 5):
+async def get_user_recommendations_graph(user_id: str, limit: Optional[int] = 5, graph=Depends(get_graph)):
     """
     Get personalized movie recommendations for a user using Neo4j.
     """
     try:
-        results = neo4j_graph.get_movie_recommendations_for_user(user_id, limit)
+        results = await graph.get_movie_recommendations_for_user(user_id, limit)
         return {
             "recommendations": results,
             "user_id": user_id,
@@ -35,52 +75,99 @@ def get_user_recommendations_graph(user_id: str, limit: Optional[int] = 5):
         raise HTTPException(status_code=500, detail=f"Graph query error: {str(e)}")
 
 @router.get("/graph/popular-genres")
-def get_popular_genres_graph(limit: Optional[int] = 10):
+async def get_popular_genres_graph(limit: Optional[int] = 10, graph=Depends(get_graph), db=Depends(get_db)):
     """
     Get popular genres analysis using Neo4j graph queries.
+    Served from the movie_stats rollups once built, otherwise counted in the graph.
     """
     try:
-        results = neo4j_graph.get_popular_genres(limit)
+        rollup = await popular_genres(db, limit)
+        if rollup is not None:
+            results, freshness = rollup
+            return {"popular_genres": results, "count": len(results), "source": "rollup", **freshness}
+        results = await graph.get_popular_genres(limit)
         return {
             "popular_genres": results,
-            "count": len(results)
+            "count": len(results),
+            "source": "graph"
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Graph query error: {str(e)}")
 
 @router.get("/graph/shortest-path/{movie1_id}/{movie2_id}")
-def get_shortest_path(movie1_id: int, movie2_id: int):
+async def get_shortest_path(
+    movie1_id: int,
+    movie2_id: int,
+    max_depth: int = Query(DEFAULT_PATH_DEPTH, ge=1, le=MAX_PATH_DEPTH),
+    graph=Depends(get_graph)
+):
     """
-    Find shortest path between two movies through genres.
+    Find shortest path between two movies through genres, at most max_depth hops long.
     """
+    if movie1_id == movie2_id:
+        raise HTTPException(status_code=400, detail="movie1_id and movie2_id must differ.")
     try:
-        results = neo4j_graph.get_shortest_path_between_movies(movie1_id, movie2_id)
+        path = await shortest_path(graph, movie1_id, movie2_id, max_depth)
         return {
-            "shortest_path": results,
+            "shortest_path": path,
+            "found": path["hops"] is not None,
             "movie1_id": movie1_id,
-            "movie2_id": movie2_id
+            "movie2_id": movie2_id,
+            "max_depth": max_depth
+        }
+    except Exception as e:
+        if is_timeout(e):
+            raise HTTPException(status_code=504, detail="Shortest path query timed out; try a lower max_depth.")
+        raise HTTPException(status_code=500, detail=f"Graph query error: {str(e)}")
+
+@router.get("/graph/shortest-paths/{movie_id}")
+async def get_shortest_paths(
+    movie_id: int,
+    targets: str = Query(..., description="Comma-separated target movie ids"),
+    max_depth: int = Query(DEFAULT_PATH_DEPTH, ge=1, le=MAX_PATH_DEPTH),
+    graph=Depends(get_graph)
+):
+    """
+    Shortest paths from one movie to many targets, computed in a single query.
+    """
+    try:
+        target_ids = list(dict.fromkeys(int(target) for target in targets.split(",") if target.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="targets must be comma-separated movie ids.")
+    target_ids = [target_id for target_id in target_ids if target_id != movie_id]
+    if len(target_ids) > PATH_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {PATH_BATCH_MAX} targets per request.")
+    try:
+        paths = await shortest_paths(graph, movie_id, target_ids, max_depth)
+        return {
+            "movie_id": movie_id,
+            "paths": {str(target_id): paths[target_id] for target_id in target_ids if target_id in paths},
+            "not_found": [target_id for target_id in target_ids if target_id not in paths],
+            "max_depth": max_depth
         }
     except Exception as e:
+        if is_timeout(e):
+            raise HTTPException(status_code=504, detail="Shortest path query timed out; try a lower max_depth.")
         raise HTTPException(status_code=500, detail=f"Graph query error: {str(e)}")
 
 @router.post("/graph/user/{user_id}")
-def create_user_node(user_id: str, username: str):
+async def create_user_node(user_id: str, username: str, graph=Depends(get_graph)):
     """
     Create a user node in Neo4j graph.
     """
     try:
-        neo4j_graph.create_user_node(user_id, username)
+        await graph.create_user_node(user_id, username)
         return {"message": f"User {username} created successfully", "user_id": user_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Graph operation error: {str(e)}")
 
 @router.post("/graph/rating/{user_id}/{movie_id}")
-def create_user_rating(user_id: str, movie_id: int, rating: float):
+async def create_user_rating(user_id: str, movie_id: int, rating: float, graph=Depends(get_graph)):
     """
     Create a user rating relationship in Neo4j.
     """
     try:
-        neo4j_graph.create_user_rating(user_id, movie_id, rating)
+        await graph.create_user_rating(user_id, movie_id, rating)
         return {
             "message": "Rating created successfully",
             "user_id": user_id,
@@ -90,24 +177,50 @@ def create_user_rating(user_id: str, movie_id: int, rating: float):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Graph operation error: {str(e)}")
 
+@router.post("/graph/ratings")
+async def create_user_ratings(ratings: List[GraphRating], graph=Depends(get_graph)):
+    """
+    Create many rating relationships in Neo4j with batched UNWIND writes.
+    """
+    if len(ratings) > GRAPH_BULK_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {GRAPH_BULK_MAX} ratings per request.")
+    try:
+        written = await graph.create_user_ratings([rating.dict() for rating in ratings], GRAPH_BATCH_SIZE)
+        return {"message": "Ratings created successfully", "count": written}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Graph operation error: {str(e)}")
+
 @router.post("/graph/movie/{movie_id}")
-def create_movie_node(movie_data: dict):
+async def create_movie_node(movie_data: dict, graph=Depends(get_graph)):
     """
     Create a movie node in Neo4j graph.
     """
     try:
-        neo4j_graph.create_movie_node(movie_data)
+        await graph.create_movie_node(movie_data)
         return {"message": "Movie node created successfully", "movie_id": movie_data.get('tmdb_id')}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Graph operation error: {str(e)}")
 
+@router.post("/graph/movies")
+async def create_movie_nodes(movies: List[GraphMovie], graph=Depends(get_graph)):
+    """
+    Create many movie nodes and their genre relationships with batched UNWIND writes.
+    """
+    if len(movies) > GRAPH_BULK_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {GRAPH_BULK_MAX} movies per request.")
+    try:
+        written = await graph.create_movie_nodes([movie.dict() for movie in movies], GRAPH_BATCH_SIZE)
+        return {"message": "Movie nodes created successfully", "count": written}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Graph operation error: {str(e)}")
+
 @router.post("/graph/movie/{movie_id}/genres")
-def create_movie_genre_relationships(movie_id: int, genres: List[str]):
+async def create_movie_genre_relationships(movie_id: int, genres: List[str], graph=Depends(get_graph)):
     """
     Create genre relationships for a movie.
     """
     try:
-        neo4j_graph.create_genre_relationships(movie_id, genres)
+        await graph.create_genre_relationships(movie_id, genres)
         return {
             "message": "Genre relationships created successfully",
             "movie_id": movie_id,
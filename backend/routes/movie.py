@@ -1,116 +1,150 @@
-from fastapi import APIRouter, HTTPException
-from db.mongo import get_mongo_client
-from typing import List, Optional
-import random
+from fastapi import APIRouter, HTTPException, Depends, Query
+from db.mongo import get_db
+from db.redis import get_async_redis_client
+from services.search import search_query, TEXT_MODE
+from services.autocomplete import suggest
+from services.sampling import sample_movies
+from services.catalog import get_catalog, catalog_movies
+from services.pagination import paginate, total_count, MOVIE_PAGE_SIZE, MAX_PAGE_SIZE
+from services.analytics import (
+    analytics_pipeline, explain_pipeline, genre_stats_pipeline, yearly_trends_pipeline, top_rated_by_decade_pipeline,
+    METRICS, MAX_TOP_K
+)
+from services.movie_stats import genre_stats, yearly_trends, top_rated_by_decade, MOVIE_STATS_TOP_K
+from services.projection import movie_projection, Profile, INTERNAL_FIELDS
+from services.batch import resolve_movies, movies_by_tmdb_id, MOVIE_BATCH_MAX
+from services.similarity import get_similarity_index
+from services.recommender import get_recommender
+from services.ann import get_cf_ann_index
+from models.movie import MovieBatch
+from services.cache import cached, MOVIE_CACHE_TTL, SEARCH_CACHE_TTL, GENRE_CACHE_TTL, POPULAR_CACHE_TTL
+from services.serialization import FastJSONResponse
+from typing import List, Optional, Literal
 
 router = APIRouter()
 
 @router.get("/test-movie-route")
-def test_movie_route():
+async def test_movie_route():
     """
     Simple test to verify the route is working.
     """
     return {"message": "Test movie route is working", "status": "success"}
 
 @router.get("/movies/test")
-def test_movies_route():
+async def test_movies_route():
     """
     Simple test to verify the route is working.
     """
     return {"message": "Movies route is working", "status": "success"}
 
 @router.get("/movies/simple")
-def simple_movies():
+async def simple_movies():
     """
     Very simple movies endpoint.
     """
     return {"message": "Simple movies endpoint", "movies": []}
 
 @router.get("/movies/count")
-def get_movie_count():
+async def get_movie_count(db=Depends(get_db)):
     """
     Get the total number of movies in the database.
     """
     try:
-        client = get_mongo_client()
-        db = client["cinemate"]
         movies = db["movies"]
-        count = movies.count_documents({})
+        count = await movies.count_documents({})
         return {"total_movies": count}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.get("/movies/search/{title}")
-def search_movies(title: str, limit: Optional[int] = 10):
+@cached("search", SEARCH_CACHE_TTL, lowercase=True)
+async def search_movies(title: str, limit: Optional[int] = 10,
+                        mode: Literal["text", "prefix"] = TEXT_MODE, profile: Profile = "card",
+                        fields: Optional[str] = None, db=Depends(get_db)):
     """
     Search movies by title.
+    mode=text ranks matches in title, tagline and description by relevance,
+    mode=prefix returns titles starting with the term (autocomplete).
     """
     try:
-        client = get_mongo_client()
-        db = client["cinemate"]
         movies = db["movies"]
         
-        # Case-insensitive search
-        movie_cursor = movies.find(
-            {"title": {"$regex": title, "$options": "i"}}
-        ).limit(limit)
+        # Both modes are served from an index (text index / title_norm)
+        query, score_projection, sort = search_query(title, mode)
+        projection = {**movie_projection(profile, fields), **(score_projection or {})}
+        movie_cursor = movies.find(query, projection).sort(sort).limit(limit)
         
         movie_list = []
-        for movie in movie_cursor:
+        async for movie in movie_cursor:
             movie["_id"] = str(movie["_id"])
             movie_list.append(movie)
         
         return {
             "movies": movie_list,
             "search_term": title,
+            "mode": mode,
             "count": len(movie_list)
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.get("/movies/")
-def list_movies(limit: Optional[int] = 10, skip: Optional[int] = 0):
+async def list_movies(limit: int = Query(MOVIE_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None,
+                      include_total: bool = False, profile: Profile = "card", fields: Optional[str] = None,
+                      db=Depends(get_db)):
     """
-    List movies from the database with pagination.
+    List movies from the database with cursor pagination.
+    Pass the returned next_cursor to get the following page.
     """
     try:
-        client = get_mongo_client()
-        db = client["cinemate"]
         movies = db["movies"]
         
-        # Get movies with pagination
-        movie_cursor = movies.find().skip(skip).limit(limit)
-        
-        movie_list = []
-        for movie in movie_cursor:
-            movie["_id"] = str(movie["_id"])  # Convert ObjectId to string
-            movie_list.append(movie)
-        
-        # Get total count for pagination info
-        total_count = movies.count_documents({})
+        # Keyset page on _id: constant cost however deep the page is
+        movie_list, next_cursor = await paginate(movies, {}, limit, cursor, movie_projection(profile, fields))
         
-        return {
+        response = {
             "movies": movie_list,
-            "total": total_count,
             "limit": limit,
-            "skip": skip,
-            "has_more": (skip + limit) < total_count
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
         }
+        if include_total:
+            response["total"] = await total_count(movies, {})
+        # Encoded straight from the documents (ObjectIds included)
+        return FastJSONResponse(response)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+@router.get("/movies/autocomplete")
+async def autocomplete_movies(q: str, limit: Optional[int] = 10):
+    """
+    Typeahead suggestions for a title prefix, served from the Redis prefix index.
+    """
+    try:
+        suggestions = await suggest(get_async_redis_client(), q, limit)
+        return {
+            "suggestions": suggestions,
+            "query": q,
+            "count": len(suggestions)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Cache error: {str(e)}")
+
 @router.get("/movies/{movie_id}")
-def get_movie(movie_id: str):
+@cached("movie", MOVIE_CACHE_TTL)
+async def get_movie(movie_id: str, db=Depends(get_db)):
     """
     Get a specific movie by ID.
     """
     try:
         from bson import ObjectId
-        client = get_mongo_client()
-        db = client["cinemate"]
         movies = db["movies"]
         
-        movie = movies.find_one({"_id": ObjectId(movie_id)})
+        movie = await movies.find_one({"_id": ObjectId(movie_id)}, {name: 0 for name in INTERNAL_FIELDS})
         if not movie:
             raise HTTPException(status_code=404, detail="Movie not found")
         
@@ -121,156 +155,224 @@ def get_movie(movie_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+@router.post("/movies/batch")
+async def get_movies_batch(batch: MovieBatch, db=Depends(get_db)):
+    """
+    Get many movies by ID (ObjectId or tmdb_id) in one request.
+    Results follow the request order, with null for ids that were not found.
+    """
+    if len(batch.ids) > MOVIE_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {MOVIE_BATCH_MAX} ids per batch.")
+    try:
+        # One Redis MGET for cached movies, one $in query for the rest
+        resolved = await resolve_movies(db["movies"], list(dict.fromkeys(batch.ids)))
+        
+        return FastJSONResponse({
+            "movies": [resolved.get(movie_id) for movie_id in batch.ids],
+            "not_found": [movie_id for movie_id in dict.fromkeys(batch.ids) if movie_id not in resolved],
+            "count": len(resolved)
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
 # NEW RECOMMENDATION ENDPOINTS
 
 @router.get("/movies/recommendations/popular")
-def get_popular_movies(limit: Optional[int] = 10):
+@cached("popular_movies", POPULAR_CACHE_TTL)
+async def get_popular_movies(limit: Optional[int] = 10, profile: Profile = "card", fields: Optional[str] = None,
+                             db=Depends(get_db)):
     """
     Get popular movies based on rating and number of reviews.
     """
     try:
-        client = get_mongo_client()
-        db = client["cinemate"]
         movies = db["movies"]
         
-        # Get movies with high ratings and many reviews
-        pipeline = [
-            {"$match": {"num_reviews": {"$gte": 100}}},  # At least 100 reviews
-            {"$sort": {"avg_rating": -1, "num_reviews": -1}},
-            {"$limit": limit}
-        ]
-        
-        movie_cursor = movies.aggregate(pipeline)
-        movie_list = []
-        for movie in movie_cursor:
+        catalog = get_catalog()
+        if catalog is not None:
+            # Filter and sort in memory, then fetch the page by _id
+            movie_list = await catalog_movies(movies, catalog.popular(limit), movie_projection(profile, fields))
+        else:
+            # Get movies with high ratings and many reviews
+            pipeline = [
+                {"$match": {"num_reviews": {"$gte": 100}}},  # At least 100 reviews
+                {"$sort": {"avg_rating": -1, "num_reviews": -1}},
+                {"$limit": limit},
+                {"$project": movie_projection(profile, fields)}
+            ]
+            movie_list = await movies.aggregate(pipeline).to_list(None)
+        for movie in movie_list:
             movie["_id"] = str(movie["_id"])
-            movie_list.append(movie)
         
         return {
             "movies": movie_list,
             "recommendation_type": "popular",
             "count": len(movie_list)
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.get("/movies/recommendations/genre/{genre}")
-def get_movies_by_genre(genre: str, limit: Optional[int] = 10):
+@cached("genre", GENRE_CACHE_TTL, lowercase=True)
+async def get_movies_by_genre(genre: str, limit: Optional[int] = 10, profile: Profile = "card",
+                              fields: Optional[str] = None, db=Depends(get_db)):
     """
     Get movies by specific genre.
     """
     try:
-        client = get_mongo_client()
-        db = client["cinemate"]
         movies = db["movies"]
         
-        # Case-insensitive genre search
-        movie_cursor = movies.find(
-            {"genres": {"$regex": genre, "$options": "i"}}
-        ).sort("avg_rating", -1).limit(limit)
-        
-        movie_list = []
-        for movie in movie_cursor:
+        catalog = get_catalog()
+        ids = catalog.by_genre(genre, limit) if catalog is not None else None
+        if ids is not None:
+            movie_list = await catalog_movies(movies, ids, movie_projection(profile, fields))
+        else:
+            # Case-insensitive genre search
+            movie_list = await movies.find(
+                {"genres": {"$regex": genre, "$options": "i"}},
+                movie_projection(profile, fields)
+            ).sort("avg_rating", -1).limit(limit).to_list(limit)
+        for movie in movie_list:
             movie["_id"] = str(movie["_id"])
-            movie_list.append(movie)
         
         return {
             "movies": movie_list,
             "genre": genre,
             "count": len(movie_list)
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.get("/movies/recommendations/similar/{movie_id}")
-def get_similar_movies(movie_id: str, limit: Optional[int] = 5):
+async def get_similar_movies(movie_id: str, limit: int = Query(5, ge=1, le=MAX_PAGE_SIZE), profile: Profile = "card",
+                             fields: Optional[str] = None, method: Literal["content", "embedding"] = "content",
+                             nprobe: Optional[int] = Query(None, ge=1), db=Depends(get_db)):
     """
-    Get similar movies based on genres and rating.
+    Get similar movies. method=content uses the precomputed genre/keyword
+    similarity index, method=embedding the nearest neighbours of the movie's
+    rating factors (movies rated alike by the same users). Movies missing from
+    those fall back to shared genres and rating.
     """
     try:
         from bson import ObjectId
-        client = get_mongo_client()
-        db = client["cinemate"]
         movies = db["movies"]
         
         # Get the target movie
-        target_movie = movies.find_one({"_id": ObjectId(movie_id)})
+        target_movie = await movies.find_one({"_id": ObjectId(movie_id)},
+                                             {"title": 1, "genres": 1, "avg_rating": 1, "tmdb_id": 1})
         if not target_movie:
             raise HTTPException(status_code=404, detail="Movie not found")
         
+        # Rating-factor neighbours from the ANN index (exact scoring without one)
+        recommender = get_recommender() if method == "embedding" else None
+        if recommender is not None:
+            scored = None
+            for lookup_id in (str(target_movie.get("tmdb_id")), str(target_movie["_id"])):
+                scored = recommender.similar_items(lookup_id, limit, get_cf_ann_index(), nprobe)
+                if scored is not None:
+                    break
+            if scored is not None:
+                found = await resolve_movies(movies, [item["lookup_id"] for item in scored],
+                                             movie_projection(profile, fields))
+                movie_list = [{**found[item["lookup_id"]], "similarity": item["score"]}
+                              for item in scored if item["lookup_id"] in found]
+                return FastJSONResponse({
+                    "movies": movie_list,
+                    "target_movie": target_movie.get("title", "Unknown"),
+                    "method": "embedding",
+                    "count": len(movie_list)
+                })
+        
+        # Precomputed neighbours: a lookup plus one $in query
+        index = get_similarity_index()
+        neighbours = index.similar(target_movie.get("tmdb_id"), limit) if index else None
+        if neighbours is not None:
+            found = await movies_by_tmdb_id(movies, [n["id"] for n in neighbours], movie_projection(profile, fields))
+            movie_list = []
+            for neighbour in neighbours:
+                if neighbour["id"] in found:
+                    found[neighbour["id"]]["similarity"] = neighbour["score"]
+                    movie_list.append(found[neighbour["id"]])
+            return FastJSONResponse({
+                "movies": movie_list,
+                "target_movie": target_movie.get("title", "Unknown"),
+                "method": "index",
+                "count": len(movie_list)
+            })
+        
         target_genres = target_movie.get("genres", [])
         target_rating = target_movie.get("avg_rating", 0)
         
-        # Find movies with similar genres and rating (simplified approach)
-        similar_movies = movies.find({
-            "_id": {"$ne": ObjectId(movie_id)},  # Exclude the target movie
-            "genres": {"$in": target_genres},  # Share at least one genre
-            "avg_rating": {"$gte": max(0, target_rating - 1), "$lte": target_rating + 1}  # Similar rating
-        }).sort("avg_rating", -1).limit(limit)
-        
-        movie_list = []
-        for movie in similar_movies:
-            movie["_id"] = str(movie["_id"])
-            movie_list.append(movie)
-        
-        return {
+        catalog = get_catalog()
+        ids = catalog.similar(ObjectId(movie_id), target_genres, max(0, target_rating - 1), target_rating + 1,
+                              limit) if catalog is not None else None
+        if ids is not None:
+            movie_list = await catalog_movies(movies, ids, movie_projection(profile, fields))
+        else:
+            # Find movies with similar genres and rating (simplified approach)
+            movie_list = await movies.find({
+                "_id": {"$ne": ObjectId(movie_id)},  # Exclude the target movie
+                "genres": {"$in": target_genres},  # Share at least one genre
+                "avg_rating": {"$gte": max(0, target_rating - 1), "$lte": target_rating + 1}  # Similar rating
+            }, movie_projection(profile, fields)).sort("avg_rating", -1).limit(limit).to_list(limit)
+        
+        return FastJSONResponse({
             "movies": movie_list,
             "target_movie": target_movie.get("title", "Unknown"),
+            "method": "catalog" if ids is not None else "live",
             "count": len(movie_list)
-        }
+        })
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.get("/movies/recommendations/random")
-def get_random_movies(limit: Optional[int] = 10):
+async def get_random_movies(limit: Optional[int] = 10, genre: Optional[str] = None, year: Optional[int] = None,
+                            seed: Optional[int] = None, page: Optional[int] = 0, profile: Profile = "card",
+                            fields: Optional[str] = None, db=Depends(get_db)):
     """
-    Get random movies for discovery.
+    Get random movies for discovery, optionally within a genre and/or year.
+    Passing a seed makes each page reproducible.
     """
     try:
-        client = get_mongo_client()
-        db = client["cinemate"]
         movies = db["movies"]
         
-        # Get total count for random sampling
-        total_count = movies.count_documents({})
-        
-        # Get random movies using a simpler approach
-        movie_list = []
-        if total_count > 0:
-            # Get all movies and randomly sample
-            all_movies = list(movies.find())
-            import random
-            random.shuffle(all_movies)
-            
-            for movie in all_movies[:limit]:
-                movie["_id"] = str(movie["_id"])
-                movie_list.append(movie)
+        catalog = get_catalog()
+        ids = catalog.sample(limit, genre, year, seed, page) if catalog is not None else None
+        if ids is not None:
+            movie_list = await catalog_movies(movies, ids, movie_projection(profile, fields))
+        else:
+            # Cost depends on limit only ($sample or the random-key index)
+            movie_list = await sample_movies(movies, limit, genre=genre, year=year, seed=seed, page=page,
+                                             projection=movie_projection(profile, fields))
         
-        return {
+        return FastJSONResponse({
             "movies": movie_list,
             "recommendation_type": "random",
             "count": len(movie_list)
-        }
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.get("/movies/genres/list")
-def get_all_genres():
+async def get_all_genres(db=Depends(get_db)):
     """
     Get all available genres in the database.
     """
     try:
-        client = get_mongo_client()
-        db = client["cinemate"]
         movies = db["movies"]
         
         # Get all unique genres using a simpler approach
         all_movies = movies.find({}, {"genres": 1})
         all_genres = set()
         
-        for movie in all_movies:
+        async for movie in all_movies:
             if movie.get("genres"):
                 all_genres.update(movie["genres"])
         
@@ -286,119 +388,121 @@ def get_all_genres():
 # Add these new aggregation endpoints after the existing routes
 
 @router.get("/movies/analytics/genre-stats")
-def get_genre_statistics():
+async def get_genre_statistics(limit: int = Query(10, ge=1, le=100), db=Depends(get_db)):
     """
     MongoDB Aggregation Query 1: Get statistics by genre.
+    Served from the movie_stats rollups once built, otherwise aggregated live.
     """
     try:
-        client = get_mongo_client()
-        db = client["cinemate"]
+        rollup = await genre_stats(db, limit=limit)
+        if rollup is not None:
+            results, freshness = rollup
+            return {"genre_statistics": results, "total_genres": len(results), "source": "rollup", **freshness}
+        
         movies = db["movies"]
         
-        pipeline = [
-            {"$unwind": "$genres"},
-            {"$group": {
-                "_id": "$genres",
-                "count": {"$sum": 1},
-                "avg_rating": {"$avg": "$avg_rating"},
-                "total_reviews": {"$sum": "$num_reviews"},
-                "avg_budget": {"$avg": "$budget"},
-                "avg_revenue": {"$avg": "$revenue"}
-            }},
-            {"$sort": {"count": -1}},
-            {"$limit": 10}
-        ]
-        
-        results = list(movies.aggregate(pipeline))
+        pipeline = genre_stats_pipeline(limit=limit)
+        
+        results = await movies.aggregate(pipeline, allowDiskUse=True).to_list(None)
         
         return {
             "genre_statistics": results,
-            "total_genres": len(results)
+            "total_genres": len(results),
+            "source": "live"
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.get("/movies/analytics/yearly-trends")
-def get_yearly_trends():
+async def get_yearly_trends(start_year: int = 1990, end_year: int = 2020, limit: int = Query(20, ge=1, le=200),
+                            db=Depends(get_db)):
     """
     MongoDB Aggregation Query 2: Get movie trends by year.
+    Served from the movie_stats rollups once built, otherwise aggregated live.
     """
     try:
-        client = get_mongo_client()
-        db = client["cinemate"]
+        rollup = await yearly_trends(db, start_year, end_year, limit=limit)
+        if rollup is not None:
+            results, freshness = rollup
+            return {"yearly_trends": results, "years_analyzed": len(results), "source": "rollup", **freshness}
+        
         movies = db["movies"]
         
-        pipeline = [
-            {"$match": {"year": {"$gte": 1990, "$lte": 2020}}},
-            {"$group": {
-                "_id": "$year",
-                "movie_count": {"$sum": 1},
-                "avg_rating": {"$avg": "$avg_rating"},
-                "total_budget": {"$sum": "$budget"},
-                "total_revenue": {"$sum": "$revenue"},
-                "avg_runtime": {"$avg": "$runtime"}
-            }},
-            {"$sort": {"_id": 1}},
-            {"$limit": 20}
-        ]
-        
-        results = list(movies.aggregate(pipeline))
+        pipeline = yearly_trends_pipeline(start_year, end_year, limit=limit)
+        
+        results = await movies.aggregate(pipeline, allowDiskUse=True).to_list(None)
         
         return {
             "yearly_trends": results,
-            "years_analyzed": len(results)
+            "years_analyzed": len(results),
+            "source": "live"
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.get("/movies/analytics/top-rated")
-def get_top_rated_movies_by_decade():
+async def get_top_rated_movies_by_decade(start_year: int = 1990, end_year: int = 2020,
+                                         per_decade: int = Query(5, ge=1, le=MAX_TOP_K), db=Depends(get_db)):
     """
     MongoDB Aggregation Query 3: Get top-rated movies by decade.
+    Served from the movie_stats rollups once built (and per_decade fits in them), otherwise aggregated live.
     """
     try:
-        client = get_mongo_client()
-        db = client["cinemate"]
+        rollup = None
+        if per_decade <= MOVIE_STATS_TOP_K:
+            rollup = await top_rated_by_decade(db, start_year, end_year, per_decade)
+        if rollup is not None:
+            results, freshness = rollup
+            return {"top_rated_by_decade": results, "source": "rollup", **freshness}
+        
         movies = db["movies"]
         
-        pipeline = [
-            {"$match": {"year": {"$gte": 1990, "$lte": 2020}}},
-            {"$addFields": {
-                "decade": {
-                    "$concat": [
-                        {"$toString": {"$floor": {"$divide": ["$year", 10]}}},
-                        "0s"
-                    ]
-                }
-            }},
-            {"$group": {
-                "_id": "$decade",
-                "top_movies": {
-                    "$push": {
-                        "title": "$title",
-                        "year": "$year",
-                        "avg_rating": "$avg_rating",
-                        "num_reviews": "$num_reviews"
-                    }
-                }
-            }},
-            {"$addFields": {
-                "top_movies": {
-                    "$slice": [
-                        {"$sortArray": {
-                            "input": "$top_movies",
-                            "sortBy": {"avg_rating": -1}
-                        }},
-                        5
-                    ]
-                }
-            }}
-        ]
-        
-        results = list(movies.aggregate(pipeline))
+        pipeline = top_rated_by_decade_pipeline(start_year, end_year, per_decade)
+        
+        results = await movies.aggregate(pipeline, allowDiskUse=True).to_list(None)
         
         return {
-            "top_rated_by_decade": results
+            "top_rated_by_decade": results,
+            "source": "live"
         }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+@router.get("/movies/analytics/query")
+async def query_analytics(
+    group_by: Literal["genre", "year", "decade"],
+    metrics: str = Query("count,avg_rating", description=f"Comma-separated, from: {', '.join(METRICS)}"),
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    genres: Optional[str] = Query(None, description="Comma-separated genres to include"),
+    min_reviews: Optional[int] = Query(None, ge=0),
+    sort: Optional[str] = Query(None, description="_id or a requested metric, '-' prefixed for descending"),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    top_k: int = Query(0, ge=0, le=MAX_TOP_K),
+    stats: bool = False,
+    db=Depends(get_db)
+):
+    """
+    Ad-hoc analytics: group movies by genre, year or decade, compute the chosen
+    metrics over the filtered catalog and optionally list each group's top_k
+    best-rated movies. stats=true adds the compiled pipeline and its execution stats.
+    """
+    try:
+        pipeline = analytics_pipeline(
+            group_by,
+            [metric.strip() for metric in metrics.split(",") if metric.strip()],
+            year_from, year_to,
+            [genre.strip() for genre in genres.split(",") if genre.strip()] if genres else None,
+            min_reviews, sort, limit, top_k
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        results = await db["movies"].aggregate(pipeline, allowDiskUse=True).to_list(None)
+        response = {"group_by": group_by, "results": results, "count": len(results)}
+        if stats:
+            response["pipeline"] = pipeline
+            response["execution_stats"] = await explain_pipeline(db, pipeline)
+        return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}") 
\ No newline at end of file
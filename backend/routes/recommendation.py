@@ -0,0 +1,51 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from db.mongo import get_db
+from services.recommender import get_recommender
+from services.ann import get_cf_ann_index
+from services.batch import resolve_movies
+from services.pagination import MAX_PAGE_SIZE
+from typing import Optional
+
+router = APIRouter()
+
+# Candidates scored per requested recommendation
+CF_OVERFETCH = 3
+
+@router.get("/recommendations/cf/{user_id}")
+async def get_cf_recommendations(user_id: str, limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE), exact: bool = False,
+                                 nprobe: Optional[int] = Query(None, ge=1), db=Depends(get_db)):
+    """
+    Personalized recommendations from the collaborative-filtering model:
+    movies liked by users with similar ratings, which this user hasn't rated.
+    Uses the ANN index when one matches the model; exact=true scores every
+    movie, a higher nprobe trades latency for recall.
+    """
+    try:
+        recommender = get_recommender()
+        if recommender is None:
+            raise HTTPException(status_code=503, detail="Recommender model has not been trained yet.")
+        # ANN candidates, or one matrix-vector product over all movies plus a
+        # partial sort. Extra candidates cover rated movies that aren't in the catalog.
+        index = None if exact else get_cf_ann_index()
+        scored = recommender.recommend(user_id, limit * CF_OVERFETCH, index=index, nprobe=nprobe)
+        if scored is None:
+            raise HTTPException(status_code=404, detail="User has no ratings in the trained model.")
+        movies = await resolve_movies(db["movies"], [item["lookup_id"] for item in scored])
+        recommendations = []
+        for item in scored:
+            movie = movies.get(item["lookup_id"])
+            if movie is None:
+                continue
+            recommendations.append({**movie, "predicted_rating": item["score"]})
+            if len(recommendations) >= limit:
+                break
+        return {
+            "recommendations": recommendations,
+            "user_id": user_id,
+            "method": "cf" if index is None else "cf-ann",
+            "count": len(recommendations)
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
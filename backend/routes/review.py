@@ -1,51 +1,88 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Depends
 from models.review import Review
-from db.mongo import get_mongo_client
+from db.mongo import get_db
+from services.invalidation import publish_movie_changed
+from services.ratings import movie_id_filter, rating_update, rated_movie
+from services.movie_stats import apply_review
+from services.autocomplete import index_movie, AUTOCOMPLETE_PROJECTION
+from db.redis import get_async_redis_client
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from services.serialization import FastJSONResponse
+from services.pagination import paginate, total_count, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from typing import Optional
 from datetime import datetime
 
 router = APIRouter()
 
 @router.post("/reviews/")
-def add_review(review: Review):
+async def add_review(review: Review, db=Depends(get_db)):
     """
     Add a new review for a movie. Updates movie's avg_rating and num_reviews.
     """
-    client = get_mongo_client()
-    db = client["cinemate"]
     reviews = db["reviews"]
     movies = db["movies"]
 
-    # Check if user already reviewed this movie
-    if reviews.find_one({"user_id": review.user_id, "movie_id": review.movie_id}):
-        raise HTTPException(status_code=400, detail="User already reviewed this movie.")
-
     review_dict = review.dict()
     review_dict["created_at"] = datetime.utcnow()
-    reviews.insert_one(review_dict)
 
-    # Update movie's avg_rating and num_reviews
-    all_reviews = list(reviews.find({"movie_id": review.movie_id}))
-    num_reviews = len(all_reviews)
-    avg_rating = sum(r["rating"] for r in all_reviews) / num_reviews
-    movies.update_one({"_id": review.movie_id}, {"$set": {"avg_rating": avg_rating, "num_reviews": num_reviews}})
+    # The unique (user_id, movie_id) index rejects a second review atomically
+    try:
+        inserted = await reviews.insert_one(review_dict)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="User already reviewed this movie.")
+
+    # Update movie's running rating_sum/num_reviews and the derived avg_rating.
+    # The previous counters are returned so the analytics rollups can be adjusted by the difference.
+    # A review is only kept once its movie's counters include it.
+    try:
+        before = await movies.find_one_and_update(
+            movie_id_filter(review.movie_id),
+            rating_update(review.rating),
+            projection={"genres": 1, "avg_rating": 1, "num_reviews": 1, "rating_sum": 1, **AUTOCOMPLETE_PROJECTION},
+            return_document=ReturnDocument.BEFORE
+        )
+    except Exception as e:
+        await reviews.delete_one({"_id": inserted.inserted_id})
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    if before is None:
+        await reviews.delete_one({"_id": inserted.inserted_id})
+        raise HTTPException(status_code=404, detail="Movie not found")
+
+    movie = rated_movie(before, review.rating)
+    try:
+        await apply_review(db, before, movie)
+    except Exception as e:
+        print(f"Movie stats update error: {e}")
+
+    # Drop cached copies of the movie and of lists that may rank it
+    await publish_movie_changed(review.movie_id, genres=movie.get("genres"), title=movie.get("title"))
+
+    # The new review count re-ranks the movie in title autocomplete
+    await index_movie(get_async_redis_client(), movie)
 
     return {"msg": "Review added successfully."}
 
 @router.get("/reviews/")
-def list_reviews(movie_id: str = Query(None), user_id: str = Query(None)):
+async def list_reviews(movie_id: str = Query(None), user_id: str = Query(None),
+                       limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None,
+                       include_total: bool = False, db=Depends(get_db)):
     """
-    List all reviews, or filter by movie_id or user_id.
+    List reviews, optionally filtered by movie_id or user_id, one cursor page at a time.
     """
-    client = get_mongo_client()
-    db = client["cinemate"]
     reviews = db["reviews"]
     query = {}
     if movie_id:
         query["movie_id"] = movie_id
     if user_id:
         query["user_id"] = user_id
-    review_list = []
-    for review in reviews.find(query):
-        review["_id"] = str(review["_id"])
-        review_list.append(review)
-    return review_list 
\ No newline at end of file
+    review_list, next_cursor = await paginate(reviews, query, limit, cursor)
+    response = {
+        "reviews": review_list,
+        "limit": limit,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None
+    }
+    if include_total:
+        response["total"] = await total_count(reviews, query)
+    return FastJSONResponse(response)
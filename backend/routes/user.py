@@ -1,7 +1,11 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, Query
+from starlette.concurrency import run_in_threadpool
 from models.user import User
-from db.mongo import get_mongo_client
+from db.mongo import get_db
+from services.serialization import FastJSONResponse
+from services.pagination import paginate, total_count, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from passlib.context import CryptContext
+from typing import Optional
 from datetime import datetime
 
 router = APIRouter()
@@ -13,36 +17,39 @@ def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 @router.post("/users/register")
-def register_user(user: User):
+async def register_user(user: User, db=Depends(get_db)):
     """
     Register a new user. Hashes the password and stores user in MongoDB.
     """
-    client = get_mongo_client()
-    db = client["cinemate"]
     users = db["users"]
 
     # Check if username or email already exists
-    if users.find_one({"$or": [{"username": user.username}, {"email": user.email}]}):
+    if await users.find_one({"$or": [{"username": user.username}, {"email": user.email}]}):
         raise HTTPException(status_code=400, detail="Username or email already exists.")
 
     user_dict = user.dict()
-    user_dict["password_hash"] = hash_password(user.password)
+    # bcrypt is CPU-bound, keep it off the event loop
+    user_dict["password_hash"] = await run_in_threadpool(hash_password, user.password)
     user_dict.pop("password")  # Don't store plain password
     user_dict["joined_at"] = datetime.utcnow()
 
-    users.insert_one(user_dict)
+    await users.insert_one(user_dict)
     return {"msg": "User registered successfully."}
 
 @router.get("/users/")
-def list_users():
+async def list_users(limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None,
+                     include_total: bool = False, db=Depends(get_db)):
     """
-    List all users (excluding password hashes).
+    List users (excluding password hashes), one cursor page at a time.
     """
-    client = get_mongo_client()
-    db = client["cinemate"]
     users = db["users"]
-    user_list = []
-    for user in users.find({}, {"password_hash": 0}):  # Exclude password_hash
-        user["_id"] = str(user["_id"])  # Convert ObjectId to string
-        user_list.append(user)
-    return user_list 
\ No newline at end of file
+    user_list, next_cursor = await paginate(users, {}, limit, cursor, {"password_hash": 0})  # Exclude password_hash
+    response = {
+        "users": user_list,
+        "limit": limit,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None
+    }
+    if include_total:
+        response["total"] = await total_count(users, {})
+    return FastJSONResponse(response)
@@ -0,0 +1,167 @@
+from typing import Optional, List
+
+# Aggregation pipelines behind /movies/analytics/*. Every report is compiled
+# from a group-by dimension, metrics, filters and an optional top-k of movies
+# per group; the routes cap them for display, exports run them without a limit.
+
+# Group key of each dimension. Genres are grouped after an $unwind.
+DIMENSIONS = {
+    "genre": "$genres",
+    "year": "$year",
+    "decade": {"$concat": [{"$toString": {"$floor": {"$divide": ["$year", 10]}}}, "0s"]},
+}
+
+# Accumulator of each metric
+METRICS = {
+    "count": {"$sum": 1},
+    "avg_rating": {"$avg": "$avg_rating"},
+    "total_reviews": {"$sum": "$num_reviews"},
+    "avg_budget": {"$avg": "$budget"},
+    "total_budget": {"$sum": "$budget"},
+    "avg_revenue": {"$avg": "$revenue"},
+    "total_revenue": {"$sum": "$revenue"},
+    "avg_runtime": {"$avg": "$runtime"},
+}
+
+# Fields of each movie in a group's top_movies
+TOP_MOVIE_OUTPUT = {"title": "$title", "year": "$year", "avg_rating": "$avg_rating", "num_reviews": "$num_reviews"}
+
+MAX_TOP_K = 100
+
+def analytics_pipeline(group_by: str, metrics=("count", "avg_rating"), year_from: Optional[int] = None,
+                       year_to: Optional[int] = None, genres: Optional[List[str]] = None,
+                       min_reviews: Optional[int] = None, sort: Optional[str] = None,
+                       limit: Optional[int] = None, top_k: int = 0) -> list:
+    """
+    Compile an analytics query into a pipeline: filter, group by one dimension,
+    compute the metrics and optionally keep each group's top_k best-rated movies.
+
+    metrics are METRICS names, or {output field: METRICS name}. sort is an output
+    field or "_id", "-" prefixed for descending; by default genres are sorted by
+    count (largest first) and years/decades chronologically. Raises ValueError
+    for unknown dimensions, metrics or sort fields.
+    """
+    if group_by not in DIMENSIONS:
+        raise ValueError(f"Unknown dimension {group_by!r}; choose one of {', '.join(DIMENSIONS)}")
+    if not isinstance(metrics, dict):
+        metrics = {name: name for name in metrics}
+    unknown = [name for name in metrics.values() if name not in METRICS]
+    if unknown:
+        raise ValueError(f"Unknown metrics {', '.join(unknown)}; choose from {', '.join(METRICS)}")
+    if not 0 <= top_k <= MAX_TOP_K:
+        raise ValueError(f"top_k must be between 0 and {MAX_TOP_K}")
+
+    match = {}
+    if year_from is not None or year_to is not None:
+        match["year"] = {}
+        if year_from is not None:
+            match["year"]["$gte"] = year_from
+        if year_to is not None:
+            match["year"]["$lte"] = year_to
+    if genres:
+        match["genres"] = {"$in": list(genres)}
+    if min_reviews:
+        match["num_reviews"] = {"$gte": min_reviews}
+
+    pipeline = [{"$match": match}] if match else []
+    if group_by == "genre":
+        pipeline.append({"$unwind": "$genres"})
+        if genres:
+            # Only the requested genres become groups, not every genre of a matching movie
+            pipeline.append({"$match": {"genres": {"$in": list(genres)}}})
+
+    group = {"_id": DIMENSIONS[group_by]}
+    group.update({field: METRICS[name] for field, name in metrics.items()})
+    if top_k:
+        # $topN keeps k documents per group while grouping, instead of pushing the whole group and sorting it
+        group["top_movies"] = {"$topN": {"n": top_k, "sortBy": {"avg_rating": -1}, "output": TOP_MOVIE_OUTPUT}}
+    pipeline.append({"$group": group})
+
+    if sort is None:
+        sort = "-count" if group_by == "genre" and "count" in metrics else "_id"
+    field = sort.lstrip("-")
+    if field != "_id" and field not in metrics:
+        raise ValueError(f"Cannot sort by {field!r}; sort by _id or one of the requested metrics")
+    order = {field: -1 if sort.startswith("-") else 1}
+    if field != "_id":
+        order["_id"] = 1  # Deterministic order between equal values
+    pipeline.append({"$sort": order})
+    if limit:
+        pipeline.append({"$limit": limit})
+    return pipeline
+
+def genre_stats_pipeline(limit: Optional[int] = None) -> list:
+    """
+    Movie count, average rating, review total, budget and revenue per genre, largest first.
+    """
+    return analytics_pipeline("genre", ("count", "avg_rating", "total_reviews", "avg_budget", "avg_revenue"),
+                              sort="-count", limit=limit)
+
+def yearly_trends_pipeline(start_year: int = 1990, end_year: int = 2020, limit: Optional[int] = None) -> list:
+    """
+    Movie count, rating, budget, revenue and runtime per release year.
+    """
+    metrics = {"movie_count": "count", "avg_rating": "avg_rating", "total_budget": "total_budget",
+               "total_revenue": "total_revenue", "avg_runtime": "avg_runtime"}
+    return analytics_pipeline("year", metrics, start_year, end_year, sort="_id", limit=limit)
+
+def top_rated_by_decade_pipeline(start_year: int = 1990, end_year: int = 2020, per_decade: int = 5) -> list:
+    """
+    The best-rated movies of each decade.
+    """
+    return analytics_pipeline("decade", {}, start_year, end_year, top_k=per_decade)
+
+# Report name -> pipeline builder, as used in the analytics URLs
+ANALYTICS_PIPELINES = {
+    "genre-stats": genre_stats_pipeline,
+    "yearly-trends": yearly_trends_pipeline,
+    "top-rated": top_rated_by_decade_pipeline,
+}
+
+def _find(node, key: str):
+    """
+    First value stored under `key` anywhere in a nested explain document.
+    """
+    if isinstance(node, dict):
+        if key in node:
+            return node[key]
+        node = list(node.values())
+    if isinstance(node, list):
+        for value in node:
+            found = _find(value, key)
+            if found is not None:
+                return found
+    return None
+
+def execution_summary(explain: dict) -> dict:
+    """
+    Time, documents/keys examined and documents returned from an executionStats
+    explain of an aggregation, plus per-stage counts when the pipeline was not
+    pushed down into the query engine as a whole.
+    """
+    stats = _find(explain, "executionStats") or {}
+    summary = {key: stats.get(key) for key in
+               ("executionTimeMillis", "nReturned", "totalDocsExamined", "totalKeysExamined")}
+    stages = []
+    for stage in explain.get("stages", []):
+        name = next((key for key in stage if key.startswith("$")), None)
+        stages.append({
+            "stage": name,
+            "nReturned": stage.get("nReturned"),
+            "executionTimeMillisEstimate": stage.get("executionTimeMillisEstimate"),
+            "usedDisk": _find(stage, "usedDisk") or False
+        })
+    if stages:
+        summary["stages"] = stages
+    return summary
+
+async def explain_pipeline(db, pipeline: list, collection: str = "movies") -> dict:
+    """
+    execution_summary of running `pipeline` (the pipeline is executed by the explain).
+    """
+    explain = await db.command(
+        "explain",
+        {"aggregate": collection, "pipeline": pipeline, "cursor": {}, "allowDiskUse": True},
+        verbosity="executionStats"
+    )
+    return execution_summary(explain)
@@ -0,0 +1,195 @@
+import os
+import time
+import argparse
+import numpy as np
+from services.artifacts import save_artifact, load_artifact, ArtifactCache
+from services.recommender import CF_ARTIFACT, Recommender, recommender_cache
+
+# Approximate nearest-neighbour search over movie vectors, in process.
+# IVF partitions the unit-normalized vectors into ANN_NLIST k-means cells
+# stored contiguously; a query only scores the ANN_NPROBE closest cells.
+# "exact" scores every vector and is the reference the benchmark compares to.
+ANN_BACKENDS = ("ivf", "exact")
+ANN_BACKEND = os.getenv('ANN_BACKEND', 'ivf')
+ANN_NLIST = int(os.getenv('ANN_NLIST', 0))  # 0: about 4 * sqrt(vectors)
+ANN_NPROBE = int(os.getenv('ANN_NPROBE', 8))
+ANN_KMEANS_ITERATIONS = int(os.getenv('ANN_KMEANS_ITERATIONS', 15))
+ANN_BLOCK_SIZE = 4096  # vectors assigned to cells at once while training
+ANN_CF_ARTIFACT = "ann_cf"
+
+def _normalize(vectors: np.ndarray):
+    """
+    (unit vectors, norms). Zero vectors stay zero.
+    """
+    norms = np.linalg.norm(vectors, axis=1).astype(np.float32)
+    return (vectors / np.maximum(norms, 1e-12)[:, None]).astype(np.float32), norms
+
+def _top(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.array([], dtype=np.int64)
+    best = np.argpartition(-scores, k - 1)[:k]
+    return best[np.argsort(-scores[best], kind="stable")]
+
+class ExactIndex:
+    """
+    Brute-force scoring of every vector. `ids` maps positions to the caller's ids.
+    """
+    backend = "exact"
+
+    def __init__(self, vectors, norms, ids):
+        self.vectors = vectors
+        self.norms = norms
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _score(self, positions, query: np.ndarray, metric: str) -> np.ndarray:
+        vectors = self.vectors if positions is None else self.vectors[positions]
+        scores = vectors @ query
+        if metric == "ip":
+            scores *= self.norms if positions is None else self.norms[positions]
+        return scores
+
+    def _candidates(self, query: np.ndarray, nprobe):
+        return None  # Every position
+
+    def search(self, query: np.ndarray, k: int, metric: str = "cosine", nprobe: int = None):
+        """
+        (ids, scores) of the k best vectors for `query`, best first. metric is
+        "cosine" or "ip" (maximum inner product, e.g. user x movie factors).
+        """
+        query = np.asarray(query, dtype=np.float32)
+        if metric == "cosine":
+            query = query / max(float(np.linalg.norm(query)), 1e-12)
+        positions = self._candidates(query, nprobe)
+        scores = self._score(positions, query, metric)
+        best = _top(scores, k)
+        chosen = best if positions is None else positions[best]
+        return np.asarray(self.ids)[chosen], scores[best]
+
+    def arrays(self) -> dict:
+        return {"vectors": self.vectors, "norms": self.norms, "ids": self.ids}
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, ids: np.ndarray, **options):
+        unit, norms = _normalize(np.asarray(vectors, dtype=np.float32))
+        return cls(unit, norms, np.asarray(ids))
+
+class IVFIndex(ExactIndex):
+    """
+    Inverted-file index: vectors grouped by their nearest k-means centroid.
+    Cell `c` holds positions offsets[c]:offsets[c + 1].
+    """
+    backend = "ivf"
+
+    def __init__(self, vectors, norms, ids, centroids, offsets, nprobe: int = ANN_NPROBE):
+        super().__init__(vectors, norms, ids)
+        self.centroids = centroids
+        self.offsets = offsets
+        self.nprobe = nprobe
+
+    def _candidates(self, query: np.ndarray, nprobe):
+        # At least one cell, at most all of them
+        nprobe = min(max(1, int(nprobe or self.nprobe)), len(self.centroids))
+        cells = _top(self.centroids @ query, nprobe)
+        return np.concatenate([np.array([], dtype=np.int64)] +
+                              [np.arange(self.offsets[cell], self.offsets[cell + 1]) for cell in cells.tolist()])
+
+    def arrays(self) -> dict:
+        return {**super().arrays(), "centroids": self.centroids, "offsets": self.offsets}
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, ids: np.ndarray, nlist: int = ANN_NLIST,
+              iterations: int = ANN_KMEANS_ITERATIONS, seed: int = 0, **options):
+        unit, norms = _normalize(np.asarray(vectors, dtype=np.float32))
+        nlist = min(len(unit), nlist or max(1, int(4 * np.sqrt(len(unit)))))
+        centroids, cells = _kmeans(unit, nlist, iterations, seed)
+        order = np.argsort(cells, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(cells, minlength=nlist))]).astype(np.int64)
+        return cls(unit[order], norms[order], np.asarray(ids)[order], centroids, offsets)
+
+def _assign(unit: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    cells = np.empty(len(unit), dtype=np.int64)
+    for start in range(0, len(unit), ANN_BLOCK_SIZE):
+        cells[start:start + ANN_BLOCK_SIZE] = np.argmax(unit[start:start + ANN_BLOCK_SIZE] @ centroids.T, axis=1)
+    return cells
+
+def _kmeans(unit: np.ndarray, nlist: int, iterations: int, seed: int):
+    """
+    Spherical k-means: centroids are renormalized means, assignment is by cosine.
+    Empty cells are re-seeded with random vectors.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = unit[rng.choice(len(unit), size=nlist, replace=False)].copy()
+    for _ in range(iterations):
+        cells = _assign(unit, centroids)
+        counts = np.bincount(cells, minlength=nlist)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        sums = np.zeros_like(centroids)
+        sums[counts > 0] = np.add.reduceat(unit[np.argsort(cells, kind="stable")], starts[counts > 0], axis=0)
+        empty = counts == 0
+        sums[empty] = unit[rng.choice(len(unit), size=int(empty.sum()))]
+        centroids, _ = _normalize(sums)
+    return centroids, _assign(unit, centroids)
+
+BACKENDS = {"ivf": IVFIndex, "exact": ExactIndex}
+
+def build_index(vectors: np.ndarray, ids: np.ndarray, backend: str = ANN_BACKEND, **options):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown ANN backend {backend!r}; choose one of {', '.join(ANN_BACKENDS)}")
+    return BACKENDS[backend].build(vectors, ids, **options)
+
+def save_index(name: str, index, meta: dict = None) -> str:
+    return save_artifact(name, index.arrays(), {**(meta or {}), "backend": index.backend})
+
+def index_from_artifact(arrays: dict, meta: dict):
+    """
+    Rebuild an index around memory-mapped arrays; nothing is copied into RAM.
+    """
+    if meta["backend"] == "ivf":
+        index = IVFIndex(arrays["vectors"], arrays["norms"], arrays["ids"], arrays["centroids"], arrays["offsets"])
+    else:
+        index = ExactIndex(arrays["vectors"], arrays["norms"], arrays["ids"])
+    index.meta = meta
+    return index
+
+# Index over the collaborative-filtering movie factors
+ann_cf_cache = ArtifactCache(ANN_CF_ARTIFACT, index_from_artifact)
+
+def get_cf_ann_index():
+    """
+    The ANN index over the CF movie factors, or None when there is none or it
+    was built from a different model version than the one being served.
+    """
+    index = ann_cf_cache.get()
+    if index is None or index.meta.get("cf_version") != recommender_cache.version:
+        return None
+    return index
+
+def build_cf_index(backend: str = ANN_BACKEND, nlist: int = ANN_NLIST) -> tuple:
+    """
+    Index the factors of every recommendable movie of the current CF model.
+    Returns (index, version).
+    """
+    loaded = load_artifact(CF_ARTIFACT)
+    if loaded is None:
+        raise RuntimeError("Train the recommender first: python -m services.recommender")
+    arrays, meta, cf_version = loaded
+    recommender = Recommender.from_artifact(arrays, meta)
+    eligible = np.flatnonzero(~recommender.too_rare)
+    index = build_index(np.asarray(recommender.item_factors)[eligible], eligible, backend, nlist=nlist)
+    return index, save_index(ANN_CF_ARTIFACT, index, {"cf_version": cf_version})
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the ANN index over the collaborative-filtering movie factors")
+    parser.add_argument("--backend", choices=ANN_BACKENDS, default=ANN_BACKEND)
+    parser.add_argument("--nlist", type=int, default=ANN_NLIST, help="IVF cells (0: about 4 * sqrt(movies))")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index, version = build_cf_index(args.backend, args.nlist)
+    cells = f", {len(index.offsets) - 1} cells" if index.backend == "ivf" else ""
+    print(f"Indexed {len(index)} movie vectors ({index.backend}{cells}) "
+          f"in {time.perf_counter() - started:.1f}s -> {version}")
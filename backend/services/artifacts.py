@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import shutil
+import itertools
+import threading
+import numpy as np
+from datetime import datetime
+
+# Offline-built model files (similarity index, rating factors, ANN graphs).
+# Each save goes to a new version directory and CURRENT is switched to it
+# atomically, so API workers never read a half-written artifact.
+ARTIFACTS_DIR = os.getenv('ARTIFACTS_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'artifacts'))
+ARTIFACTS_KEEP = int(os.getenv('ARTIFACTS_KEEP', 2))
+ARTIFACT_RELOAD_SECONDS = float(os.getenv('ARTIFACT_RELOAD_SECONDS', 10))
+
+def _current_file(name: str) -> str:
+    return os.path.join(ARTIFACTS_DIR, name, "CURRENT")
+
+def current_version(name: str):
+    """
+    Version directory name an artifact currently points to, or None if it was never built.
+    """
+    try:
+        with open(_current_file(name)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+_saves = itertools.count()
+
+def _new_version(root: str) -> tuple:
+    """
+    Create a fresh version directory under root. Names sort in save order
+    (microsecond timestamp first), and the pid plus a per-process counter keep
+    saves in the same instant, from one process or several, apart.
+    """
+    while True:
+        version = datetime.now().strftime("%Y%m%d-%H%M%S-%f") + f"-{os.getpid()}-{next(_saves)}"
+        path = os.path.join(root, version)
+        try:
+            os.makedirs(path)
+            return version, path
+        except FileExistsError:
+            continue
+
+def save_artifact(name: str, arrays: dict, meta: dict = None) -> str:
+    """
+    Write arrays as .npy files (memory-mappable) plus meta.json into a new
+    version, point CURRENT at it and prune old versions. Returns the version.
+    """
+    root = os.path.join(ARTIFACTS_DIR, name)
+    version, path = _new_version(root)
+    for key, array in arrays.items():
+        np.save(os.path.join(path, f"{key}.npy"), np.ascontiguousarray(array))
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(meta or {}, f)
+
+    pointer = _current_file(name) + ".tmp"
+    with open(pointer, "w") as f:
+        f.write(version)
+    os.replace(pointer, _current_file(name))
+
+    versions = sorted(entry for entry in os.listdir(root) if os.path.isdir(os.path.join(root, entry)))
+    for old in versions[:-ARTIFACTS_KEEP]:
+        if old != version:
+            shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+    return version
+
+def load_artifact(name: str, mmap: bool = True):
+    """
+    (arrays, meta, version) of the current version, or None. Arrays are
+    memory-mapped read-only by default, so workers share the page cache.
+    """
+    version = current_version(name)
+    if version is None:
+        return None
+    path = os.path.join(ARTIFACTS_DIR, name, version)
+    arrays = {}
+    for entry in os.listdir(path):
+        if entry.endswith(".npy"):
+            arrays[entry[:-4]] = np.load(os.path.join(path, entry), mmap_mode="r" if mmap else None)
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    return arrays, meta, version
+
+class ArtifactCache:
+    """
+    Lazily loaded artifact shared by a worker's requests. CURRENT is re-read
+    at most every ARTIFACT_RELOAD_SECONDS, so rebuilt artifacts are picked up
+    without restarting the API.
+    """
+    def __init__(self, name: str, factory):
+        self.name = name
+        self.factory = factory  # (arrays, meta) -> object served to the routes
+        self._value = None
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        if time.monotonic() - self._checked_at < ARTIFACT_RELOAD_SECONDS:
+            return self._value
+        with self._lock:
+            self._checked_at = time.monotonic()
+            version = current_version(self.name)
+            if version != self._version:
+                try:
+                    loaded = load_artifact(self.name)
+                    self._value = self.factory(*loaded[:2]) if loaded else None
+                    self._version = loaded[2] if loaded else None
+                except Exception as e:
+                    print(f"Error loading {self.name} artifact: {e}")
+        return self._value
+
+    @property
+    def version(self):
+        """
+        Version of the artifact currently loaded, if any.
+        """
+        return self._version
+
+    def clear(self):
+        with self._lock:
+            self._value = None
+            self._version = None
+            self._checked_at = 0.0
@@ -0,0 +1,131 @@
+import os
+import json
+from db.redis import get_redis_client
+from services.search import normalize_title
+
+# Sorted sets ac:{prefix} hold the best-scored titles starting with each prefix;
+# ac:docs maps movie id -> its current member so renames can be unindexed
+AUTOCOMPLETE_PREFIX = "ac:"
+AUTOCOMPLETE_DOCS_KEY = "ac:docs"
+AUTOCOMPLETE_MAX_PREFIX_LEN = int(os.getenv('AUTOCOMPLETE_MAX_PREFIX_LEN', 20))
+AUTOCOMPLETE_MAX_PER_PREFIX = int(os.getenv('AUTOCOMPLETE_MAX_PER_PREFIX', 50))
+AUTOCOMPLETE_SCORE_FIELD = os.getenv('AUTOCOMPLETE_SCORE_FIELD', 'num_reviews')
+AUTOCOMPLETE_BATCH_SIZE = 500
+
+# Fields a movie document needs for indexing
+AUTOCOMPLETE_PROJECTION = {"title": 1, "year": 1, AUTOCOMPLETE_SCORE_FIELD: 1}
+
+def prefixes(title: str) -> set:
+    """
+    Prefixes of the normalized title and of every word-suffix of it, so
+    "dark kn" and "knig" both find "The Dark Knight".
+    """
+    normalized = normalize_title(title)
+    starts = [0] + [i + 1 for i, ch in enumerate(normalized) if ch == " "]
+    result = set()
+    for start in starts:
+        suffix = normalized[start:start + AUTOCOMPLETE_MAX_PREFIX_LEN]
+        result.update(suffix[:length] for length in range(1, len(suffix) + 1))
+    return result
+
+def member_for(movie: dict) -> str:
+    return json.dumps(
+        {"id": str(movie["_id"]), "title": movie.get("title") or "", "year": movie.get("year")},
+        sort_keys=True, separators=(",", ":")
+    )
+
+def _score(movie: dict) -> float:
+    try:
+        return float(movie.get(AUTOCOMPLETE_SCORE_FIELD) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+def queue_index(pipe, movie: dict, previous: str = None):
+    """
+    Queue the commands that (re)index one movie on a redis-py or redis.asyncio pipeline.
+    `previous` is the member stored in ac:docs for the movie, if any.
+    """
+    member = member_for(movie)
+    if previous and previous != member:
+        queue_remove(pipe, previous)
+    score = _score(movie)
+    for prefix in prefixes(movie.get("title")):
+        key = AUTOCOMPLETE_PREFIX + prefix
+        pipe.zadd(key, {member: score})
+        pipe.zremrangebyrank(key, 0, -(AUTOCOMPLETE_MAX_PER_PREFIX + 1))
+    pipe.hset(AUTOCOMPLETE_DOCS_KEY, str(movie["_id"]), member)
+
+def queue_remove(pipe, member: str):
+    """
+    Queue removal of a stored member from every prefix set it was added to.
+    """
+    for prefix in prefixes(json.loads(member)["title"]):
+        pipe.zrem(AUTOCOMPLETE_PREFIX + prefix, member)
+    pipe.hdel(AUTOCOMPLETE_DOCS_KEY, json.loads(member)["id"])
+
+async def index_movie(client, movie: dict):
+    """
+    Keep the prefix index current after a movie write (awaitable Redis client).
+    """
+    try:
+        previous = await client.hget(AUTOCOMPLETE_DOCS_KEY, str(movie["_id"]))
+        pipe = client.pipeline(transaction=False)
+        queue_index(pipe, movie, previous)
+        await pipe.execute()
+    except Exception as e:
+        print(f"Autocomplete index error: {e}")
+
+async def suggest(client, query: str, limit: int = 10) -> list:
+    """
+    Top-k titles for a typed prefix, best score first. One ZREVRANGE, no MongoDB.
+    """
+    normalized = normalize_title(query)
+    if not normalized:
+        return []
+    key = AUTOCOMPLETE_PREFIX + normalized[:AUTOCOMPLETE_MAX_PREFIX_LEN]
+    truncated = len(normalized) > AUTOCOMPLETE_MAX_PREFIX_LEN
+    count = AUTOCOMPLETE_MAX_PER_PREFIX if truncated else limit
+    suggestions = []
+    for member, score in await client.zrevrange(key, 0, count - 1, withscores=True):
+        entry = json.loads(member)
+        # Longer than the indexed prefix: confirm the full query still matches
+        if truncated and normalized not in normalize_title(entry["title"]):
+            continue
+        entry["score"] = score
+        suggestions.append(entry)
+        if len(suggestions) >= limit:
+            break
+    return suggestions
+
+def build_autocomplete_index(db, redis_client=None, batch_size: int = AUTOCOMPLETE_BATCH_SIZE) -> int:
+    """
+    (Re)index every movie from MongoDB. Used by the loader and as a CLI.
+    """
+    redis_client = redis_client or get_redis_client()
+    indexed = 0
+    batch = []
+
+    def flush(movies):
+        previous = redis_client.hmget(AUTOCOMPLETE_DOCS_KEY, [str(m["_id"]) for m in movies])
+        pipe = redis_client.pipeline(transaction=False)
+        for movie, member in zip(movies, previous):
+            queue_index(pipe, movie, member)
+        pipe.execute()
+
+    for movie in db["movies"].find({}, AUTOCOMPLETE_PROJECTION):
+        batch.append(movie)
+        if len(batch) >= batch_size:
+            flush(batch)
+            indexed += len(batch)
+            batch = []
+    if batch:
+        flush(batch)
+        indexed += len(batch)
+    return indexed
+
+if __name__ == "__main__":
+    from db.mongo import get_mongo_client, MONGO_DB
+
+    print("Building autocomplete index...")
+    count = build_autocomplete_index(get_mongo_client()[MONGO_DB])
+    print(f"Indexed {count} movies for autocomplete")
@@ -0,0 +1,64 @@
+import os
+from bson import ObjectId
+from services.cache import get_many, set_many, MOVIE_CACHE_TTL
+from services.projection import INTERNAL_FIELDS, project
+
+# Largest number of ids accepted by POST /movies/batch
+MOVIE_BATCH_MAX = int(os.getenv('MOVIE_BATCH_MAX', 100))
+
+def movie_key(movie_id: str) -> str:
+    """
+    Cache key of GET /movies/{movie_id}, shared so both endpoints warm each other.
+    """
+    return f"movie:{movie_id}"
+
+async def resolve_movies(movies, ids: list, projection: dict = None) -> dict:
+    """
+    Map each requested id (ObjectId string or tmdb_id) to its movie document.
+
+    ObjectIds are looked up in the movie cache with one MGET; the misses and
+    all tmdb_ids are fetched with a single $in query whose results are written
+    back to the cache in one pipeline. Unknown ids are absent from the result.
+    Whole movies are cached; `projection` (a movie_projection) is applied to the result.
+    """
+    object_ids = {movie_id: ObjectId(movie_id) for movie_id in ids if ObjectId.is_valid(movie_id)}
+    tmdb_ids = {int(movie_id): movie_id for movie_id in ids if movie_id not in object_ids and movie_id.isdigit()}
+
+    cached_movies = await get_many([movie_key(movie_id) for movie_id in object_ids], "movie")
+    resolved = {movie_id: cached_movies[movie_key(movie_id)] for movie_id in object_ids
+                if movie_key(movie_id) in cached_movies}
+
+    clauses = []
+    misses = [oid for movie_id, oid in object_ids.items() if movie_id not in resolved]
+    if misses:
+        clauses.append({"_id": {"$in": misses}})
+    if tmdb_ids:
+        clauses.append({"tmdb_id": {"$in": list(tmdb_ids)}})
+    if not clauses:
+        return {movie_id: project(movie, projection) for movie_id, movie in resolved.items()}
+
+    query = clauses[0] if len(clauses) == 1 else {"$or": clauses}
+    loaded = {}
+    async for movie in movies.find(query, {name: 0 for name in INTERNAL_FIELDS}):
+        movie["_id"] = str(movie["_id"])
+        loaded[movie_key(movie["_id"])] = movie
+        if movie["_id"] in object_ids:
+            resolved[movie["_id"]] = movie
+        if movie.get("tmdb_id") in tmdb_ids:
+            resolved[tmdb_ids[movie["tmdb_id"]]] = movie
+    await set_many(loaded, "movie", MOVIE_CACHE_TTL)
+    return {movie_id: project(movie, projection) for movie_id, movie in resolved.items()}
+
+async def movies_by_tmdb_id(movies, tmdb_ids: list, projection: dict = None) -> dict:
+    """
+    tmdb_id -> movie document for ranked ids from the offline indexes, in one $in query.
+    """
+    # tmdb_id is needed to put the results back in rank order, and removed again when not requested
+    added = bool(projection) and any(projection.values()) and not projection.get("tmdb_id")
+    if added:
+        projection = {**projection, "tmdb_id": 1}
+    found = {}
+    async for movie in movies.find({"tmdb_id": {"$in": list(tmdb_ids)}}, projection):
+        movie["_id"] = str(movie["_id"])
+        found[movie.pop("tmdb_id") if added else movie["tmdb_id"]] = movie
+    return found
@@ -0,0 +1,326 @@
+import os
+import time
+import uuid
+import asyncio
+import inspect
+import functools
+from collections import OrderedDict
+from urllib.parse import urlencode
+from fastapi import params
+from db.redis import get_async_redis_client
+from services.serialization import dumps, loads, FastJSONResponse
+
+# Per-endpoint Redis TTLs (seconds)
+MOVIE_CACHE_TTL = int(os.getenv('MOVIE_CACHE_TTL', 1800))
+SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL', 1800))
+GENRE_CACHE_TTL = int(os.getenv('GENRE_CACHE_TTL', 1800))
+POPULAR_CACHE_TTL = int(os.getenv('POPULAR_CACHE_TTL', 3600))
+
+# Short-lived in-process layer in front of Redis (0 disables it)
+LOCAL_CACHE_TTL = float(os.getenv('LOCAL_CACHE_TTL', 5))
+LOCAL_CACHE_SIZE = int(os.getenv('LOCAL_CACHE_SIZE', 1024))
+
+# Single-flight lock: how long a recompute may hold it and how often waiters poll
+CACHE_LOCK_TTL_MS = int(os.getenv('CACHE_LOCK_TTL_MS', 5000))
+CACHE_LOCK_POLL_MS = int(os.getenv('CACHE_LOCK_POLL_MS', 50))
+
+STATS_KEY = "cache_stats"
+# Hit/miss counts are kept in memory and added to the Redis totals this often
+CACHE_STATS_FLUSH_SECONDS = float(os.getenv('CACHE_STATS_FLUSH_SECONDS', 10))
+
+class LocalTTLCache:
+    """
+    Bounded LRU of (expires_at, value) pairs local to this worker process.
+    """
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        if self.ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def delete(self, key):
+        self._entries.pop(key, None)
+
+    def keys(self):
+        return list(self._entries)
+
+    def delete_prefix(self, prefix):
+        for key in [k for k in self._entries if k.startswith(prefix)]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+
+local_cache = LocalTTLCache(LOCAL_CACHE_TTL, LOCAL_CACHE_SIZE)
+
+# Hit/miss counters for this process; Redis keeps the totals across workers
+local_stats = {}
+# Counts not yet added to the Redis totals, as "namespace:outcome" -> count
+_unflushed = {}
+
+# In-process single-flight: concurrent misses on one key share one future
+_inflight = {}
+
+def index_key(namespace: str) -> str:
+    """
+    Redis set holding every cached key of a namespace, used for invalidation.
+    """
+    return f"cache_index:{namespace}"
+
+def build_key(namespace: str, func, kwargs: dict, lowercase: bool = False) -> str:
+    """
+    Derive a cache key from a handler's arguments.
+
+    Parameters without a default are the route's path parameters and are
+    appended as `:value` segments, parameters with a default are its query
+    parameters and are appended as a sorted query string. Dependencies are skipped.
+    """
+    path_parts = []
+    query = []
+    for name, param in inspect.signature(func).parameters.items():
+        if isinstance(param.default, params.Depends) or name not in kwargs:
+            continue
+        value = kwargs[name]
+        if isinstance(value, str) and lowercase:
+            value = value.lower()
+        if param.default is inspect.Parameter.empty:
+            path_parts.append(str(value))
+        elif value is not None:
+            query.append((name, value))
+    key = ":".join([namespace] + path_parts)
+    if query:
+        key += "?" + urlencode(sorted(query))
+    return key
+
+def _count(namespace: str, outcome: str, amount: int = 1):
+    """
+    Count cache hits or misses in memory; flush_cache_stats adds them to Redis.
+    """
+    counters = local_stats.setdefault(namespace, {"hits": 0, "misses": 0})
+    counters[outcome] += amount
+    field = f"{namespace}:{outcome}"
+    _unflushed[field] = _unflushed.get(field, 0) + amount
+
+async def flush_cache_stats():
+    """
+    Add the counts gathered since the last flush to the Redis totals in one
+    pipeline. They are kept for the next flush if Redis is unavailable.
+    """
+    if not _unflushed:
+        return
+    pending = dict(_unflushed)
+    _unflushed.clear()
+    try:
+        pipe = get_async_redis_client().pipeline(transaction=False)
+        for field, amount in pending.items():
+            pipe.hincrby(STATS_KEY, field, amount)
+        await pipe.execute()
+    except Exception as e:
+        print(f"Redis stats error: {e}")
+        for field, amount in pending.items():
+            _unflushed[field] = _unflushed.get(field, 0) + amount
+
+async def maintain_cache_stats():
+    """
+    Background task: flush the hit/miss counts every CACHE_STATS_FLUSH_SECONDS.
+    """
+    while True:
+        await asyncio.sleep(CACHE_STATS_FLUSH_SECONDS)
+        await flush_cache_stats()
+
+async def _redis_get(key: str):
+    try:
+        value = await get_async_redis_client().get(key)
+        return loads(value) if value is not None else None
+    except Exception as e:
+        print(f"Redis get error: {e}")
+        return None
+
+async def _redis_set(key: str, namespace: str, value, ttl: int):
+    try:
+        client = get_async_redis_client()
+        await client.set(key, dumps(value), ex=ttl)
+        await client.sadd(index_key(namespace), key)
+        await client.expire(index_key(namespace), ttl)
+    except Exception as e:
+        print(f"Redis set error: {e}")
+
+async def _acquire_lock(key: str):
+    """
+    Try to become the single caller recomputing `key`. Returns a release token or None.
+    """
+    token = uuid.uuid4().hex
+    try:
+        if await get_async_redis_client().set(f"lock:{key}", token, nx=True, px=CACHE_LOCK_TTL_MS):
+            return token
+        return None
+    except Exception as e:
+        print(f"Redis lock error: {e}")
+        return token  # Redis unavailable: compute without coordination
+
+async def _release_lock(key: str, token: str):
+    try:
+        client = get_async_redis_client()
+        if await client.get(f"lock:{key}") == token:
+            await client.delete(f"lock:{key}")
+    except Exception as e:
+        print(f"Redis unlock error: {e}")
+
+async def _load(key: str, namespace: str, ttl: int, compute, cache_if=None):
+    """
+    Recompute a missing key once across all workers and store it in Redis,
+    unless cache_if rejects the value.
+    """
+    token = await _acquire_lock(key)
+    if token is None:
+        # Another worker is recomputing: wait for its result up to the lock TTL
+        deadline = time.monotonic() + CACHE_LOCK_TTL_MS / 1000
+        while time.monotonic() < deadline:
+            await asyncio.sleep(CACHE_LOCK_POLL_MS / 1000)
+            value = await _redis_get(key)
+            if value is not None:
+                return value
+        token = await _acquire_lock(key)
+    try:
+        value = await compute()
+        if cache_if is None or cache_if(value):
+            await _redis_set(key, namespace, value, ttl)
+        return value
+    finally:
+        if token is not None:
+            await _release_lock(key, token)
+
+async def read_through(key: str, namespace: str, ttl: int, compute, cache_if=None):
+    """
+    Return the cached value for `key`, computing and caching it on a miss.
+    Computed values for which cache_if(value) is false are returned uncached.
+    """
+    value = local_cache.get(key)
+    if value is not None:
+        _count(namespace, "hits")
+        return value
+
+    value = await _redis_get(key)
+    if value is not None:
+        _count(namespace, "hits")
+        local_cache.set(key, value)
+        return value
+
+    _count(namespace, "misses")
+    future = _inflight.get(key)
+    if future is not None:
+        return await asyncio.shield(future)
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        value = await _load(key, namespace, ttl, compute, cache_if)
+        if cache_if is None or cache_if(value):
+            local_cache.set(key, value)
+        future.set_result(value)
+        return value
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # Mark retrieved when nobody else was waiting
+        raise
+    finally:
+        del _inflight[key]
+
+async def get_many(keys: list, namespace: str) -> dict:
+    """
+    Cached values of many keys: the local layer first, then one Redis MGET.
+    Returns only the hits, as key -> value.
+    """
+    values = {}
+    remote = []
+    for key in keys:
+        value = local_cache.get(key)
+        if value is None:
+            remote.append(key)
+        else:
+            values[key] = value
+    if remote:
+        try:
+            for key, value in zip(remote, await get_async_redis_client().mget(remote)):
+                if value is not None:
+                    values[key] = loads(value)
+                    local_cache.set(key, values[key])
+        except Exception as e:
+            print(f"Redis mget error: {e}")
+    if values:
+        _count(namespace, "hits", len(values))
+    if len(keys) > len(values):
+        _count(namespace, "misses", len(keys) - len(values))
+    return values
+
+async def set_many(values: dict, namespace: str, ttl: int):
+    """
+    Cache many key -> value pairs in a single Redis pipeline.
+    """
+    if not values:
+        return
+    for key, value in values.items():
+        local_cache.set(key, value)
+    try:
+        pipe = get_async_redis_client().pipeline(transaction=False)
+        for key, value in values.items():
+            pipe.set(key, dumps(value), ex=ttl)
+        pipe.sadd(index_key(namespace), *values)
+        pipe.expire(index_key(namespace), ttl)
+        await pipe.execute()
+    except Exception as e:
+        print(f"Redis pipeline set error: {e}")
+
+def cached(namespace: str, ttl: int, lowercase: bool = False):
+    """
+    Read-through cache decorator for async route handlers.
+
+    Keys are built from the namespace plus the handler's path and query
+    parameters (see build_key). HTTPExceptions and other errors are not cached.
+    Values are returned as a FastJSONResponse, so hits are encoded straight
+    from the cached value.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(**kwargs):
+            key = build_key(namespace, func, kwargs, lowercase)
+            return FastJSONResponse(await read_through(key, namespace, ttl, lambda: func(**kwargs)))
+        return wrapper
+    return decorator
+
+async def get_cache_stats() -> dict:
+    """
+    Hit/miss counters for this process and, when Redis is reachable, across all workers.
+    """
+    stats = {"process": local_stats}
+    try:
+        await flush_cache_stats()
+        totals = {}
+        for field, count in (await get_async_redis_client().hgetall(STATS_KEY)).items():
+            namespace, outcome = field.rsplit(":", 1)
+            totals.setdefault(namespace, {"hits": 0, "misses": 0})[outcome] = int(count)
+        stats["cluster"] = totals
+    except Exception as e:
+        stats["cluster_error"] = str(e)
+    return stats
@@ -0,0 +1,293 @@
+import os
+import re
+import time
+import asyncio
+import numpy as np
+from bson import ObjectId
+from datetime import timedelta
+from typing import Optional
+from services.sampling import pivot, RANDOM_KEY_FIELD
+
+# Optional in-process columnar copy of the movies collection. Filters and
+# sorts of the list routes run as NumPy operations over it, and only the
+# resulting page is fetched from MongoDB by _id. Rows of movies named in cache
+# invalidation events and newly inserted movies are refreshed every
+# CATALOG_REFRESH_SECONDS; a full reload (which also drops deleted movies)
+# runs every CATALOG_RELOAD_SECONDS.
+CATALOG_ENABLED = os.getenv('CATALOG_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+CATALOG_REFRESH_SECONDS = float(os.getenv('CATALOG_REFRESH_SECONDS', 30))
+CATALOG_RELOAD_SECONDS = float(os.getenv('CATALOG_RELOAD_SECONDS', 3600))
+# ObjectIds are only roughly ordered by insertion (client clocks, concurrent
+# inserts), so each refresh also re-reads this window below the newest one
+CATALOG_OVERLAP_SECONDS = float(os.getenv('CATALOG_OVERLAP_SECONDS', 60))
+
+# Column -> dtype. Missing numbers are NaN (never matched by range filters, sorted last).
+COLUMNS = {
+    "year": np.float64,
+    "avg_rating": np.float64,
+    "num_reviews": np.float64,
+    "popularity": np.float64,
+    "runtime": np.float64,
+    RANDOM_KEY_FIELD: np.float64,
+}
+CATALOG_PROJECTION = {name: 1 for name in list(COLUMNS) + ["genres"]}
+GENRE_BITS = 64
+
+def _number(value) -> float:
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else np.nan
+
+class Catalog:
+    """
+    Immutable columnar snapshot: one array per field of COLUMNS, a uint64
+    bitmask of each movie's genres and the movie ObjectIds. Query methods
+    return ObjectIds in result order, or None when the snapshot can't answer
+    exactly (a genre beyond the 64 bits) and MongoDB should be asked instead.
+    """
+    def __init__(self, ids: np.ndarray, columns: dict, genre_masks: np.ndarray, genre_bits: dict, overflow: set):
+        self.ids = ids
+        self.columns = columns
+        self.genre_masks = genre_masks
+        self.genre_bits = genre_bits  # genre name -> bit
+        self.overflow = overflow  # genres without a bit
+        self.positions = {movie_id: row for row, movie_id in enumerate(ids.tolist())}
+        self.max_id = max(self.positions) if self.positions else None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_documents(cls, documents: list, genre_bits: dict = None, overflow: set = None):
+        """
+        Build a snapshot. Genres get bits in order of frequency, continuing
+        from `genre_bits` when extending an existing snapshot.
+        """
+        genre_bits = dict(genre_bits or {})
+        overflow = set(overflow or ())
+        counts = {}
+        for document in documents:
+            for genre in document.get("genres") or []:
+                counts[genre] = counts.get(genre, 0) + 1
+        for genre in sorted(counts, key=lambda name: -counts[name]):
+            if genre in genre_bits or genre in overflow:
+                continue
+            if len(genre_bits) < GENRE_BITS:
+                genre_bits[genre] = len(genre_bits)
+            else:
+                overflow.add(genre)
+
+        ids = np.empty(len(documents), dtype=object)
+        ids[:] = [document["_id"] for document in documents]
+        columns = {
+            name: np.array([_number(document.get(name)) for document in documents], dtype=dtype)
+            for name, dtype in COLUMNS.items()
+        }
+        masks = np.zeros(len(documents), dtype=np.uint64)
+        for row, document in enumerate(documents):
+            mask = 0
+            for genre in document.get("genres") or []:
+                if genre in genre_bits:
+                    mask |= 1 << genre_bits[genre]
+            masks[row] = mask
+        return cls(ids, columns, masks, genre_bits, overflow)
+
+    def updated(self, documents: list):
+        """
+        New snapshot with `documents` replacing their movies' rows or appended as new movies.
+        """
+        if not documents:
+            return self
+        fresh = Catalog.from_documents(documents, self.genre_bits, self.overflow)
+        rows = np.array([self.positions.get(movie_id, -1) for movie_id in fresh.ids.tolist()])
+        new = rows < 0
+
+        def merge(current, changed):
+            merged = np.concatenate([current, changed[new]])
+            merged[rows[~new]] = changed[~new]
+            return merged
+
+        return Catalog(
+            merge(self.ids, fresh.ids),
+            {name: merge(column, fresh.columns[name]) for name, column in self.columns.items()},
+            merge(self.genre_masks, fresh.genre_masks),
+            fresh.genre_bits,
+            fresh.overflow
+        )
+
+    def _genre_mask(self, names) -> Optional[int]:
+        """
+        Bitmask of genre names (unknown names match nothing), None if one has no bit.
+        """
+        mask = 0
+        for name in names:
+            if name in self.overflow:
+                return None
+            if name in self.genre_bits:
+                mask |= 1 << self.genre_bits[name]
+        return mask
+
+    def _with_genres(self, mask: int) -> np.ndarray:
+        return (self.genre_masks & np.uint64(mask)) != 0
+
+    def _top(self, selected: np.ndarray, limit: int, *keys) -> list:
+        """
+        ObjectIds of the `limit` selected rows with the largest keys (first key
+        first, later keys breaking ties), largest first.
+        """
+        rows = np.flatnonzero(selected)
+        if limit <= 0 or not len(rows):
+            return []
+        keys = [np.nan_to_num(key[rows], nan=-np.inf) for key in keys]
+        if limit < len(rows):
+            # Keep the candidates for the top `limit`, ties at the boundary included
+            kth = np.partition(keys[0], len(rows) - limit)[len(rows) - limit]
+            candidates = keys[0] >= kth
+            rows = rows[candidates]
+            keys = [key[candidates] for key in keys]
+        order = np.lexsort([-key for key in reversed(keys)])
+        return self.ids[rows[order[:limit]]].tolist()
+
+    def popular(self, limit: int, min_reviews: int = 100) -> list:
+        """
+        Movies with at least min_reviews reviews by avg_rating, then num_reviews.
+        """
+        return self._top(self.columns["num_reviews"] >= min_reviews, limit,
+                         self.columns["avg_rating"], self.columns["num_reviews"])
+
+    def by_genre(self, pattern: str, limit: int) -> Optional[list]:
+        """
+        Best-rated movies with a genre matching `pattern` case-insensitively,
+        like the route's $regex filter.
+        """
+        try:
+            regex = re.compile(pattern, re.IGNORECASE)
+        except re.error:
+            return None
+        mask = self._genre_mask([name for name in list(self.genre_bits) + list(self.overflow) if regex.search(name)])
+        if mask is None:
+            return None
+        return self._top(self._with_genres(mask), limit, self.columns["avg_rating"])
+
+    def similar(self, movie_id, genres: list, min_rating: float, max_rating: float, limit: int) -> Optional[list]:
+        """
+        Best-rated other movies sharing a genre with an avg_rating in the band.
+        """
+        mask = self._genre_mask(genres)
+        if mask is None:
+            return None
+        rating = self.columns["avg_rating"]
+        selected = self._with_genres(mask) & (rating >= min_rating) & (rating <= max_rating)
+        row = self.positions.get(movie_id)
+        if row is not None:
+            selected[row] = False
+        return self._top(selected, limit, rating)
+
+    def sample(self, limit: int, genre: Optional[str] = None, year: Optional[int] = None,
+               seed: Optional[int] = None, page: int = 0) -> Optional[list]:
+        """
+        Random movies with the semantics of sampling.sample_movies: the next
+        `limit` random keys after the same pivot, so seeded pages match.
+        """
+        selected = np.ones(len(self.ids), dtype=bool)
+        if genre:
+            mask = self._genre_mask([genre])
+            if mask is None:
+                return None
+            selected &= self._with_genres(mask)
+        if year is not None:
+            selected &= self.columns["year"] == year
+        if not genre and year is None and seed is None:
+            rows = np.flatnonzero(selected)
+            chosen = np.random.default_rng().choice(len(rows), size=min(limit, len(rows)), replace=False)
+            return self.ids[rows[chosen]].tolist()
+
+        keys = self.columns[RANDOM_KEY_FIELD]
+        start = pivot(seed, page)
+        found = self._top(selected & (keys >= start), limit, -keys)
+        if len(found) < limit:
+            # Wrap around to the lowest keys
+            found.extend(self._top(selected & (keys < start), limit - len(found), -keys))
+        return found
+
+_catalog = None
+_loaded_at = 0.0
+_changed = set()
+
+def get_catalog() -> Optional[Catalog]:
+    """
+    The current snapshot, or None when the catalog is disabled or not loaded yet.
+    """
+    return _catalog if CATALOG_ENABLED else None
+
+def mark_changed(movie_id):
+    """
+    Queue a movie's row for the next delta refresh.
+    """
+    if CATALOG_ENABLED and ObjectId.is_valid(str(movie_id)):
+        _changed.add(ObjectId(str(movie_id)))
+
+async def load_catalog(movies) -> Catalog:
+    """
+    Replace the snapshot with a full copy of the movies collection.
+    """
+    global _catalog, _loaded_at
+    _changed.clear()
+    documents = await movies.find({}, CATALOG_PROJECTION).to_list(None)
+    _catalog = Catalog.from_documents(documents)
+    _loaded_at = time.monotonic()
+    return _catalog
+
+def _newer_than(max_id) -> dict:
+    """
+    Filter for movies possibly inserted after the snapshot's newest movie:
+    ObjectIds generated from CATALOG_OVERLAP_SECONDS before it onwards.
+    """
+    if not isinstance(max_id, ObjectId):
+        return {"_id": {"$gt": max_id}}
+    since = max_id.generation_time - timedelta(seconds=CATALOG_OVERLAP_SECONDS)
+    return {"_id": {"$gte": ObjectId.from_datetime(since)}}
+
+async def refresh_catalog(movies) -> int:
+    """
+    Re-read changed movies and read movies inserted since the snapshot (see
+    _newer_than; rows already present are replaced). Returns the number of
+    rows refreshed.
+    """
+    global _catalog
+    if _catalog is None:
+        return len(await load_catalog(movies))
+    changed = list(_changed)
+    _changed.difference_update(changed)
+    query = {"_id": {"$in": changed}} if changed else {}
+    if _catalog.max_id is not None:
+        newer = _newer_than(_catalog.max_id)
+        query = {"$or": [query, newer]} if changed else newer
+    documents = await movies.find(query, CATALOG_PROJECTION).to_list(None)
+    _catalog = _catalog.updated(documents)
+    return len(documents)
+
+async def catalog_movies(movies, ids: list, projection: dict) -> list:
+    """
+    Documents of catalog results in result order, with one _id lookup.
+    """
+    if not ids:
+        return []
+    found = {movie["_id"]: movie for movie in await movies.find({"_id": {"$in": ids}}, projection).to_list(None)}
+    return [found[movie_id] for movie_id in ids if movie_id in found]
+
+async def maintain_catalog(get_db):
+    """
+    Background task: load the catalog, then apply deltas every
+    CATALOG_REFRESH_SECONDS and reload it every CATALOG_RELOAD_SECONDS.
+    """
+    if not CATALOG_ENABLED:
+        return
+    while True:
+        try:
+            movies = get_db()["movies"]
+            if _catalog is None or time.monotonic() - _loaded_at >= CATALOG_RELOAD_SECONDS:
+                print(f"✅ Movie catalog loaded: {len(await load_catalog(movies))} movies")
+            else:
+                await refresh_catalog(movies)
+        except Exception as e:
+            print(f"Movie catalog refresh error: {e}")
+        await asyncio.sleep(CATALOG_REFRESH_SECONDS)
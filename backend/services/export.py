@@ -0,0 +1,116 @@
+import io
+import os
+from typing import Optional
+from bson import ObjectId
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from services.serialization import dumps
+from services.projection import FIELD_NAME
+
+# Arrow IPC export is optional
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# Documents pulled from the cursor, encoded and flushed per chunk
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+MAX_EXPORT_BATCH_SIZE = int(os.getenv('MAX_EXPORT_BATCH_SIZE', 10000))
+
+NDJSON = "ndjson"
+ARROW = "arrow"
+MEDIA_TYPES = {
+    NDJSON: "application/x-ndjson",
+    ARROW: "application/vnd.apache.arrow.stream",
+}
+
+def field_projection(fields: Optional[str], hidden: tuple = ()) -> Optional[dict]:
+    """
+    Projection for a comma-separated `fields` list; every field but the
+    hidden ones when no list is given. Names that aren't top-level field names are a 400.
+    """
+    if not fields:
+        return {name: 0 for name in hidden} or None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    invalid = [name for name in names if not FIELD_NAME.fullmatch(name)]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid field names: {', '.join(invalid)}")
+    names = [name for name in names if name not in hidden]
+    if not names:
+        raise HTTPException(status_code=400, detail="No exportable fields requested.")
+    return {name: 1 for name in names}
+
+def _plain(value):
+    """
+    ObjectIds as strings, recursively, so documents convert to Arrow.
+    """
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_plain(item) for item in value]
+    return value
+
+async def _batches(cursor, batch_size: int):
+    """
+    Successive lists of at most `batch_size` documents; only one is held at a time.
+    """
+    try:
+        while True:
+            batch = await cursor.to_list(batch_size)
+            if not batch:
+                return
+            yield batch
+    finally:
+        await cursor.close()
+
+async def _ndjson(batches):
+    async for batch in batches:
+        yield b"".join(dumps(document) + b"\n" for document in batch)
+
+def _drain(sink: io.BytesIO) -> bytes:
+    chunk = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return chunk
+
+async def _arrow(batches):
+    """
+    One Arrow record batch per cursor batch. The schema is inferred from the
+    first batch; later batches are coerced to it (pin it with `fields`).
+    """
+    sink = io.BytesIO()
+    writer = None
+    try:
+        async for batch in batches:
+            rows = [_plain(document) for document in batch]
+            if writer is None:
+                record_batch = pa.RecordBatch.from_pylist(rows)
+                writer = pa.ipc.new_stream(sink, record_batch.schema)
+            else:
+                record_batch = pa.RecordBatch.from_pylist(rows, schema=writer.schema)
+            writer.write_batch(record_batch)
+            yield _drain(sink)
+        if writer is None:
+            writer = pa.ipc.new_stream(sink, pa.schema([]))
+    finally:
+        if writer is not None:
+            writer.close()
+    yield _drain(sink)
+
+def stream_export(cursor, batch_size: int = EXPORT_BATCH_SIZE, export_format: str = NDJSON,
+                  filename: str = "export") -> StreamingResponse:
+    """
+    Stream a Motor-style cursor as NDJSON or an Arrow IPC stream.
+    Memory stays at one batch whatever the size of the result.
+    """
+    if export_format == ARROW and pa is None:
+        raise HTTPException(status_code=501, detail="Arrow export requires pyarrow to be installed.")
+    encode = _arrow if export_format == ARROW else _ndjson
+    extension = "arrows" if export_format == ARROW else "ndjson"
+    return StreamingResponse(
+        encode(_batches(cursor, batch_size)),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{extension}"'}
+    )
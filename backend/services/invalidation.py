@@ -0,0 +1,107 @@
+import os
+import re
+import json
+import asyncio
+import redis.asyncio
+from typing import List, Optional
+from db.redis import REDIS_HOST, REDIS_PORT, REDIS_DB, get_async_redis_client
+from services.cache import local_cache, index_key
+from services.catalog import mark_changed
+
+# Pub/sub channel every API worker listens on for cache invalidation events
+INVALIDATION_CHANNEL = os.getenv('CACHE_INVALIDATION_CHANNEL', 'cinemate:invalidate')
+INVALIDATION_RETRY_SECONDS = float(os.getenv('CACHE_INVALIDATION_RETRY_SECONDS', 2))
+
+def _term(key: str, namespace: str) -> str:
+    """
+    The path value of a cached key, e.g. "action" for "genre:action?limit=10".
+    """
+    return key[len(namespace) + 1:].split("?", 1)[0]
+
+def _matches(term: str, values: List[str]) -> bool:
+    """
+    Mirror the routes' case-insensitive $regex match of a search term against values.
+    """
+    try:
+        pattern = re.compile(term, re.IGNORECASE)
+    except re.error:
+        return True
+    return any(pattern.search(value or "") for value in values)
+
+def is_affected(key: str, event: dict) -> bool:
+    """
+    Whether a cached key may contain the movie described by a change event.
+    Unknown genres evict the whole genre namespace.
+    """
+    if key == f"movie:{event['movie_id']}":
+        return True
+    if key.startswith("popular_movies"):
+        return True
+    if key.startswith("genre:"):
+        genres = event.get("genres")
+        return genres is None or _matches(_term(key, "genre"), genres)
+    if key.startswith("search:"):
+        # Text search also matches tagline and description, so any cached search may rank the movie
+        return True
+    return False
+
+def evict_local(event: dict) -> int:
+    """
+    Drop affected entries from this worker's in-process cache layer and queue
+    the movie's row of the in-memory catalog for refresh.
+    """
+    keys = [key for key in local_cache.keys() if is_affected(key, event)]
+    for key in keys:
+        local_cache.delete(key)
+    mark_changed(event["movie_id"])
+    return len(keys)
+
+async def _evict_redis(event: dict) -> int:
+    client = get_async_redis_client()
+    keys = [f"movie:{event['movie_id']}"]
+    for namespace in ("popular_movies", "genre", "search"):
+        members = await client.smembers(index_key(namespace))
+        stale = [key for key in members if is_affected(key, event)]
+        if stale:
+            await client.srem(index_key(namespace), *stale)
+            keys.extend(stale)
+    return await client.delete(*keys)
+
+async def publish_movie_changed(movie_id: str, genres: Optional[List[str]] = None,
+                                title: Optional[str] = None):
+    """
+    Evict cached data for a changed movie from Redis and tell every worker to
+    evict it from their in-process layer.
+    """
+    event = {"type": "movie_changed", "movie_id": str(movie_id), "genres": genres, "title": title}
+    evict_local(event)
+    try:
+        await _evict_redis(event)
+        await get_async_redis_client().publish(INVALIDATION_CHANNEL, json.dumps(event))
+    except Exception as e:
+        print(f"Redis invalidation error: {e}")
+
+async def listen_for_invalidations():
+    """
+    Background task: subscribe to the invalidation channel and evict local entries.
+    Reconnects after INVALIDATION_RETRY_SECONDS if Redis goes away.
+    """
+    while True:
+        client = redis.asyncio.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, decode_responses=True)
+        try:
+            async with client.pubsub() as pubsub:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    try:
+                        evict_local(json.loads(message["data"]))
+                    except (ValueError, KeyError) as e:
+                        print(f"Invalid invalidation event: {e}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Invalidation listener error: {e}")
+            await asyncio.sleep(INVALIDATION_RETRY_SECONDS)
+        finally:
+            await client.close()
@@ -0,0 +1,285 @@
+import os
+import uuid
+import asyncio
+from datetime import datetime
+from pymongo import UpdateOne
+from db.redis import get_async_redis_client
+
+# Materialized analytics: per-genre, per-year and per-decade rollups kept in
+# the movie_stats collection. A full rebuild ($merge) runs on a schedule and
+# after each load; review writes adjust the affected rollups incrementally.
+MOVIE_STATS_COLLECTION = "movie_stats"
+MOVIE_STATS_REFRESH_SECONDS = int(os.getenv('MOVIE_STATS_REFRESH_SECONDS', 3600))  # 0 disables the schedule
+MOVIE_STATS_TOP_K = int(os.getenv('MOVIE_STATS_TOP_K', 50))  # movies kept per decade
+# Only one rebuild runs at a time across API workers and load_data; the lock
+# expires after this long in case its holder dies mid-rebuild
+MOVIE_STATS_LOCK_SECONDS = int(os.getenv('MOVIE_STATS_LOCK_SECONDS', 600))
+MOVIE_STATS_LOCK_KEY = "lock:movie_stats_refresh"
+
+def _decade(year_field: str = "$year") -> dict:
+    return {"$toInt": {"$multiply": [{"$floor": {"$divide": [year_field, 10]}}, 10]}}
+
+def _merge(refresh_id: str, kind: str) -> list:
+    return [
+        {"$set": {"kind": kind, "refresh_id": refresh_id, "updated_at": "$$NOW"}},
+        {"$merge": {"into": MOVIE_STATS_COLLECTION, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}}
+    ]
+
+def rollup_pipelines(refresh_id: str) -> dict:
+    """
+    kind -> pipeline over movies rebuilding that kind of rollup. Sums are
+    stored instead of averages so review writes can adjust them with $inc.
+    """
+    return {
+        "genre": [
+            {"$unwind": "$genres"},
+            {"$group": {
+                "_id": {"$concat": ["genre:", "$genres"]},
+                "key": {"$first": "$genres"},
+                "count": {"$sum": 1},
+                "rating_sum": {"$sum": "$avg_rating"},
+                "total_reviews": {"$sum": "$num_reviews"},
+                "budget_sum": {"$sum": "$budget"},
+                "revenue_sum": {"$sum": "$revenue"}
+            }},
+        ] + _merge(refresh_id, "genre"),
+        "year": [
+            {"$group": {
+                "_id": {"$concat": ["year:", {"$toString": "$year"}]},
+                "key": {"$first": "$year"},
+                "movie_count": {"$sum": 1},
+                "rating_sum": {"$sum": "$avg_rating"},
+                "total_budget": {"$sum": "$budget"},
+                "total_revenue": {"$sum": "$revenue"},
+                "runtime_sum": {"$sum": "$runtime"}
+            }},
+        ] + _merge(refresh_id, "year"),
+        "decade": [
+            {"$group": {
+                "_id": {"$concat": ["decade:", {"$toString": _decade()}]},
+                "key": {"$first": _decade()},
+                "top_movies": {"$topN": {
+                    "n": MOVIE_STATS_TOP_K,
+                    "sortBy": {"avg_rating": -1},
+                    "output": {
+                        "movie_id": {"$toString": "$_id"},
+                        "title": "$title",
+                        "year": "$year",
+                        "avg_rating": "$avg_rating",
+                        "num_reviews": "$num_reviews"
+                    }
+                }}
+            }},
+        ] + _merge(refresh_id, "decade"),
+    }
+
+async def _acquire_refresh_lock(refresh_id: str) -> bool:
+    """
+    Whether this rebuild may run: no other one holds the lock (or Redis is unavailable).
+    """
+    try:
+        return bool(await get_async_redis_client().set(MOVIE_STATS_LOCK_KEY, refresh_id, nx=True,
+                                                       ex=MOVIE_STATS_LOCK_SECONDS))
+    except Exception as e:
+        print(f"Redis lock error: {e}")
+        return True  # Redis unavailable: rebuild without coordination
+
+async def _release_refresh_lock(refresh_id: str):
+    try:
+        client = get_async_redis_client()
+        if await client.get(MOVIE_STATS_LOCK_KEY) == refresh_id:
+            await client.delete(MOVIE_STATS_LOCK_KEY)
+    except Exception as e:
+        print(f"Redis unlock error: {e}")
+
+async def refresh_movie_stats(db):
+    """
+    Rebuild every rollup from the movies collection and drop rollups of
+    genres/years that no longer exist. Returns kind -> rollup count, or None
+    when another rebuild is already running (its cleanup would otherwise
+    delete the rollups this one merged).
+    """
+    refresh_id = uuid.uuid4().hex
+    if not await _acquire_refresh_lock(refresh_id):
+        return None
+    try:
+        stats = db[MOVIE_STATS_COLLECTION]
+        counts = {}
+        for kind, pipeline in rollup_pipelines(refresh_id).items():
+            await db["movies"].aggregate(pipeline, allowDiskUse=True).to_list(None)
+            await stats.delete_many({"kind": kind, "refresh_id": {"$ne": refresh_id}})
+            counts[kind] = await stats.count_documents({"kind": kind})
+        await stats.update_one({"_id": "meta"}, {"$set": {"kind": "meta"}, "$currentDate": {"refreshed_at": True}},
+                               upsert=True)
+        return counts
+    finally:
+        await _release_refresh_lock(refresh_id)
+
+async def apply_review(db, before: dict, after: dict):
+    """
+    Adjust the rollups of a movie whose rating counters changed from `before`
+    to `after`. Rollups that were never built are left alone. A movie that
+    falls out of its decade's top list is only replaced at the next rebuild,
+    which is why more than the displayed top-5 is kept.
+    """
+    rating_delta = (after.get("avg_rating") or 0) - (before.get("avg_rating") or 0)
+    reviews_delta = (after.get("num_reviews") or 0) - (before.get("num_reviews") or 0)
+    updated = {"$currentDate": {"updated_at": True}}
+    operations = [
+        UpdateOne({"_id": f"genre:{genre}"}, {"$inc": {"rating_sum": rating_delta, "total_reviews": reviews_delta}, **updated})
+        for genre in before.get("genres") or []
+    ]
+    year = before.get("year")
+    if year is not None:
+        movie_id = str(before["_id"])
+        entry = {
+            "movie_id": movie_id,
+            "title": {"$literal": after.get("title")},
+            "year": year,
+            "avg_rating": after.get("avg_rating"),
+            "num_reviews": after.get("num_reviews")
+        }
+        operations.append(UpdateOne({"_id": f"year:{year}"}, {"$inc": {"rating_sum": rating_delta}, **updated}))
+        operations.append(UpdateOne({"_id": f"decade:{year // 10 * 10}"}, [{"$set": {
+            "top_movies": {"$slice": [
+                {"$sortArray": {
+                    "input": {"$concatArrays": [
+                        {"$filter": {"input": "$top_movies", "cond": {"$ne": ["$$this.movie_id", movie_id]}}},
+                        [entry]
+                    ]},
+                    "sortBy": {"avg_rating": -1}
+                }},
+                MOVIE_STATS_TOP_K
+            ]},
+            "updated_at": "$$NOW"
+        }}]))
+    if operations:
+        await db[MOVIE_STATS_COLLECTION].bulk_write(operations, ordered=False)
+
+async def _rollups(db, kind: str, query: dict = None, sort: list = None, limit: int = 0):
+    """
+    (rollup documents, freshness) of one kind, or None when the rollups were
+    never built or none of this kind exist, so callers aggregate live.
+    """
+    stats = db[MOVIE_STATS_COLLECTION]
+    meta = await stats.find_one({"_id": "meta"})
+    if meta is None or await stats.find_one({"kind": kind}, {"_id": 1}) is None:
+        return None
+    cursor = stats.find({"kind": kind, **(query or {})})
+    if sort:
+        cursor = cursor.sort(sort)
+    if limit:
+        cursor = cursor.limit(limit)
+    documents = await cursor.to_list(None)
+    freshness = {
+        "as_of": max((document["updated_at"] for document in documents), default=meta["refreshed_at"]),
+        "refreshed_at": meta["refreshed_at"]
+    }
+    return documents, freshness
+
+def _average(total, count):
+    return total / count if count else None
+
+async def genre_stats(db, limit: int = None):
+    """
+    genre_stats_pipeline results served from the rollups, with their freshness.
+    """
+    found = await _rollups(db, "genre", sort=[("count", -1)], limit=limit or 0)
+    if found is None:
+        return None
+    documents, freshness = found
+    return [
+        {
+            "_id": document["key"],
+            "count": document["count"],
+            "avg_rating": _average(document["rating_sum"], document["count"]),
+            "total_reviews": document["total_reviews"],
+            "avg_budget": _average(document["budget_sum"], document["count"]),
+            "avg_revenue": _average(document["revenue_sum"], document["count"])
+        }
+        for document in documents
+    ], freshness
+
+async def popular_genres(db, limit: int = 10):
+    """
+    POPULAR_GENRES_QUERY results (movie count and average rating per genre) from the rollups.
+    """
+    found = await genre_stats(db)
+    if found is None:
+        return None
+    genres, freshness = found
+    genres.sort(key=lambda genre: (-genre["count"], -(genre["avg_rating"] or 0)))
+    return [
+        {"genre": genre["_id"], "movie_count": genre["count"], "avg_rating": genre["avg_rating"]}
+        for genre in genres[:limit]
+    ], freshness
+
+async def yearly_trends(db, start_year: int = 1990, end_year: int = 2020, limit: int = None):
+    """
+    yearly_trends_pipeline results served from the rollups, with their freshness.
+    """
+    found = await _rollups(db, "year", {"key": {"$gte": start_year, "$lte": end_year}}, [("key", 1)], limit or 0)
+    if found is None:
+        return None
+    documents, freshness = found
+    return [
+        {
+            "_id": document["key"],
+            "movie_count": document["movie_count"],
+            "avg_rating": _average(document["rating_sum"], document["movie_count"]),
+            "total_budget": document["total_budget"],
+            "total_revenue": document["total_revenue"],
+            "avg_runtime": _average(document["runtime_sum"], document["movie_count"])
+        }
+        for document in documents
+    ], freshness
+
+async def top_rated_by_decade(db, start_year: int = 1990, end_year: int = 2020, per_decade: int = 5):
+    """
+    top_rated_by_decade_pipeline results served from the rollups, with their freshness.
+    Whole decades overlapping the year range are reported.
+    """
+    query = {"key": {"$gte": start_year // 10 * 10, "$lte": end_year}}
+    found = await _rollups(db, "decade", query, [("key", 1)])
+    if found is None:
+        return None
+    documents, freshness = found
+    return [
+        {"_id": f"{document['key']}s", "top_movies": document["top_movies"][:per_decade]}
+        for document in documents
+    ], freshness
+
+async def maintain_movie_stats(get_db):
+    """
+    Background task: rebuild the rollups whenever the last full refresh is
+    older than MOVIE_STATS_REFRESH_SECONDS (including when they were never built).
+    """
+    if MOVIE_STATS_REFRESH_SECONDS <= 0:
+        return
+    while True:
+        wait = MOVIE_STATS_REFRESH_SECONDS
+        try:
+            db = get_db()
+            meta = await db[MOVIE_STATS_COLLECTION].find_one({"_id": "meta"})
+            age = (datetime.utcnow() - meta["refreshed_at"]).total_seconds() if meta else None
+            if age is None or age >= MOVIE_STATS_REFRESH_SECONDS:
+                counts = await refresh_movie_stats(db)
+                if counts is None:
+                    print("Movie stats rebuild already running in another worker")
+                else:
+                    print(f"✅ Movie stats rebuilt: {', '.join(f'{count} {kind}' for kind, count in counts.items())}")
+            else:
+                wait = MOVIE_STATS_REFRESH_SECONDS - age
+        except Exception as e:
+            print(f"Movie stats refresh error: {e}")
+        await asyncio.sleep(wait)
+
+if __name__ == "__main__":
+    from db.aio import ThreadedDatabase
+    from db.mongo import get_mongo_client, MONGO_DB
+
+    counts = asyncio.run(refresh_movie_stats(ThreadedDatabase(get_mongo_client()[MONGO_DB])))
+    if counts is None:
+        print("Movie stats rebuild already running; skipped")
+    else:
+        print(f"Movie stats rebuilt: {', '.join(f'{count} {kind}' for kind, count in counts.items())}")
@@ -0,0 +1,46 @@
+import os
+import base64
+from typing import Optional
+from bson import json_util
+from fastapi import HTTPException
+
+# Page sizes for the list endpoints
+DEFAULT_PAGE_SIZE = int(os.getenv('DEFAULT_PAGE_SIZE', 20))
+MOVIE_PAGE_SIZE = int(os.getenv('MOVIE_PAGE_SIZE', 10))  # /movies/ keeps its smaller default page
+MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', 100))
+
+def encode_cursor(last_id) -> str:
+    """
+    Opaque cursor pointing just after the document with `last_id`.
+    """
+    return base64.urlsafe_b64encode(json_util.dumps({"after": last_id}).encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        return json_util.loads(base64.urlsafe_b64decode(cursor.encode()).decode())["after"]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor.")
+
+async def paginate(collection, query: dict, limit: int, cursor: Optional[str] = None,
+                   projection: Optional[dict] = None):
+    """
+    One keyset page ordered by _id: documents after the cursor, plus the cursor
+    of the following page (None on the last page). Each page is an index range
+    scan, so deep pages cost the same as the first one.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if cursor:
+        query = {**query, "_id": {"$gt": decode_cursor(cursor)}}
+    documents = await collection.find(query, projection).sort("_id", 1).limit(limit + 1).to_list(limit + 1)
+    has_more = len(documents) > limit
+    documents = documents[:limit]
+    next_cursor = encode_cursor(documents[-1]["_id"]) if has_more else None
+    return documents, next_cursor
+
+async def total_count(collection, query: dict) -> int:
+    """
+    Collection size from metadata when unfiltered, otherwise an index-backed count.
+    """
+    if not query:
+        return await collection.estimated_document_count()
+    return await collection.count_documents(query)
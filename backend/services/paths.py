@@ -0,0 +1,54 @@
+import os
+from services.cache import read_through, get_many, set_many
+
+# Shortest paths only change when movies or genres are added, so they are cached long
+PATH_CACHE_TTL = int(os.getenv('PATH_CACHE_TTL', 86400))
+PATH_BATCH_MAX = int(os.getenv('PATH_BATCH_MAX', 100))
+
+def path_key(movie1_id: int, movie2_id: int, max_depth: int) -> str:
+    """
+    Paths are undirected, so (a, b) and (b, a) share one key.
+    """
+    low, high = sorted((movie1_id, movie2_id))
+    return f"path:{low}:{high}?max_depth={max_depth}"
+
+def _found(path: dict) -> bool:
+    """
+    Only found paths are cached: a later graph write may connect two movies
+    that had no path, while existing paths stay valid.
+    """
+    return path["hops"] is not None
+
+def _from(path: dict, movie_id: int) -> dict:
+    """
+    A cached path, reversed when it was stored from the other end.
+    """
+    if path["nodes"] and path["nodes"][0]["id"] != movie_id:
+        return {**path, "nodes": path["nodes"][::-1]}
+    return path
+
+async def shortest_path(graph, movie1_id: int, movie2_id: int, max_depth: int) -> dict:
+    """
+    Cached shortest path between two movies, oriented from movie1_id.
+    """
+    low, high = sorted((movie1_id, movie2_id))
+    path = await read_through(path_key(movie1_id, movie2_id, max_depth), "path", PATH_CACHE_TTL,
+                              lambda: graph.get_shortest_path_between_movies(low, high, max_depth), _found)
+    return _from(path, movie1_id)
+
+async def shortest_paths(graph, movie_id: int, target_ids: list, max_depth: int) -> dict:
+    """
+    Shortest paths from one movie to many: cached pairs come from one MGET,
+    the rest from a single graph query. Returns target id -> path; unknown
+    targets are left out.
+    """
+    keys = {target_id: path_key(movie_id, target_id, max_depth) for target_id in target_ids}
+    cached = await get_many(list(keys.values()), "path")
+    paths = {target_id: cached[key] for target_id, key in keys.items() if key in cached}
+    missing = [target_id for target_id in target_ids if target_id not in paths]
+    if missing:
+        found = await graph.get_shortest_paths_from_movie(movie_id, missing, max_depth)
+        await set_many({keys[target_id]: path for target_id, path in found.items() if _found(path)},
+                       "path", PATH_CACHE_TTL)
+        paths.update(found)
+    return {target_id: _from(paths[target_id], movie_id) for target_id in target_ids if target_id in paths}
@@ -0,0 +1,50 @@
+import re
+from typing import Optional, Literal
+from fastapi import HTTPException
+
+# Bookkeeping fields of movie documents that are never part of a response
+INTERNAL_FIELDS = ("rating_sum", "content_hash", "title_norm", "rand")
+
+# Named projection profiles of the movie endpoints. "full" is every field
+# except the internal ones.
+CARD_FIELDS = ("title", "year", "genres", "avg_rating", "num_reviews", "poster_url")
+DETAIL_FIELDS = CARD_FIELDS + ("description", "tagline", "director", "cast", "runtime", "popularity", "tmdb_id")
+PROFILES = {
+    "card": CARD_FIELDS,
+    "detail": DETAIL_FIELDS,
+    "full": None,
+}
+Profile = Literal["card", "detail", "full"]
+
+# Names accepted in `fields`: top-level document fields only, so MongoDB never
+# sees operators ($...) or malformed paths, and cached documents project alike
+FIELD_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+def movie_projection(profile: str = "card", fields: Optional[str] = None) -> dict:
+    """
+    MongoDB projection for a profile, or for an explicit comma-separated
+    `fields` list (which takes precedence). Invalid field names are a 400.
+    """
+    if fields:
+        names = [name.strip() for name in fields.split(",") if name.strip()]
+        invalid = [name for name in names if not FIELD_NAME.fullmatch(name)]
+        if invalid:
+            raise HTTPException(status_code=400, detail=f"Invalid field names: {', '.join(invalid)}")
+        names = [name for name in names if name not in INTERNAL_FIELDS]
+        if not names:
+            raise HTTPException(status_code=400, detail="No valid fields requested.")
+        return {name: 1 for name in names}
+    if PROFILES[profile] is None:
+        return {name: 0 for name in INTERNAL_FIELDS}
+    return {name: 1 for name in PROFILES[profile]}
+
+def project(document: dict, projection: Optional[dict]) -> dict:
+    """
+    Apply a movie_projection to a document already in memory (e.g. a cached
+    full movie) the way MongoDB would: _id is always kept.
+    """
+    if not projection:
+        return document
+    if any(projection.values()):
+        return {name: value for name, value in document.items() if name == "_id" or projection.get(name)}
+    return {name: value for name, value in document.items() if name not in projection}
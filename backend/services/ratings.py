@@ -0,0 +1,120 @@
+import argparse
+from bson import ObjectId
+from pymongo import UpdateMany
+from db.mongo import get_mongo_client, MONGO_DB
+
+# Movies updated per bulk write when rebuilding the counters
+RATING_REBUILD_BATCH_SIZE = 1000
+
+def movie_id_filter(movie_id: str) -> dict:
+    """
+    Match a movie by the id a review refers to (an ObjectId hex string or a raw id).
+    """
+    if ObjectId.is_valid(movie_id):
+        return {"_id": ObjectId(movie_id)}
+    return {"_id": movie_id}
+
+def rating_update(rating: float) -> list:
+    """
+    Update pipeline adding one rating to a movie's running counters and
+    deriving avg_rating from them, applied atomically to the single document.
+    Movies without rating_sum (seeded from the dataset) start counting from zero.
+    """
+    return [
+        {"$set": {
+            "num_reviews": {"$add": [
+                {"$cond": [{"$eq": [{"$type": "$rating_sum"}, "missing"]}, 0, "$num_reviews"]},
+                1
+            ]},
+            "rating_sum": {"$add": [{"$ifNull": ["$rating_sum", 0]}, rating]}
+        }},
+        {"$set": {"avg_rating": {"$divide": ["$rating_sum", "$num_reviews"]}}}
+    ]
+
+def rated_movie(movie: dict, rating: float) -> dict:
+    """
+    A movie as rating_update leaves it, computed from the document before the update.
+    """
+    seeded = "rating_sum" not in movie
+    num_reviews = (0 if seeded else movie.get("num_reviews", 0)) + 1
+    rating_sum = movie.get("rating_sum", 0) + rating
+    return {**movie, "num_reviews": num_reviews, "rating_sum": rating_sum, "avg_rating": rating_sum / num_reviews}
+
+def movielens_links(links_csv: str) -> dict:
+    """
+    MovieLens movieId (as stored in seeded reviews) -> TMDB id, from a links.csv.
+    """
+    import pandas as pd
+
+    frame = pd.read_csv(links_csv, usecols=["movieId", "tmdbId"]).dropna()
+    return dict(zip(frame["movieId"].astype(int).astype(str), frame["tmdbId"].astype(int)))
+
+def rebuild_rating_counters(db=None, links_csv: str = None) -> dict:
+    """
+    Recompute rating_sum, num_reviews and avg_rating for every reviewed movie
+    from the reviews collection, grouped in a single aggregation pass.
+
+    Reviews written through the API refer to the movie's ObjectId. Reviews
+    seeded from the MovieLens ratings refer to MovieLens movieIds and only
+    count when `links_csv` maps them to TMDB ids; without it they are skipped.
+    Returns the number of movies updated and of reviews skipped, by reason.
+    """
+    if db is None:
+        db = get_mongo_client()[MONGO_DB]
+    links = movielens_links(links_csv) if links_csv else {}
+    counts = {"movies": 0, "unmapped_reviews": 0, "missing_movie_reviews": 0}
+
+    # movie filter field -> {value: [rating_sum, num_reviews]}
+    targets = {"_id": {}, "tmdb_id": {}}
+    groups = db["reviews"].aggregate([
+        {"$group": {"_id": "$movie_id", "rating_sum": {"$sum": "$rating"}, "num_reviews": {"$sum": 1}}}
+    ], allowDiskUse=True)
+    for group in groups:
+        movie_id = str(group["_id"])
+        if ObjectId.is_valid(movie_id):
+            field, value = "_id", ObjectId(movie_id)
+        elif movie_id in links:
+            field, value = "tmdb_id", links[movie_id]
+        else:
+            counts["unmapped_reviews"] += group["num_reviews"]
+            continue
+        totals = targets[field].setdefault(value, [0, 0])
+        totals[0] += group["rating_sum"]
+        totals[1] += group["num_reviews"]
+
+    for field, totals in targets.items():
+        values = list(totals)
+        for start in range(0, len(values), RATING_REBUILD_BATCH_SIZE):
+            batch = values[start:start + RATING_REBUILD_BATCH_SIZE]
+            existing = set(db["movies"].distinct(field, {field: {"$in": batch}}))
+            operations = []
+            for value in batch:
+                rating_sum, num_reviews = totals[value]
+                if value not in existing:
+                    counts["missing_movie_reviews"] += num_reviews
+                    continue
+                operations.append(UpdateMany({field: value}, {"$set": {
+                    "rating_sum": rating_sum,
+                    "num_reviews": num_reviews,
+                    "avg_rating": rating_sum / num_reviews
+                }}))
+            if operations:
+                db["movies"].bulk_write(operations, ordered=False)
+                counts["movies"] += len(operations)
+
+    if counts["unmapped_reviews"]:
+        print(f"⚠️ Skipped {counts['unmapped_reviews']} reviews with MovieLens movie ids"
+              + ("" if links_csv else "; pass a links.csv to count them"))
+    if counts["missing_movie_reviews"]:
+        print(f"⚠️ Skipped {counts['missing_movie_reviews']} reviews of movies that are not in the movies collection")
+    return counts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild movie rating counters from the reviews collection")
+    parser.add_argument("--links", default=None,
+                        help="MovieLens links CSV mapping movieId to tmdbId, to count reviews seeded from the ratings")
+    args = parser.parse_args()
+
+    print("Rebuilding movie rating counters from reviews...")
+    counts = rebuild_rating_counters(links_csv=args.links)
+    print(f"Rating counters rebuilt for {counts['movies']} movies")
@@ -0,0 +1,267 @@
+import os
+import time
+import argparse
+import numpy as np
+import scipy.sparse as sp
+from concurrent.futures import ThreadPoolExecutor
+from services.artifacts import save_artifact, ArtifactCache
+
+# Matrix-factorization recommender trained offline with alternating least
+# squares. Users and movies get CF_FACTORS-dimensional vectors whose dot
+# product predicts a (mean-centred) rating.
+CF_ARTIFACT = "cf"
+CF_FACTORS = int(os.getenv('CF_FACTORS', 32))
+CF_ITERATIONS = int(os.getenv('CF_ITERATIONS', 10))
+CF_REGULARIZATION = float(os.getenv('CF_REGULARIZATION', 0.1))
+CF_WORKERS = int(os.getenv('CF_WORKERS', os.cpu_count() or 1))
+CF_MIN_ITEM_RATINGS = int(os.getenv('CF_MIN_ITEM_RATINGS', 5))  # rarer movies train the model but aren't recommended
+CF_READ_BATCH_SIZE = 50000
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first, via a partial sort.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.array([], dtype=np.int64)
+    best = np.argpartition(-scores, k - 1)[:k]
+    return best[np.argsort(-scores[best], kind="stable")]
+
+def _solve_rows(ratings: sp.csr_matrix, fixed: np.ndarray, regularization: float, rows: range) -> np.ndarray:
+    """
+    Least-squares factors for a range of rows of `ratings` with the other side held fixed.
+    """
+    factors = fixed.shape[1]
+    identity = np.eye(factors, dtype=np.float64)
+    solved = np.zeros((len(rows), factors), dtype=np.float32)
+    for offset, row in enumerate(rows):
+        start, end = ratings.indptr[row], ratings.indptr[row + 1]
+        if start == end:
+            continue
+        known = fixed[ratings.indices[start:end]].astype(np.float64)
+        gram = known.T @ known + regularization * (end - start) * identity
+        solved[offset] = np.linalg.solve(gram, known.T @ ratings.data[start:end])
+    return solved
+
+def _solve(ratings: sp.csr_matrix, fixed: np.ndarray, regularization: float, pool, workers: int) -> np.ndarray:
+    """
+    Solve every row, split into one chunk per worker. NumPy releases the GIL
+    inside the linear algebra, so chunks run on separate cores.
+    """
+    count = ratings.shape[0]
+    chunk = max(1, -(-count // workers))
+    ranges = [range(start, min(count, start + chunk)) for start in range(0, count, chunk)]
+    parts = list(pool.map(lambda rows: _solve_rows(ratings, fixed, regularization, rows), ranges))
+    return np.vstack(parts) if parts else np.zeros((0, fixed.shape[1]), dtype=np.float32)
+
+def train_als(ratings: sp.csr_matrix, factors: int = CF_FACTORS, iterations: int = CF_ITERATIONS,
+              regularization: float = CF_REGULARIZATION, workers: int = CF_WORKERS, seed: int = 0):
+    """
+    Factorize a users x movies matrix of mean-centred ratings. Returns
+    (user_factors, item_factors) as float32 arrays.
+    """
+    rng = np.random.default_rng(seed)
+    item_factors = (rng.standard_normal((ratings.shape[1], factors)) * 0.1).astype(np.float32)
+    user_factors = np.zeros((ratings.shape[0], factors), dtype=np.float32)
+    by_item = ratings.T.tocsr()
+    workers = max(1, workers)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for _ in range(iterations):
+            user_factors = _solve(ratings, item_factors, regularization, pool, workers)
+            item_factors = _solve(by_item, user_factors, regularization, pool, workers)
+    return user_factors, item_factors
+
+def rmse(ratings: sp.csr_matrix, user_factors: np.ndarray, item_factors: np.ndarray) -> float:
+    """
+    Root mean squared error of the model on the (mean-centred) ratings given.
+    """
+    coo = ratings.tocoo()
+    if coo.nnz == 0:
+        return 0.0
+    predicted = np.einsum("ij,ij->i", user_factors[coo.row], item_factors[coo.col])
+    return float(np.sqrt(np.mean((predicted - coo.data) ** 2)))
+
+class RatingData:
+    """
+    Ratings as a sparse users x movies matrix plus the ids behind its rows and columns.
+    """
+    def __init__(self, user_ids, movie_ids, ratings):
+        users, self.user_ids = _factorize(user_ids)
+        items, self.movie_ids = _factorize(movie_ids)
+        values = np.asarray(ratings, dtype=np.float32)
+        self.global_mean = float(values.mean()) if len(values) else 0.0
+        self.matrix = sp.csr_matrix(
+            (values - self.global_mean, (users, items)),
+            shape=(len(self.user_ids), len(self.movie_ids))
+        )
+        self.matrix.sum_duplicates()
+
+    def split(self, holdout: float, seed: int = 0):
+        """
+        (train, test) matrices with a random `holdout` share of ratings in test.
+        """
+        coo = self.matrix.tocoo()
+        test = np.random.default_rng(seed).random(coo.nnz) < holdout
+        build = lambda mask: sp.csr_matrix((coo.data[mask], (coo.row[mask], coo.col[mask])), shape=coo.shape)
+        return build(~test), build(test)
+
+def _factorize(values) -> tuple:
+    uniques, codes = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    return codes, uniques
+
+def ratings_from_csv(ratings_csv: str) -> RatingData:
+    import pandas as pd
+
+    frame = pd.read_csv(ratings_csv, usecols=["userId", "movieId", "rating"])
+    return RatingData(frame["userId"].astype(str), frame["movieId"].astype(str), frame["rating"])
+
+def ratings_from_db(db) -> RatingData:
+    """
+    Ratings of the reviews collection (blocking driver), read in batches.
+    """
+    user_ids, movie_ids, ratings = [], [], []
+    cursor = db["reviews"].find({}, {"_id": 0, "user_id": 1, "movie_id": 1, "rating": 1},
+                                batch_size=CF_READ_BATCH_SIZE)
+    for review in cursor:
+        user_ids.append(review["user_id"])
+        movie_ids.append(review["movie_id"])
+        ratings.append(review["rating"])
+    return RatingData(user_ids, movie_ids, ratings)
+
+def movie_lookup_ids(movie_ids, links_csv: str = None) -> np.ndarray:
+    """
+    The id POST /movies/batch resolves for each review movie_id: the movie's
+    ObjectId as is, MovieLens ids translated to TMDB ids through links.csv.
+    """
+    links = {}
+    if links_csv and os.path.exists(links_csv):
+        import pandas as pd
+
+        frame = pd.read_csv(links_csv, usecols=["movieId", "tmdbId"]).dropna()
+        links = dict(zip(frame["movieId"].astype(int).astype(str), frame["tmdbId"].astype(int).astype(str)))
+    return np.array([links.get(movie_id, movie_id) for movie_id in movie_ids], dtype=str)
+
+class Recommender:
+    """
+    Trained factors, memory-mapped from the artifact, scoring all movies for a user at once.
+    """
+    def __init__(self, user_ids, movie_ids, lookup_ids, user_factors, item_factors,
+                 rated_indptr, rated_indices, global_mean: float = 0.0, min_item_ratings: int = CF_MIN_ITEM_RATINGS):
+        self.movie_ids = movie_ids
+        self.lookup_ids = lookup_ids
+        self.user_factors = user_factors
+        self.item_factors = item_factors
+        self.rated_indptr = rated_indptr
+        self.rated_indices = rated_indices
+        self.global_mean = global_mean
+        self.users = {user_id: row for row, user_id in enumerate(user_ids.tolist())}
+        self.items = {movie: item for item, movie in enumerate(lookup_ids.tolist())}
+        # Unit-length movie factors: a dot product with them is the cosine similarity
+        norms = np.maximum(np.linalg.norm(item_factors, axis=1), 1e-12)
+        self.normalized_items = np.asarray(item_factors) / norms[:, None]
+        # Movies with too few ratings have unreliable factors
+        self.too_rare = np.bincount(rated_indices, minlength=len(movie_ids)) < min_item_ratings
+
+    def _results(self, items, scores, offset: float = 0.0) -> list:
+        return [
+            {"movie_id": str(self.movie_ids[item]), "lookup_id": str(self.lookup_ids[item]),
+             "score": round(float(score) + offset, 4)}
+            for item, score in zip(items.tolist(), scores.tolist())
+            if np.isfinite(score)
+        ]
+
+    def recommend(self, user_id: str, limit: int = 10, index=None, nprobe: int = None):
+        """
+        [{"movie_id", "lookup_id", "score"}] for movies the user hasn't rated,
+        best first, or None if the user wasn't in the training data. With an
+        ANN `index` over the movie factors only its candidates are scored.
+        """
+        row = self.users.get(str(user_id))
+        if row is None:
+            return None
+        rated = self.rated_indices[self.rated_indptr[row]:self.rated_indptr[row + 1]]
+        if index is not None:
+            # Fetch enough candidates to still have `limit` after dropping rated movies
+            items, scores = index.search(self.user_factors[row], limit + len(rated), metric="ip", nprobe=nprobe)
+            keep = ~np.isin(items, rated)
+            return self._results(items[keep][:limit], scores[keep][:limit], self.global_mean)
+        scores = self.item_factors @ self.user_factors[row]
+        scores[self.too_rare] = -np.inf
+        scores[rated] = -np.inf
+        items = top_k_indices(scores, limit)
+        return self._results(items, scores[items], self.global_mean)
+
+    def similar_items(self, lookup_id: str, limit: int = 10, index=None, nprobe: int = None):
+        """
+        Movies whose factors are closest (cosine) to the given movie's, i.e.
+        rated alike by the same users, or None if the movie isn't in the model.
+        """
+        item = self.items.get(str(lookup_id))
+        if item is None:
+            return None
+        query = np.asarray(self.item_factors[item])
+        if index is not None:
+            items, scores = index.search(query, limit + 1, metric="cosine", nprobe=nprobe)
+        else:
+            scores = self.normalized_items @ self.normalized_items[item]
+            scores[self.too_rare] = -np.inf
+            items = top_k_indices(scores, limit + 1)
+            scores = scores[items]
+        keep = items != item
+        return self._results(items[keep][:limit], scores[keep][:limit])
+
+    @classmethod
+    def from_artifact(cls, arrays: dict, meta: dict):
+        return cls(arrays["user_ids"], arrays["movie_ids"], arrays["lookup_ids"], arrays["user_factors"],
+                   arrays["item_factors"], arrays["rated_indptr"], arrays["rated_indices"], meta.get("global_mean", 0.0))
+
+def save_model(data: RatingData, user_factors, item_factors, lookup_ids, meta: dict) -> str:
+    return save_artifact(CF_ARTIFACT, {
+        "user_ids": data.user_ids,
+        "movie_ids": data.movie_ids,
+        "lookup_ids": lookup_ids,
+        "user_factors": user_factors,
+        "item_factors": item_factors,
+        "rated_indptr": data.matrix.indptr,
+        "rated_indices": data.matrix.indices,
+    }, {**meta, "global_mean": data.global_mean})
+
+# The model served to this worker's requests
+recommender_cache = ArtifactCache(CF_ARTIFACT, Recommender.from_artifact)
+
+def get_recommender():
+    """
+    The current CF model, or None until one has been trained.
+    """
+    return recommender_cache.get()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the collaborative-filtering recommender")
+    parser.add_argument("--ratings", help="MovieLens ratings CSV; defaults to the reviews collection")
+    parser.add_argument("--links", default="../datasets/links_small.csv",
+                        help="MovieLens links CSV mapping movieId to tmdbId")
+    parser.add_argument("--factors", type=int, default=CF_FACTORS)
+    parser.add_argument("--iterations", type=int, default=CF_ITERATIONS)
+    parser.add_argument("--regularization", type=float, default=CF_REGULARIZATION)
+    parser.add_argument("--workers", type=int, default=CF_WORKERS)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.ratings:
+        data = ratings_from_csv(args.ratings)
+    else:
+        from db.mongo import get_mongo_client, MONGO_DB
+        data = ratings_from_db(get_mongo_client()[MONGO_DB])
+    print(f"Read {data.matrix.nnz} ratings ({len(data.user_ids)} users, {len(data.movie_ids)} movies) "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    user_factors, item_factors = train_als(data.matrix, args.factors, args.iterations, args.regularization, args.workers)
+    elapsed = time.perf_counter() - started
+    error = rmse(data.matrix, user_factors, item_factors)
+    version = save_model(data, user_factors, item_factors, movie_lookup_ids(data.movie_ids, args.links), {
+        "factors": args.factors, "iterations": args.iterations,
+        "regularization": args.regularization, "train_rmse": error
+    })
+    print(f"Trained {args.factors} factors x {args.iterations} iterations on {args.workers} workers "
+          f"in {elapsed:.1f}s (train RMSE {error:.3f}) -> {version}")
@@ -0,0 +1,55 @@
+import random
+from typing import Optional
+
+# Every movie carries a uniform random key in [0, 1) indexed alone and behind
+# the genre/year filters. A sample is the next `limit` keys after a random
+# pivot, so its cost depends on `limit`, not on the catalog size.
+RANDOM_KEY_FIELD = "rand"
+
+def pivot(seed: Optional[int], page: int) -> float:
+    """
+    Random starting key; deterministic for a given seed and page.
+    """
+    if seed is None:
+        return random.random()
+    return random.Random(f"{seed}:{page}").random()
+
+async def _from_pivot(movies, query: dict, start: float, limit: int, projection: Optional[dict] = None) -> list:
+    after = await movies.find({**query, RANDOM_KEY_FIELD: {"$gte": start}}, projection).sort(RANDOM_KEY_FIELD, 1).limit(limit).to_list(limit)
+    if len(after) < limit:
+        # Wrap around to the lowest keys
+        wrapped = await movies.find({**query, RANDOM_KEY_FIELD: {"$lt": start}}, projection).sort(RANDOM_KEY_FIELD, 1).limit(limit - len(after)).to_list(limit - len(after))
+        after.extend(wrapped)
+    return after
+
+async def sample_movies(movies, limit: int, genre: Optional[str] = None, year: Optional[int] = None,
+                        seed: Optional[int] = None, page: int = 0, projection: Optional[dict] = None) -> list:
+    """
+    Random movies, optionally filtered by genre (exact name) and year.
+
+    Unfiltered, unseeded samples use $sample, which MongoDB serves with a
+    random cursor when it is the first stage. Filtered or seeded samples
+    walk the random-key index from a pivot.
+    """
+    query = {}
+    if genre:
+        query["genres"] = genre
+    if year is not None:
+        query["year"] = year
+
+    if not query and seed is None:
+        pipeline = [{"$sample": {"size": limit}}]
+        if projection:
+            pipeline.append({"$project": projection})
+        return await movies.aggregate(pipeline).to_list(limit)
+    return await _from_pivot(movies, query, pivot(seed, page), limit, projection)
+
+async def backfill_random_keys(db) -> int:
+    """
+    Give every movie without one a random key, in a single server-side update.
+    """
+    result = await db["movies"].update_many(
+        {RANDOM_KEY_FIELD: {"$exists": False}},
+        [{"$set": {RANDOM_KEY_FIELD: {"$rand": {}}}}]
+    )
+    return result.modified_count
@@ -0,0 +1,43 @@
+import re
+import unicodedata
+from pymongo import UpdateOne
+
+# Search modes of /movies/search/{title}
+TEXT_MODE = "text"  # Ranked full-text search over title, tagline and description
+PREFIX_MODE = "prefix"  # Autocomplete: titles starting with the term
+
+BACKFILL_BATCH_SIZE = 1000
+
+def normalize_title(title: str) -> str:
+    """
+    Lowercase, accent-free, single-spaced form of a title stored as `title_norm`.
+    """
+    decomposed = unicodedata.normalize("NFKD", title if isinstance(title, str) else "")
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.lower().split())
+
+def search_query(term: str, mode: str):
+    """
+    Filter, projection and sort for a search. Neither mode interprets the term as a regex.
+    """
+    if mode == PREFIX_MODE:
+        prefix = "^" + re.escape(normalize_title(term))
+        return {"title_norm": {"$regex": prefix}}, None, [("title_norm", 1)]
+    score = {"$meta": "textScore"}
+    return {"$text": {"$search": term}}, {"score": score}, [("score", score)]
+
+async def backfill_title_norm(db) -> int:
+    """
+    Populate title_norm on movies loaded before it existed.
+    """
+    movies = db["movies"]
+    updated = 0
+    batch = []
+    async for movie in movies.find({"title_norm": {"$exists": False}}, {"title": 1}):
+        batch.append(UpdateOne({"_id": movie["_id"]}, {"$set": {"title_norm": normalize_title(movie.get("title"))}}))
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            updated += (await movies.bulk_write(batch, ordered=False)).modified_count
+            batch = []
+    if batch:
+        updated += (await movies.bulk_write(batch, ordered=False)).modified_count
+    return updated
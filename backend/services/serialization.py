@@ -0,0 +1,47 @@
+import json
+import numpy as np
+from datetime import datetime
+from fastapi.responses import JSONResponse
+
+# orjson is optional: without it the standard library encoder is used
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Keys that are not strings (e.g. ints) are encoded as strings, like json.dumps does
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY if orjson else 0
+
+def json_default(value):
+    """
+    Encoding of values JSON has no type for: datetimes as ISO 8601, NumPy
+    scalars and arrays as numbers and lists (as orjson encodes them), anything
+    else (ObjectId, Decimal128, ...) as its string.
+    """
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    return str(value)
+
+def dumps(value) -> bytes:
+    """
+    Compact UTF-8 JSON of `value`. MongoDB documents are encoded as they come
+    from the driver: ObjectIds become strings and datetimes ISO 8601 strings.
+    """
+    if orjson is not None:
+        return orjson.dumps(value, default=json_default, option=ORJSON_OPTIONS)
+    return json.dumps(value, default=json_default, ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode()
+
+def loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with dumps. A route returning one directly also
+    skips FastAPI's jsonable_encoder pass, which copies every field of every
+    document before encoding and dominates the cost of large list responses.
+    """
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,313 @@
+import os
+import time
+import argparse
+import numpy as np
+import scipy.sparse as sp
+from services.artifacts import save_artifact, load_artifact, ArtifactCache
+
+# Offline movie-to-movie similarity: a sparse genre/keyword matrix is scored
+# block by block and only the top-k neighbours of each movie are stored, so
+# the similar-movies endpoints are a lookup instead of a query.
+SIMILARITY_ARTIFACT = "similarity"
+SIMILARITY_TOP_K = int(os.getenv('SIMILARITY_TOP_K', 20))
+SIMILARITY_BLOCK_SIZE = int(os.getenv('SIMILARITY_BLOCK_SIZE', 512))  # rows scored at once; bounds memory to block x catalog
+SIMILARITY_METRIC = os.getenv('SIMILARITY_METRIC', 'cosine')
+SIMILARITY_GENRE_WEIGHT = float(os.getenv('SIMILARITY_GENRE_WEIGHT', 2.0))  # cosine weight of a genre relative to a keyword
+METRICS = ("cosine", "jaccard")
+
+def _tokens(row: dict) -> list:
+    genres = {genre.lower() for genre in row.get("genres") or []}
+    keywords = {keyword.lower() for keyword in row.get("keywords") or []}
+    return [("genre:" + genre, SIMILARITY_GENRE_WEIGHT) for genre in sorted(genres)] + \
+           [("keyword:" + keyword, 1.0) for keyword in sorted(keywords)]
+
+def feature_matrix(rows: list, vocabulary: dict) -> sp.csr_matrix:
+    """
+    Sparse movie x token matrix. Tokens missing from `vocabulary` are appended to it.
+    """
+    data, indices, indptr = [], [], [0]
+    for row in rows:
+        for token, weight in _tokens(row):
+            indices.append(vocabulary.setdefault(token, len(vocabulary)))
+            data.append(weight)
+        indptr.append(len(indices))
+    return sp.csr_matrix(
+        (np.array(data, dtype=np.float32), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int64)),
+        shape=(len(rows), len(vocabulary))
+    )
+
+def _resize(features: sp.csr_matrix, columns: int) -> sp.csr_matrix:
+    return sp.csr_matrix((features.data, features.indices, features.indptr), shape=(features.shape[0], columns))
+
+def _prepare(features: sp.csr_matrix, metric: str) -> sp.csr_matrix:
+    """
+    Binary rows for Jaccard, L2-normalized rows for cosine (a dot product is then the cosine).
+    """
+    if metric == "jaccard":
+        binary = features.copy()
+        binary.data = np.ones_like(binary.data)
+        return binary
+    norms = np.sqrt(np.asarray(features.multiply(features).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sp.csr_matrix(sp.diags(1 / norms) @ features)
+
+def _scores(block: sp.csr_matrix, prepared: sp.csr_matrix, metric: str) -> np.ndarray:
+    """
+    Dense similarities of a block of movies against every movie in `prepared`.
+    """
+    overlap = (block @ prepared.T).toarray()
+    if metric != "jaccard":
+        return overlap
+    sizes = np.asarray(prepared.sum(axis=1)).ravel()
+    block_sizes = np.asarray(block.sum(axis=1)).ravel()
+    union = block_sizes[:, None] + sizes[None, :] - overlap
+    return np.divide(overlap, union, out=np.zeros_like(overlap), where=union > 0)
+
+def _top_k(scores: np.ndarray, k: int):
+    """
+    Column positions and values of the k best positive scores per row, best
+    first, padded with -1 / 0. Uses a partial sort (argpartition).
+    """
+    rows, columns = scores.shape
+    positions = np.full((rows, k), -1, dtype=np.int32)
+    values = np.zeros((rows, k), dtype=np.float32)
+    width = min(k, columns)
+    if width == 0:
+        return positions, values
+    if width < columns:
+        best = np.argpartition(-scores, width - 1, axis=1)[:, :width]
+    else:
+        best = np.tile(np.arange(columns), (rows, 1))
+    best_scores = np.take_along_axis(scores, best, axis=1)
+    order = np.argsort(-best_scores, axis=1, kind="stable")
+    best = np.take_along_axis(best, order, axis=1)
+    best_scores = np.take_along_axis(best_scores, order, axis=1)
+    keep = best_scores > 0
+    positions[:, :width] = np.where(keep, best, -1)
+    values[:, :width] = np.where(keep, best_scores, 0)
+    return positions, values
+
+def _neighbours(queries: sp.csr_matrix, prepared: sp.csr_matrix, metric: str, k: int, offset: int = 0):
+    """
+    Top-k rows of `prepared` for each row of `queries`, whose own rows start
+    at `offset` in `prepared`. Scored SIMILARITY_BLOCK_SIZE rows at a time.
+    """
+    count = queries.shape[0]
+    neighbours = np.full((count, k), -1, dtype=np.int32)
+    scores = np.zeros((count, k), dtype=np.float32)
+    for start in range(0, count, SIMILARITY_BLOCK_SIZE):
+        end = min(count, start + SIMILARITY_BLOCK_SIZE)
+        block_scores = _scores(queries[start:end], prepared, metric)
+        local = np.arange(end - start)
+        block_scores[local, offset + start + local] = 0  # A movie is not its own neighbour
+        neighbours[start:end], scores[start:end] = _top_k(block_scores, k)
+    return neighbours, scores
+
+def _merge(neighbours: np.ndarray, scores: np.ndarray, candidates: np.ndarray, candidate_scores: np.ndarray, k: int):
+    """
+    Keep the k best of each row's current neighbours and new candidates.
+    """
+    positions, values = _top_k(np.hstack([scores, candidate_scores]), k)
+    pool = np.hstack([neighbours, candidates])
+    merged = np.take_along_axis(pool, np.maximum(positions, 0), axis=1)
+    return np.where(positions >= 0, merged, -1).astype(np.int32), values
+
+class SimilarityIndex:
+    """
+    Top-k similar movies of every movie, keyed by tmdb_id.
+    """
+    def __init__(self, ids, titles, neighbours, scores, features, vocabulary: dict, metric: str):
+        self.ids = ids
+        self.titles = titles
+        self.neighbours = neighbours
+        self.scores = scores
+        self.features = features
+        self.vocabulary = vocabulary
+        self.metric = metric
+        self.rows = {tmdb_id: row for row, tmdb_id in enumerate(ids.tolist())}
+
+    @property
+    def k(self) -> int:
+        return self.neighbours.shape[1]
+
+    @classmethod
+    def build(cls, rows: list, metric: str = SIMILARITY_METRIC, k: int = SIMILARITY_TOP_K):
+        if metric not in METRICS:
+            raise ValueError(f"Unknown similarity metric {metric!r}; choose one of {', '.join(METRICS)}")
+        vocabulary = {}
+        features = feature_matrix(rows, vocabulary)
+        prepared = _prepare(features, metric)
+        neighbours, scores = _neighbours(prepared, prepared, metric, k)
+        return cls(
+            np.array([row["tmdb_id"] for row in rows], dtype=np.int64),
+            np.array([row.get("title") or "" for row in rows], dtype=str),
+            neighbours, scores, features, vocabulary, metric
+        )
+
+    def similar(self, tmdb_id, limit: int = 10):
+        """
+        [{"id", "title", "score"}] best first, or None if the movie isn't indexed.
+        """
+        row = self.rows.get(int(tmdb_id)) if tmdb_id is not None else None
+        if row is None:
+            return None
+        results = []
+        for position, score in zip(self.neighbours[row][:limit].tolist(), self.scores[row][:limit].tolist()):
+            if position < 0:
+                break
+            results.append({"id": int(self.ids[position]), "title": str(self.titles[position]), "score": round(score, 4)})
+        return results
+
+    def add(self, rows: list) -> int:
+        """
+        Incrementally index new movies: score them against the whole catalog
+        and merge them into the neighbour lists of existing movies. Movies that
+        are already indexed are skipped (a full rebuild picks up their changes).
+        """
+        seen = set(self.rows)
+        new_rows = []
+        for row in rows:
+            if int(row["tmdb_id"]) not in seen:
+                seen.add(int(row["tmdb_id"]))
+                new_rows.append(row)
+        if not new_rows:
+            return 0
+
+        count, k = len(self.ids), self.k
+        new_features = feature_matrix(new_rows, self.vocabulary)
+        features = sp.vstack([_resize(self.features, len(self.vocabulary)), new_features]).tocsr()
+        prepared = _prepare(features, self.metric)
+
+        # Neighbours of the new movies, against old and new ones
+        new_neighbours, new_scores = _neighbours(prepared[count:], prepared, self.metric, k, offset=count)
+
+        # New movies as candidates for the existing movies' lists
+        neighbours, scores = np.array(self.neighbours), np.array(self.scores)
+        for start in range(count, features.shape[0], SIMILARITY_BLOCK_SIZE):
+            end = min(features.shape[0], start + SIMILARITY_BLOCK_SIZE)
+            candidate_scores = _scores(prepared[start:end], prepared[:count], self.metric).T
+            candidates = np.broadcast_to(np.arange(start, end, dtype=np.int32), candidate_scores.shape)
+            neighbours, scores = _merge(neighbours, scores, candidates, candidate_scores, k)
+
+        self.ids = np.concatenate([self.ids, np.array([row["tmdb_id"] for row in new_rows], dtype=np.int64)])
+        self.titles = np.concatenate([self.titles, np.array([row.get("title") or "" for row in new_rows], dtype=str)])
+        self.neighbours = np.vstack([neighbours, new_neighbours])
+        self.scores = np.vstack([scores, new_scores])
+        self.features = features
+        self.rows = {tmdb_id: row for row, tmdb_id in enumerate(self.ids.tolist())}
+        return len(new_rows)
+
+    def save(self) -> str:
+        return save_artifact(SIMILARITY_ARTIFACT, {
+            "ids": self.ids,
+            "titles": self.titles,
+            "neighbours": self.neighbours,
+            "scores": self.scores,
+            "features_data": self.features.data,
+            "features_indices": self.features.indices,
+            "features_indptr": self.features.indptr,
+        }, {
+            "metric": self.metric,
+            "vocabulary": sorted(self.vocabulary, key=self.vocabulary.get),
+        })
+
+    @classmethod
+    def from_artifact(cls, arrays: dict, meta: dict):
+        vocabulary = {token: column for column, token in enumerate(meta["vocabulary"])}
+        features = sp.csr_matrix(
+            (arrays["features_data"], arrays["features_indices"], arrays["features_indptr"]),
+            shape=(len(arrays["ids"]), len(vocabulary))
+        )
+        return cls(arrays["ids"], arrays["titles"], arrays["neighbours"], arrays["scores"],
+                   features, vocabulary, meta["metric"])
+
+# The index served to this worker's requests
+similarity_cache = ArtifactCache(SIMILARITY_ARTIFACT, SimilarityIndex.from_artifact)
+
+def get_similarity_index():
+    """
+    The current similarity index, or None until one has been built.
+    """
+    return similarity_cache.get()
+
+def feature_rows_from_csv(movies_csv: str, keywords_csv: str = None) -> list:
+    """
+    tmdb_id, title, genres and keywords of every movie in movies_metadata.csv,
+    with keywords from its keywords column and/or keywords.csv.
+    """
+    import pandas as pd
+    from load_data import extract_names
+
+    movies = pd.read_csv(movies_csv, dtype=str, usecols=lambda column: column in ("id", "title", "genres", "keywords"))
+    ids = pd.to_numeric(movies["id"], errors="coerce")
+    movies = movies[ids.notna()]
+    ids = ids[ids.notna()].astype(int)
+    genres = extract_names(movies["genres"])
+    keywords = extract_names(movies["keywords"]) if "keywords" in movies else pd.Series([[]] * len(movies), index=movies.index)
+
+    extra_keywords = {}
+    if keywords_csv:
+        extra = pd.read_csv(keywords_csv, dtype=str)
+        extra_ids = pd.to_numeric(extra["id"], errors="coerce")
+        for tmdb_id, names in zip(extra_ids, extract_names(extra["keywords"])):
+            if not pd.isna(tmdb_id):
+                extra_keywords.setdefault(int(tmdb_id), set()).update(names)
+
+    rows = {}
+    for tmdb_id, title, movie_genres, movie_keywords in zip(ids, movies["title"].fillna(""), genres, keywords):
+        if tmdb_id not in rows:  # The dataset has a few duplicated rows
+            rows[tmdb_id] = {
+                "tmdb_id": tmdb_id,
+                "title": title,
+                "genres": movie_genres,
+                "keywords": sorted(set(movie_keywords) | extra_keywords.get(tmdb_id, set()))
+            }
+    return list(rows.values())
+
+def feature_rows_from_db(db) -> list:
+    """
+    Feature rows of every movie in MongoDB (blocking driver).
+    """
+    return [
+        {"tmdb_id": movie["tmdb_id"], "title": movie.get("title"), "genres": movie.get("genres"),
+         "keywords": movie.get("keywords")}
+        for movie in db["movies"].find({"tmdb_id": {"$exists": True}},
+                                       {"tmdb_id": 1, "title": 1, "genres": 1, "keywords": 1})
+    ]
+
+def refresh_similarity_index(db) -> int:
+    """
+    Add movies that are in MongoDB but not yet in the index, and save it.
+    Returns how many were added (0 when no index has been built yet).
+    """
+    loaded = load_artifact(SIMILARITY_ARTIFACT, mmap=False)
+    if loaded is None:
+        return 0
+    index = SimilarityIndex.from_artifact(*loaded[:2])
+    added = index.add(feature_rows_from_db(db))
+    if added:
+        index.save()
+        similarity_cache.clear()
+    return added
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or refresh the movie similarity index")
+    parser.add_argument("--movies", default="../datasets/movies_metadata.csv")
+    parser.add_argument("--keywords", default="../datasets/keywords.csv")
+    parser.add_argument("--metric", choices=METRICS, default=SIMILARITY_METRIC)
+    parser.add_argument("--top-k", type=int, default=SIMILARITY_TOP_K)
+    parser.add_argument("--refresh", action="store_true",
+                        help="Add movies from MongoDB that are missing from the existing index")
+    args = parser.parse_args()
+
+    if args.refresh:
+        from db.mongo import get_mongo_client, MONGO_DB
+        print(f"Added {refresh_similarity_index(get_mongo_client()[MONGO_DB])} movies to the similarity index")
+    else:
+        started = time.perf_counter()
+        keywords_csv = args.keywords if os.path.exists(args.keywords) else None
+        rows = feature_rows_from_csv(args.movies, keywords_csv)
+        index = SimilarityIndex.build(rows, args.metric, args.top_k)
+        version = index.save()
+        print(f"Indexed {len(rows)} movies ({len(index.vocabulary)} features, {args.metric}, top {args.top_k}) "
+              f"in {time.perf_counter() - started:.1f}s -> {version}")
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from services.ann import ExactIndex, IVFIndex
+from routes.recommendation import router
+
+def vectors(count: int = 300, dimensions: int = 8):
+    rng = np.random.default_rng(0)
+    return rng.standard_normal((count, dimensions)).astype(np.float32), np.arange(count)
+
+def test_ivf_with_every_cell_probed_matches_exact():
+    data, ids = vectors()
+    query = data[3]
+    ivf = IVFIndex.build(data, ids, nlist=10)
+    exact_ids, exact_scores = ExactIndex.build(data, ids).search(query, 5)
+    found_ids, found_scores = ivf.search(query, 5, nprobe=10)
+    assert found_ids.tolist() == exact_ids.tolist()
+    assert np.allclose(found_scores, exact_scores)
+
+@pytest.mark.parametrize("nprobe", [0, -3, 1000])
+def test_ivf_clamps_nprobe(nprobe):
+    data, ids = vectors()
+    found_ids, _ = IVFIndex.build(data, ids, nlist=10).search(data[3], 5, nprobe=nprobe)
+    assert len(found_ids) == 5 and found_ids[0] == 3
+
+@pytest.mark.parametrize("query", ["nprobe=0", "limit=0", "limit=-1", "limit=100000"])
+def test_cf_route_rejects_invalid_parameters(query):
+    app = FastAPI()
+    app.include_router(router)
+    assert TestClient(app).get(f"/recommendations/cf/1?{query}").status_code == 422
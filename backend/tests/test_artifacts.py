@@ -0,0 +1,17 @@
+import os
+import numpy as np
+import services.artifacts as artifacts
+from services.artifacts import save_artifact, load_artifact, current_version
+
+def test_saves_in_the_same_second_get_distinct_versions(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifacts, "ARTIFACTS_DIR", str(tmp_path))
+    monkeypatch.setattr(artifacts, "ARTIFACTS_KEEP", 2)
+    versions = [save_artifact("cf", {"factors": np.full(3, i)}, {"build": i}) for i in range(5)]
+    assert len(set(versions)) == 5
+    assert versions == sorted(versions)  # Pruning keeps the newest by name
+    assert current_version("cf") == versions[-1]
+    assert sorted(entry for entry in os.listdir(tmp_path / "cf") if entry != "CURRENT") == versions[-2:]
+
+    arrays, meta, version = load_artifact("cf")
+    assert (version, meta) == (versions[-1], {"build": 4})
+    assert arrays["factors"].tolist() == [4, 4, 4]
@@ -0,0 +1,158 @@
+import asyncio
+import json
+import time
+from typing import Optional
+from fastapi import Depends
+import services.cache as cache
+from services.cache import build_key, cached, LocalTTLCache
+
+class UnavailableRedis:
+    """
+    Every command fails, as when Redis is down: the cache must degrade to computing.
+    """
+    def __getattr__(self, name):
+        async def command(*args, **kwargs):
+            raise ConnectionError("Redis unavailable")
+        return command
+
+    def pipeline(self, transaction: bool = True):
+        return UnavailablePipeline()
+
+class UnavailablePipeline:
+    """
+    Commands are queued synchronously; executing them fails.
+    """
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    async def execute(self):
+        raise ConnectionError("Redis unavailable")
+
+def get_db():
+    return None
+
+async def handler(genre: str, limit: Optional[int] = 10, mode: str = "text", page: Optional[int] = None,
+                  db=Depends(get_db)):
+    return {}
+
+def test_build_key_path_then_sorted_query():
+    key = build_key("genre", handler, {"genre": "Drama", "limit": 5, "mode": "prefix", "db": object()})
+    assert key == "genre:Drama?limit=5&mode=prefix"
+
+def test_build_key_skips_none_and_lowercases():
+    key = build_key("genre", handler, {"genre": "Drama", "limit": 10, "mode": "TEXT", "page": None}, lowercase=True)
+    assert key == "genre:drama?limit=10&mode=text"
+
+def test_local_cache_expiry_and_lru(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    local = LocalTTLCache(ttl=5, maxsize=2)
+    local.set("a", 1)
+    local.set("b", 2)
+    assert local.get("a") == 1  # a is now the most recently used
+    local.set("c", 3)
+    assert local.get("b") is None and local.get("a") == 1 and local.get("c") == 3
+    now[0] += 6
+    assert local.get("a") is None
+
+def test_cached_single_flight_without_redis(monkeypatch):
+    monkeypatch.setattr(cache, "get_async_redis_client", lambda: UnavailableRedis())
+    cache.local_cache.clear()
+    calls = []
+
+    @cached("test_single_flight", 60)
+    async def slow(movie_id: str, db=Depends(get_db)):
+        calls.append(movie_id)
+        await asyncio.sleep(0.05)
+        return {"movie_id": movie_id}
+
+    async def run():
+        return await asyncio.gather(*(slow(movie_id="m1", db=None) for _ in range(5)))
+
+    responses = asyncio.run(run())
+    assert calls == ["m1"]
+    assert [json.loads(response.body) for response in responses] == [{"movie_id": "m1"}] * 5
+
+    # Later calls are served from the local layer
+    asyncio.run(slow(movie_id="m1", db=None))
+    assert calls == ["m1"]
+
+def test_cached_errors_are_not_cached(monkeypatch):
+    monkeypatch.setattr(cache, "get_async_redis_client", lambda: UnavailableRedis())
+    cache.local_cache.clear()
+    calls = []
+
+    @cached("test_errors", 60)
+    async def failing(movie_id: str):
+        calls.append(movie_id)
+        raise ValueError("boom")
+
+    for _ in range(2):
+        try:
+            asyncio.run(failing(movie_id="m1"))
+        except ValueError:
+            pass
+    assert calls == ["m1", "m1"]
+    assert not cache._inflight
+
+class RecordingRedis:
+    """
+    Records every command; GET misses and pipelines execute their HINCRBYs.
+    """
+    def __init__(self):
+        self.commands = []
+        self.totals = {}
+
+    def __getattr__(self, name):
+        async def command(*args, **kwargs):
+            self.commands.append(name)
+            return True
+        return command
+
+    async def get(self, key):
+        self.commands.append("get")
+        return None
+
+    def pipeline(self, transaction: bool = True):
+        redis = self
+
+        class Pipeline:
+            def hincrby(self, key, field, amount):
+                redis.totals[field] = redis.totals.get(field, 0) + amount
+
+            async def execute(self):
+                redis.commands.append("pipeline")
+        return Pipeline()
+
+def test_local_hits_never_wait_on_redis(monkeypatch):
+    redis = RecordingRedis()
+    monkeypatch.setattr(cache, "get_async_redis_client", lambda: redis)
+    monkeypatch.setattr(cache, "_unflushed", {})
+    cache.local_cache.clear()
+
+    @cached("test_stats", 60)
+    async def movie(movie_id: str):
+        return {"movie_id": movie_id}
+
+    asyncio.run(movie(movie_id="m1"))
+    commands = len(redis.commands)
+    for _ in range(3):
+        asyncio.run(movie(movie_id="m1"))
+    assert len(redis.commands) == commands  # Served from the local layer
+
+    asyncio.run(cache.flush_cache_stats())
+    assert redis.totals == {"test_stats:misses": 1, "test_stats:hits": 3}
+    assert cache._unflushed == {}
+
+def test_stats_are_kept_when_redis_is_unavailable(monkeypatch):
+    monkeypatch.setattr(cache, "get_async_redis_client", lambda: UnavailableRedis())
+    monkeypatch.setattr(cache, "_unflushed", {})
+    cache._count("test_flush", "hits", 2)
+    asyncio.run(cache.flush_cache_stats())
+    cache._count("test_flush", "hits")
+    assert cache._unflushed == {"test_flush:hits": 3}
+
+    redis = RecordingRedis()
+    monkeypatch.setattr(cache, "get_async_redis_client", lambda: redis)
+    asyncio.run(cache.flush_cache_stats())
+    assert redis.totals == {"test_flush:hits": 3}
@@ -0,0 +1,77 @@
+import asyncio
+import random
+import datetime
+import pytest
+from bson import ObjectId
+import services.catalog as catalog
+from db.aio import ThreadedDatabase
+from services.catalog import Catalog, CATALOG_PROJECTION, load_catalog, refresh_catalog
+from services.sampling import sample_movies
+
+mongomock = pytest.importorskip("mongomock")
+
+GENRES = ["Drama", "Comedy", "Action", "Science Fiction", "Animation"]
+
+def movies_db(count: int = 200):
+    rng = random.Random(7)
+    db = mongomock.MongoClient()["cinemate"]
+    ratings = rng.sample(range(1, 1000), count)  # Distinct sort keys: no ties to order differently
+    db["movies"].insert_many([{
+        "title": f"m{i}", "avg_rating": ratings[i] / 100, "num_reviews": rng.randrange(0, 400) * 1000 + i,
+        "year": rng.randrange(1990, 1995), "genres": rng.sample(GENRES, rng.randrange(0, 3)), "rand": rng.random()
+    } for i in range(count)])
+    return db
+
+def snapshot(db) -> Catalog:
+    return Catalog.from_documents(list(db["movies"].find({}, CATALOG_PROJECTION)))
+
+def ids(cursor) -> list:
+    return [movie["_id"] for movie in cursor]
+
+def test_popular_matches_mongodb():
+    db = movies_db()
+    expected = db["movies"].find({"num_reviews": {"$gte": 100}}).sort([("avg_rating", -1), ("num_reviews", -1)])
+    assert snapshot(db).popular(15) == ids(expected.limit(15))
+
+def test_by_genre_matches_mongodb():
+    db = movies_db()
+    movies = snapshot(db)
+    for pattern in ("drama", "FICTION", "^a", "western"):
+        expected = db["movies"].find({"genres": {"$regex": pattern, "$options": "i"}}).sort("avg_rating", -1)
+        assert movies.by_genre(pattern, 10) == ids(expected.limit(10))
+
+def test_similar_matches_mongodb():
+    db = movies_db()
+    target = db["movies"].find_one({"genres.1": {"$exists": True}})
+    rating = target["avg_rating"]
+    expected = db["movies"].find({
+        "_id": {"$ne": target["_id"]}, "genres": {"$in": target["genres"]},
+        "avg_rating": {"$gte": max(0, rating - 1), "$lte": rating + 1}
+    }).sort("avg_rating", -1)
+    assert snapshot(db).similar(target["_id"], target["genres"], max(0, rating - 1), rating + 1, 10) == \
+        ids(expected.limit(10))
+
+@pytest.mark.parametrize("genre, year", [(None, None), ("Drama", None), (None, 1992), ("Comedy", 1990)])
+def test_seeded_sample_matches_mongodb(genre, year):
+    db = movies_db()
+    movies = snapshot(db)
+    for page in range(3):
+        expected = asyncio.run(sample_movies(ThreadedDatabase(db)["movies"], 8, genre, year, seed=3, page=page))
+        assert movies.sample(8, genre, year, seed=3, page=page) == ids(expected)
+
+def test_refresh_reads_movies_inserted_with_older_object_ids(monkeypatch):
+    monkeypatch.setattr(catalog, "_catalog", None)
+    monkeypatch.setattr(catalog, "CATALOG_OVERLAP_SECONDS", 60)
+    db = mongomock.MongoClient()["cinemate"]
+    movies = ThreadedDatabase(db)["movies"]
+    now = datetime.datetime.now(datetime.timezone.utc)
+    at = lambda seconds: ObjectId.from_datetime(now - datetime.timedelta(seconds=seconds))
+
+    db["movies"].insert_one({"_id": at(0), "title": "newest", "avg_rating": 5.0})
+    asyncio.run(load_catalog(movies))
+    # Inserted after the snapshot by a client whose clock is behind, and long ago
+    db["movies"].insert_many([{"_id": at(30), "avg_rating": 6.0}, {"_id": at(3600), "avg_rating": 7.0}])
+
+    assert asyncio.run(refresh_catalog(movies)) == 2  # The newest movie is re-read as well
+    assert len(catalog._catalog) == 2
+    assert sorted(catalog._catalog.positions) == sorted([at(0), at(30)])
@@ -0,0 +1,16 @@
+import pytest
+from fastapi import HTTPException
+from services.export import field_projection
+
+def test_field_projection_hides_fields():
+    assert field_projection(None, hidden=("password_hash",)) == {"password_hash": 0}
+    assert field_projection(None) is None
+    assert field_projection("username, email,password_hash", hidden=("password_hash",)) == {"username": 1, "email": 1}
+    with pytest.raises(HTTPException):
+        field_projection("password_hash", hidden=("password_hash",))
+
+@pytest.mark.parametrize("fields", ["$where", "movie_id,$foo", "a..b", "rating."])
+def test_field_projection_rejects_invalid_field_names(fields):
+    with pytest.raises(HTTPException) as error:
+        field_projection(fields)
+    assert error.value.status_code == 400
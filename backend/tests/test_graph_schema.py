@@ -0,0 +1,31 @@
+import asyncio
+import pytest
+import db.neo4j as neo4j
+from db.neo4j import provision_graph_schema
+
+class Graph:
+    def __init__(self, scans=(), available=True):
+        self.scans = list(scans)
+        self.available = available
+
+    async def ensure_schema(self):
+        if not self.available:
+            raise ConnectionError("Neo4j unavailable")
+
+    async def label_scans(self, query, params):
+        return self.scans
+
+def test_label_scans_are_logged_by_default(monkeypatch, capsys):
+    monkeypatch.setattr(neo4j, "GRAPH_SCHEMA_STRICT", False)
+    asyncio.run(provision_graph_schema(Graph(["NodeByLabelScan"])))
+    assert "label scans: create_movie_node (NodeByLabelScan)" in capsys.readouterr().out
+
+def test_label_scans_abort_startup_when_strict(monkeypatch):
+    monkeypatch.setattr(neo4j, "GRAPH_SCHEMA_STRICT", True)
+    with pytest.raises(RuntimeError, match="get_similar_movies_graph"):
+        asyncio.run(provision_graph_schema(Graph(["NodeByLabelScan"])))
+    asyncio.run(provision_graph_schema(Graph()))  # Index-backed plans start normally
+
+def test_unavailable_neo4j_never_blocks_startup(monkeypatch):
+    monkeypatch.setattr(neo4j, "GRAPH_SCHEMA_STRICT", True)
+    asyncio.run(provision_graph_schema(Graph(available=False)))
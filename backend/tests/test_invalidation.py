@@ -0,0 +1,31 @@
+from services.cache import local_cache
+from services.invalidation import is_affected, evict_local
+
+EVENT = {"type": "movie_changed", "movie_id": "m1", "genres": ["Science Fiction", "Drama"], "title": "Alien"}
+
+def test_movie_key_of_the_changed_movie_only():
+    assert is_affected("movie:m1", EVENT)
+    assert not is_affected("movie:m2", EVENT)
+
+def test_popular_and_search_lists_always_evicted():
+    assert is_affected("popular_movies?limit=10", EVENT)
+    assert is_affected("search:predator?limit=10", EVENT)
+
+def test_genre_lists_matched_like_the_route_regex():
+    assert is_affected("genre:drama?limit=10", EVENT)
+    assert is_affected("genre:fiction", EVENT)  # $regex matches anywhere in the genre name
+    assert not is_affected("genre:comedy?limit=10", EVENT)
+
+def test_genre_lists_evicted_when_genres_unknown_or_term_invalid():
+    assert is_affected("genre:comedy", {**EVENT, "genres": None})
+    assert is_affected("genre:(unclosed", EVENT)
+
+def test_unrelated_namespaces_kept():
+    assert not is_affected("path:1:2", EVENT)
+
+def test_evict_local_drops_affected_entries():
+    local_cache.clear()
+    for key in ("movie:m1", "movie:m2", "genre:drama", "genre:comedy", "popular_movies"):
+        local_cache.set(key, {})
+    assert evict_local(EVENT) == 3
+    assert sorted(local_cache.keys()) == ["genre:comedy", "movie:m2"]
@@ -0,0 +1,21 @@
+import pandas as pd
+from load_data import extract_names
+
+def test_extract_names_python_literal():
+    column = pd.Series(["[{'id': 16, 'name': 'Animation'}, {'id': 35, 'name': 'Comedy'}]"])
+    assert extract_names(column).tolist() == [["Animation", "Comedy"]]
+
+def test_extract_names_keeps_apostrophes():
+    # Python's repr switches to double quotes for names containing an apostrophe
+    column = pd.Series([
+        "[{'id': 818, 'name': 'based on novel'}, {'id': 10131, 'name': \"based on children's book\"}]"
+    ])
+    assert extract_names(column).tolist() == [["based on novel", "based on children's book"]]
+
+def test_extract_names_decodes_escapes():
+    column = pd.Series([r"""[{'id': 1, 'name': 'tough \xa0girl'}, {'id': 2, 'name': 'say \'hi\' and "bye"'}]"""])
+    assert extract_names(column).tolist() == [["tough \xa0girl", "say 'hi' and \"bye\""]]
+
+def test_extract_names_json_and_missing_values():
+    column = pd.Series(['[{"id": 18, "name": "Drama"}]', None, "", "[]"])
+    assert extract_names(column).tolist() == [["Drama"], [], [], []]
@@ -0,0 +1,79 @@
+import asyncio
+import datetime
+import pytest
+import services.movie_stats as movie_stats
+from db.aio import ThreadedDatabase
+from services.movie_stats import refresh_movie_stats, genre_stats, MOVIE_STATS_COLLECTION
+
+mongomock = pytest.importorskip("mongomock")
+
+class Redis:
+    """
+    The SET NX / GET / DELETE subset the rebuild lock uses.
+    """
+    def __init__(self):
+        self.values = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def delete(self, key):
+        self.values.pop(key, None)
+
+class Movies:
+    """
+    Stands in for the $merge pipelines (not supported by mongomock): each
+    aggregation lets a competing rebuild run first.
+    """
+    def __init__(self, compete=None):
+        self.compete = compete
+        self.aggregations = 0
+
+    def aggregate(self, pipeline, **kwargs):
+        movies = self
+
+        class Cursor:
+            async def to_list(self, length):
+                movies.aggregations += 1
+                if movies.compete:
+                    await movies.compete()
+                return []
+        return Cursor()
+
+def database(movies):
+    stats = ThreadedDatabase(mongomock.MongoClient()["cinemate"])[MOVIE_STATS_COLLECTION]
+    return {"movies": movies, MOVIE_STATS_COLLECTION: stats}
+
+def test_concurrent_rebuild_is_skipped(monkeypatch):
+    redis = Redis()
+    monkeypatch.setattr(movie_stats, "get_async_redis_client", lambda: redis)
+    skipped = []
+
+    async def compete():
+        if not skipped:
+            skipped.append(await refresh_movie_stats(database(Movies())))
+
+    counts = asyncio.run(refresh_movie_stats(database(Movies(compete))))
+    assert skipped == [None]
+    assert counts == {"genre": 0, "year": 0, "decade": 0}
+    assert redis.values == {}  # Released for the next rebuild
+    assert asyncio.run(refresh_movie_stats(database(Movies()))) is not None
+
+def test_rollups_without_documents_fall_back_to_live():
+    db = database(Movies())
+    stats = db[MOVIE_STATS_COLLECTION]
+    asyncio.run(stats.insert_one({"_id": "meta", "kind": "meta", "refreshed_at": datetime.datetime(2024, 1, 1)}))
+    assert asyncio.run(genre_stats(db)) is None
+    asyncio.run(stats.insert_one({
+        "_id": "genre:Drama", "kind": "genre", "key": "Drama", "count": 2, "rating_sum": 15.0, "total_reviews": 10,
+        "budget_sum": 0, "revenue_sum": 0, "updated_at": datetime.datetime(2024, 1, 2)
+    }))
+    genres, freshness = asyncio.run(genre_stats(db))
+    assert [(genre["_id"], genre["avg_rating"]) for genre in genres] == [("Drama", 7.5)]
+    assert freshness["as_of"] == datetime.datetime(2024, 1, 2)
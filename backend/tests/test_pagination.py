@@ -0,0 +1,45 @@
+import re
+import asyncio
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+from db.aio import ThreadedDatabase
+from services.pagination import encode_cursor, decode_cursor, paginate, total_count, MAX_PAGE_SIZE
+
+@pytest.mark.parametrize("last_id", [ObjectId(), "tt0114709", 862])
+def test_cursor_round_trip(last_id):
+    cursor = encode_cursor(last_id)
+    assert decode_cursor(cursor) == last_id
+    assert re.fullmatch(r"[A-Za-z0-9_-]+=*", cursor)  # Safe in a query string
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "e30=", encode_cursor(1)[:-4]])
+def test_invalid_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+def test_paginate_walks_every_document_once():
+    mongomock = pytest.importorskip("mongomock")
+    db = mongomock.MongoClient()["cinemate"]
+    db["reviews"].insert_many([{"movie_id": "m1" if i % 3 else "m2", "rating": i % 5 + 1} for i in range(25)])
+    reviews = ThreadedDatabase(db)["reviews"]
+
+    async def walk(query):
+        seen, cursor = [], None
+        while True:
+            page, cursor = await paginate(reviews, query, 7, cursor, {"rating": 0})
+            assert len(page) <= 7 and all("rating" not in review for review in page)
+            seen.extend(review["_id"] for review in page)
+            if cursor is None:
+                return seen
+
+    seen = asyncio.run(walk({"movie_id": "m1"}))
+    assert seen == [review["_id"] for review in db["reviews"].find({"movie_id": "m1"}).sort("_id", 1)]
+    assert asyncio.run(total_count(reviews, {"movie_id": "m1"})) == len(seen)
+
+def test_paginate_caps_the_page_size():
+    mongomock = pytest.importorskip("mongomock")
+    db = mongomock.MongoClient()["cinemate"]
+    db["users"].insert_many([{"username": f"u{i}"} for i in range(MAX_PAGE_SIZE + 5)])
+    page, cursor = asyncio.run(paginate(ThreadedDatabase(db)["users"], {}, MAX_PAGE_SIZE * 2))
+    assert len(page) == MAX_PAGE_SIZE and cursor is not None
@@ -0,0 +1,54 @@
+import asyncio
+import services.cache as cache
+from services.cache import local_cache
+from services.paths import shortest_path, shortest_paths, path_key
+from test_cache import UnavailableRedis
+
+NO_PATH = {"hops": None, "nodes": []}
+
+def path(*ids) -> dict:
+    return {"hops": len(ids) - 1, "nodes": [{"id": movie_id, "title": str(movie_id)} for movie_id in ids]}
+
+class Graph:
+    def __init__(self, paths: dict):
+        self.paths = paths  # (low, high) -> path stored from low
+        self.calls = 0
+
+    async def get_shortest_path_between_movies(self, movie1_id, movie2_id, max_depth):
+        self.calls += 1
+        return self.paths.get((movie1_id, movie2_id), NO_PATH)
+
+    async def get_shortest_paths_from_movie(self, movie_id, target_ids, max_depth):
+        self.calls += 1
+        found = {}
+        for target_id in target_ids:
+            stored = self.paths.get(tuple(sorted((movie_id, target_id))), NO_PATH)
+            found[target_id] = stored if not stored["nodes"] or stored["nodes"][0]["id"] == movie_id \
+                else {**stored, "nodes": stored["nodes"][::-1]}
+        return found
+
+def test_found_paths_are_cached_and_reoriented(monkeypatch):
+    monkeypatch.setattr(cache, "get_async_redis_client", lambda: UnavailableRedis())
+    local_cache.clear()
+    graph = Graph({(1, 3): path(1, 2, 3)})
+    assert asyncio.run(shortest_path(graph, 1, 3, 4)) == path(1, 2, 3)
+    assert asyncio.run(shortest_path(graph, 3, 1, 4)) == path(3, 2, 1)
+    assert graph.calls == 1
+
+def test_missing_paths_are_not_cached(monkeypatch):
+    monkeypatch.setattr(cache, "get_async_redis_client", lambda: UnavailableRedis())
+    local_cache.clear()
+    graph = Graph({})
+    assert asyncio.run(shortest_path(graph, 1, 3, 4)) == NO_PATH
+    assert path_key(1, 3, 4) not in local_cache.keys()
+    graph.paths[(1, 3)] = path(1, 2, 3)  # A graph write connects the movies
+    assert asyncio.run(shortest_path(graph, 1, 3, 4)) == path(1, 2, 3)
+
+def test_one_to_many_caches_only_found_paths(monkeypatch):
+    monkeypatch.setattr(cache, "get_async_redis_client", lambda: UnavailableRedis())
+    local_cache.clear()
+    graph = Graph({(1, 3): path(1, 2, 3)})
+    assert asyncio.run(shortest_paths(graph, 3, [1, 5], 4)) == {1: path(3, 2, 1), 5: NO_PATH}
+    assert local_cache.keys() == [path_key(1, 3, 4)]
+    assert asyncio.run(shortest_path(graph, 1, 3, 4)) == path(1, 2, 3)
+    assert graph.calls == 1
@@ -0,0 +1,71 @@
+import asyncio
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+import services.batch as batch
+from db.aio import ThreadedDatabase
+from services.batch import resolve_movies, movies_by_tmdb_id
+from services.projection import movie_projection, project, CARD_FIELDS, INTERNAL_FIELDS
+
+MOVIE = {
+    "_id": "m1", "title": "Toy Story", "year": 1995, "genres": ["Animation"], "avg_rating": 7.7,
+    "num_reviews": 5415, "poster_url": "", "tmdb_id": 862, "description": "...", "budget": 30000000
+}
+
+def test_movie_projection_profiles_and_fields():
+    assert movie_projection("card") == {name: 1 for name in CARD_FIELDS}
+    assert movie_projection("full") == {name: 0 for name in INTERNAL_FIELDS}
+    assert movie_projection("card", "title, year,rand") == {"title": 1, "year": 1}
+    with pytest.raises(HTTPException):
+        movie_projection("card", "rand,rating_sum")
+
+@pytest.mark.parametrize("fields", ["$where", "title,$foo", "a..b", "cast.", ".title", "title,year.$"])
+def test_movie_projection_rejects_invalid_field_names(fields):
+    with pytest.raises(HTTPException) as error:
+        movie_projection("card", fields)
+    assert error.value.status_code == 400
+
+def test_project_matches_mongodb_projection_semantics():
+    assert project(MOVIE, movie_projection("card", "title,year")) == {"_id": "m1", "title": "Toy Story", "year": 1995}
+    assert project({**MOVIE, "rand": 0.5}, movie_projection("full")) == MOVIE
+    assert project(MOVIE, None) is MOVIE
+    assert "tmdb_id" not in project(MOVIE, movie_projection("card"))
+
+def movies_collection():
+    mongomock = pytest.importorskip("mongomock")
+    db = mongomock.MongoClient()["cinemate"]
+    db["movies"].insert_many([
+        {**MOVIE, "_id": ObjectId(), "rand": 0.5},
+        {**MOVIE, "_id": ObjectId(), "tmdb_id": 863, "title": "Toy Story 2", "rand": 0.7},
+    ])
+    return db, ThreadedDatabase(db)["movies"]
+
+def test_movies_by_tmdb_id_removes_the_ordering_field():
+    _, movies = movies_collection()
+    found = asyncio.run(movies_by_tmdb_id(movies, [862, 863], movie_projection("card")))
+    assert sorted(found) == [862, 863]
+    assert all("tmdb_id" not in movie for movie in found.values())
+    found = asyncio.run(movies_by_tmdb_id(movies, [862], movie_projection("detail")))
+    assert found[862]["tmdb_id"] == 862
+
+def test_resolve_movies_applies_the_projection(monkeypatch):
+    db, movies = movies_collection()
+    cached = {}
+
+    async def get_many(keys, namespace):
+        return {key: cached[key] for key in keys if key in cached}
+
+    async def set_many(values, namespace, ttl):
+        cached.update(values)
+
+    monkeypatch.setattr(batch, "get_many", get_many)
+    monkeypatch.setattr(batch, "set_many", set_many)
+    movie_id = str(db["movies"].find_one({"tmdb_id": 862})["_id"])
+
+    for _ in range(2):  # A database miss, then a cache hit
+        found = asyncio.run(resolve_movies(movies, [movie_id, "863"], movie_projection("card", "title")))
+        assert {key: sorted(movie) for key, movie in found.items()} == {
+            movie_id: ["_id", "title"], "863": ["_id", "title"]
+        }
+    # The cache keeps whole movies (without internal fields) for GET /movies/{movie_id}
+    assert "budget" in cached[f"movie:{movie_id}"] and "rand" not in cached[f"movie:{movie_id}"]
@@ -0,0 +1,86 @@
+import pytest
+from bson import ObjectId
+from services.ratings import movie_id_filter, rating_update, rated_movie, rebuild_rating_counters
+
+MISSING = object()
+
+def evaluate(expression, document: dict):
+    """
+    Evaluate the aggregation expressions rating_update uses against a document.
+    """
+    if isinstance(expression, str) and expression.startswith("$"):
+        return document.get(expression[1:], MISSING)
+    if not isinstance(expression, dict):
+        return expression
+    (operator, arguments), = expression.items()
+    if not isinstance(arguments, list):
+        arguments = [arguments]  # Single-argument operators such as $type
+    values = [evaluate(argument, document) for argument in arguments]
+    if operator == "$add":
+        return sum(values)
+    if operator == "$divide":
+        return values[0] / values[1]
+    if operator == "$eq":
+        return values[0] == values[1]
+    if operator == "$cond":
+        return values[1] if values[0] else values[2]
+    if operator == "$ifNull":
+        return values[1] if values[0] in (None, MISSING) else values[0]
+    if operator == "$type":
+        return "missing" if values[0] is MISSING else type(values[0]).__name__
+    raise NotImplementedError(operator)
+
+def apply_update(document: dict, pipeline: list) -> dict:
+    for stage in pipeline:
+        document = {**document, **{field: evaluate(value, document) for field, value in stage["$set"].items()}}
+    return document
+
+def test_movie_id_filter():
+    movie_id = ObjectId()
+    assert movie_id_filter(str(movie_id)) == {"_id": movie_id}
+    assert movie_id_filter("862") == {"_id": "862"}
+
+def test_rated_movie_starts_seeded_movies_from_zero():
+    seeded = {"_id": 1, "num_reviews": 5000, "avg_rating": 7.7}
+    assert rated_movie(seeded, 4) == {"_id": 1, "num_reviews": 1, "rating_sum": 4, "avg_rating": 4.0}
+
+def test_rated_movie_adds_to_running_counters():
+    movie = {"_id": 1, "num_reviews": 2, "rating_sum": 7, "avg_rating": 3.5}
+    assert rated_movie(movie, 5) == {"_id": 1, "num_reviews": 3, "rating_sum": 12, "avg_rating": 4.0}
+
+@pytest.mark.parametrize("movie", [
+    {"_id": 1, "num_reviews": 5000, "avg_rating": 7.7},
+    {"_id": 1, "num_reviews": 2, "rating_sum": 7, "avg_rating": 3.5},
+])
+def test_rated_movie_matches_rating_update(movie):
+    assert apply_update(movie, rating_update(5)) == rated_movie(movie, 5)
+
+def test_rebuild_rating_counters(tmp_path):
+    mongomock = pytest.importorskip("mongomock")
+    db = mongomock.MongoClient()["cinemate"]
+    api_movie, seeded_movie = ObjectId(), ObjectId()
+    db["movies"].insert_many([
+        {"_id": api_movie, "tmdb_id": 100, "num_reviews": 10, "avg_rating": 8.0},
+        {"_id": seeded_movie, "tmdb_id": 862, "num_reviews": 5000, "avg_rating": 7.7},
+    ])
+    db["reviews"].insert_many([
+        {"user_id": "u1", "movie_id": str(api_movie), "rating": 4},
+        {"user_id": "u2", "movie_id": str(api_movie), "rating": 5},
+        {"user_id": "1", "movie_id": "1", "rating": 3.0},  # MovieLens movieId 1 -> TMDB 862
+        {"user_id": "2", "movie_id": "1", "rating": 4.0},
+        {"user_id": "3", "movie_id": "2", "rating": 5.0},  # Not in links.csv
+        {"user_id": "u3", "movie_id": str(ObjectId()), "rating": 1},  # Deleted movie
+    ])
+    links = tmp_path / "links.csv"
+    links.write_text("movieId,imdbId,tmdbId\n1,114709,862\n3,113228,\n")
+
+    counts = rebuild_rating_counters(db, links_csv=str(links))
+    assert counts == {"movies": 2, "unmapped_reviews": 1, "missing_movie_reviews": 1}
+    movie = db["movies"].find_one({"_id": api_movie})
+    assert (movie["num_reviews"], movie["rating_sum"], movie["avg_rating"]) == (2, 9, 4.5)
+    movie = db["movies"].find_one({"_id": seeded_movie})
+    assert (movie["num_reviews"], movie["rating_sum"], movie["avg_rating"]) == (2, 7.0, 3.5)
+
+    # Without links the seeded reviews are skipped and reported
+    counts = rebuild_rating_counters(db)
+    assert counts == {"movies": 1, "unmapped_reviews": 3, "missing_movie_reviews": 1}
@@ -0,0 +1,32 @@
+import numpy as np
+from services.recommender import Recommender
+
+def model(min_item_ratings: int = 0) -> Recommender:
+    rng = np.random.default_rng(0)
+    item_factors = rng.standard_normal((50, 8)).astype(np.float32)
+    user_factors = rng.standard_normal((5, 8)).astype(np.float32)
+    movie_ids = np.array([str(i) for i in range(50)])
+    rated_indptr = np.array([0, 3, 6, 9, 12, 15])
+    rated_indices = np.arange(15)
+    return Recommender(np.array([str(i) for i in range(5)]), movie_ids, movie_ids, user_factors, item_factors,
+                       rated_indptr, rated_indices, 3.5, min_item_ratings=min_item_ratings)
+
+def test_similar_items_ranks_by_cosine():
+    recommender = model()
+    factors = recommender.item_factors
+    cosine = factors @ factors[7] / (np.linalg.norm(factors, axis=1) * np.linalg.norm(factors[7]))
+    cosine[7] = -np.inf  # The movie itself is not returned
+    expected = np.argsort(-cosine)[:5]
+    found = recommender.similar_items("7", 5)
+    assert [item["movie_id"] for item in found] == [str(item) for item in expected]
+    assert [item["score"] for item in found] == [round(float(cosine[item]), 4) for item in expected]
+
+def test_similar_items_unknown_movie():
+    assert model().similar_items("unknown") is None
+
+def test_recommend_skips_rated_and_rare_movies():
+    recommender = model(min_item_ratings=1)  # Only movies 0-14 have ratings
+    found = recommender.recommend("1", 5)
+    assert len(found) == 5
+    assert all(int(item["movie_id"]) < 15 and not 3 <= int(item["movie_id"]) < 6 for item in found)
+    assert recommender.recommend("unknown") is None
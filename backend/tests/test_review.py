@@ -0,0 +1,36 @@
+import pytest
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from db.aio import ThreadedDatabase
+from db.mongo import get_db
+from routes.review import router
+
+mongomock = pytest.importorskip("mongomock")
+
+class FailingMovies:
+    async def find_one_and_update(self, *args, **kwargs):
+        raise ConnectionError("movies unavailable")
+
+def client_for(database) -> TestClient:
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_db] = lambda: database
+    return TestClient(app)
+
+def test_review_of_unknown_movie_is_not_kept():
+    db = mongomock.MongoClient()["cinemate"]
+    response = client_for(ThreadedDatabase(db)).post(
+        "/reviews/", json={"user_id": "u1", "movie_id": str(ObjectId()), "rating": 4}
+    )
+    assert response.status_code == 404
+    assert db["reviews"].count_documents({}) == 0
+
+def test_review_is_removed_when_the_movie_update_fails():
+    db = mongomock.MongoClient()["cinemate"]
+    database = {"reviews": ThreadedDatabase(db)["reviews"], "movies": FailingMovies()}
+    response = client_for(database).post(
+        "/reviews/", json={"user_id": "u1", "movie_id": str(ObjectId()), "rating": 4}
+    )
+    assert response.status_code == 500
+    assert db["reviews"].count_documents({}) == 0
@@ -0,0 +1,44 @@
+import asyncio
+import pytest
+import services.sampling as sampling
+from db.aio import ThreadedDatabase
+from services.sampling import pivot, sample_movies
+
+mongomock = pytest.importorskip("mongomock")
+
+def movies_collection():
+    db = mongomock.MongoClient()["cinemate"]
+    db["movies"].insert_many([
+        {"title": f"m{i}", "rand": i / 10, "genres": ["Drama"] if i % 2 else ["Comedy"], "year": 2000 + i % 3}
+        for i in range(1, 10)
+    ])
+    return ThreadedDatabase(db)["movies"]
+
+def keys(movies: list) -> list:
+    return [movie["rand"] for movie in movies]
+
+def test_pivot_is_deterministic_per_seed_and_page():
+    assert pivot(7, 0) == pivot(7, 0)
+    assert pivot(7, 0) != pivot(7, 1)
+    assert 0 <= pivot(None, 0) < 1
+
+def test_sample_walks_up_from_the_pivot_and_wraps_around(monkeypatch):
+    monkeypatch.setattr(sampling, "pivot", lambda seed, page: 0.75)
+    found = asyncio.run(sample_movies(movies_collection(), 4, seed=1))
+    assert keys(found) == [0.8, 0.9, 0.1, 0.2]
+
+def test_sample_applies_filters_on_both_sides_of_the_pivot(monkeypatch):
+    monkeypatch.setattr(sampling, "pivot", lambda seed, page: 0.6)
+    found = asyncio.run(sample_movies(movies_collection(), 3, genre="Drama", seed=1))
+    assert keys(found) == [0.7, 0.9, 0.1]
+    assert all(movie["genres"] == ["Drama"] for movie in found)
+
+def test_sample_never_exceeds_the_matching_movies(monkeypatch):
+    monkeypatch.setattr(sampling, "pivot", lambda seed, page: 0.5)
+    found = asyncio.run(sample_movies(movies_collection(), 10, year=2000, seed=1))
+    assert sorted(keys(found)) == [0.3, 0.6, 0.9]
+
+def test_seeded_pages_are_reproducible():
+    movies = movies_collection()
+    first = asyncio.run(sample_movies(movies, 3, seed=42, page=2))
+    assert keys(asyncio.run(sample_movies(movies, 3, seed=42, page=2))) == keys(first)
@@ -0,0 +1,85 @@
+import json
+import asyncio
+import datetime
+import numpy as np
+import pytest
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+import services.cache as cache
+import services.serialization as serialization
+from services.cache import cached, local_cache
+from services.serialization import dumps, loads, FastJSONResponse
+from test_cache import UnavailableRedis
+
+MOVIE_ID = ObjectId()
+DOCUMENT = {
+    "_id": MOVIE_ID,
+    "title": "Amélie",
+    "released": datetime.datetime(2001, 4, 25, 12, 30, 0, 1234),
+    "updated_at": datetime.datetime(2024, 1, 2, tzinfo=datetime.timezone.utc),
+    "avg_rating": 7.9,
+    "genres": ["Comedy", "Romance"],
+    "cast": [{"name": "Audrey Tautou", "order": 0}],
+    "budget": None,
+    "adult": False,
+}
+
+def encoded(value):
+    """
+    What a route returning `value` sent before FastJSONResponse: FastAPI's
+    jsonable_encoder, with ObjectIds as strings as the routes converted them.
+    """
+    return jsonable_encoder(value, custom_encoder={ObjectId: str})
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(serialization, "orjson", None)
+    elif serialization.orjson is None:
+        pytest.skip("orjson is not installed")
+    return request.param
+
+def test_documents_match_jsonable_encoder(encoder):
+    assert loads(dumps(DOCUMENT)) == encoded(DOCUMENT)
+    assert loads(dumps([DOCUMENT, {"_id": MOVIE_ID, "nested": [DOCUMENT]}])) == \
+        encoded([DOCUMENT, {"_id": MOVIE_ID, "nested": [DOCUMENT]}])
+
+def test_object_ids_and_datetimes_are_strings(encoder):
+    data = loads(dumps(DOCUMENT))
+    assert data["_id"] == str(MOVIE_ID)
+    assert data["released"] == "2001-04-25T12:30:00.001234"
+    assert data["updated_at"] == "2024-01-02T00:00:00+00:00"
+
+def test_numpy_values_are_numbers_and_lists(encoder):
+    values = {"count": np.int64(5), "score": np.float32(0.5), "rating": np.float64(0.25),
+              "ids": np.arange(3), "matrix": np.eye(2)}
+    assert loads(dumps(values)) == {"count": 5, "score": 0.5, "rating": 0.25, "ids": [0, 1, 2],
+                                    "matrix": [[1.0, 0.0], [0.0, 1.0]]}
+
+def test_non_string_keys_are_strings(encoder):
+    assert loads(dumps({1: "a", 2.5: "b"})) == json.loads(json.dumps({1: "a", 2.5: "b"}))
+
+def test_output_is_compact_utf8(encoder):
+    assert dumps({"title": "Amélie", "genres": ["Comedy"]}) == '{"title":"Amélie","genres":["Comedy"]}'.encode()
+
+def test_response_body_matches_json_response(encoder):
+    content = {"movies": [{**DOCUMENT, "_id": str(MOVIE_ID)}], "count": 1}
+    fast = FastJSONResponse(content)
+    assert fast.media_type == "application/json"
+    assert json.loads(fast.body) == json.loads(JSONResponse(encoded(content)).body)
+
+def test_cached_response_body_is_the_same_on_a_hit(monkeypatch):
+    monkeypatch.setattr(cache, "get_async_redis_client", lambda: UnavailableRedis())
+    local_cache.clear()
+
+    @cached("serialization_test", 60)
+    async def handler(movie_id: str):
+        return {**DOCUMENT, "_id": movie_id}
+
+    async def twice():
+        return [await handler(movie_id=str(MOVIE_ID)) for _ in range(2)]
+
+    miss, hit = asyncio.run(twice())
+    assert miss.body == hit.body
+    assert json.loads(hit.body) == encoded({**DOCUMENT, "_id": str(MOVIE_ID)})
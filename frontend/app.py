@@ -16,7 +16,10 @@ def test_api_connection():
 def get_movies():
     """Get movies from the API."""
     try:
-        response = requests.get(f"{API_BASE_URL}/movies/")
+        response = requests.get(
+            f"{API_BASE_URL}/movies/",
+            params={"fields": "title,year,genres,avg_rating,num_reviews,poster_url,description,tagline"}
+        )
         if response.status_code == 200:
             data = response.json()
             # Extract the movies list from the response